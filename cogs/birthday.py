@@ -11,15 +11,15 @@ import logging
 import traceback
 import datetime
 import os
-import tempfile
 import config
 import utils
 
 import csv
-import urllib.request
 import io
 from typing import Any, Dict, Optional, Tuple
+import aiohttp
 from PIL import Image
+from poster_core.image_store import ImageStore, download_character_image
 
 # ロギングの設定
 logger = logging.getLogger(__name__)
@@ -105,6 +105,7 @@ class Birthday(commands.Cog):
         self.settings: Dict[str, Any] = {}
         self.birthday_task_started = False
         self._data_lock = asyncio.Lock()  # JSONファイルの排他制御用ロック
+        self.image_store = ImageStore(config.POSTER_IMAGE_CACHE_DIR)  # tools.crawl・/poster と共有の画像保存先
         self.load_birthdays()
         self._load_settings()
         self._refresh_daily_flags(datetime.datetime.now(self.tz))
@@ -246,34 +247,10 @@ class Birthday(commands.Cog):
         month = birthday_data.get("month")
         day = birthday_data.get("day")
         
-        # tempfileを使用して安全な一時ファイル管理
-        temp_webp_path = None
-        temp_png_path = None
-        
         try:
-            # 画像URLを取得（config.pyで一元管理）
-            url = config.get_character_image_url(character_id)
-            is_webp = url.endswith('.webp')
-            
-            # 画像取得
-            if is_webp:
-                # webp形式
-                # 一時ファイル作成（自動削除は無効化、手動で削除）
-                fd, temp_webp_path = tempfile.mkstemp(suffix='.webp', prefix=f'birthday_{character_id}_')
-                os.close(fd)  # ファイルディスクリプタを閉じる
-                urllib.request.urlretrieve(url, temp_webp_path)
-                img = Image.open(temp_webp_path)
-                img = img.convert('RGB')
-                
-                fd, temp_png_path = tempfile.mkstemp(suffix='.png', prefix=f'birthday_{character_id}_')
-                os.close(fd)
-                img.save(temp_png_path, 'PNG')
-                img.close()
-            else:
-                # png形式
-                fd, temp_png_path = tempfile.mkstemp(suffix='.png', prefix=f'birthday_{character_id}_')
-                os.close(fd)
-                urllib.request.urlretrieve(url, temp_png_path)
+            # 画像を取得（ローカル保存を優先し、無ければダウンロードして保存）してPNGに変換
+            image_bytes = await self._load_character_image(character_id)
+            png_bytes = await asyncio.to_thread(self._to_png, image_bytes)
             
             # Embed作成
             embed = discord.Embed(
@@ -286,22 +263,33 @@ class Birthday(commands.Cog):
             embed.set_footer(text=f"Zirconキャラクター")
             
             # 画像をアップロードしてサムネイルに設定
-            with open(temp_png_path, 'rb') as f:
-                file = discord.File(f, filename=f"{character_id}.png")
-                embed.set_thumbnail(url=f"attachment://{character_id}.png")
-                await channel.send(embed=embed, file=file)
+            file = discord.File(io.BytesIO(png_bytes), filename=f"{character_id}.png")
+            embed.set_thumbnail(url=f"attachment://{character_id}.png")
+            await channel.send(embed=embed, file=file)
             
         except Exception as e:
             logger.error(f"Error in _announce_zircon_birthday: {e}")
             logger.error(traceback.format_exc())
-        finally:
-            # 一時ファイルの確実なクリーンアップ
-            for path in [temp_webp_path, temp_png_path]:
-                if path and os.path.exists(path):
-                    try:
-                        os.remove(path)
-                    except Exception as cleanup_error:
-                        logger.warning(f"一時ファイルの削除に失敗: {path}, {cleanup_error}")
+
+    async def _load_character_image(self, character_id: str) -> bytes:
+        """キャラクター画像を取得する（ローカル保存 → 画像ストレージの順）"""
+        data = await asyncio.to_thread(self.image_store.get, character_id)
+        if data is not None:
+            return data
+        async with aiohttp.ClientSession() as session:
+            data = await download_character_image(session, character_id)
+        await asyncio.to_thread(self.image_store.put, character_id, data)
+        return data
+
+    @staticmethod
+    def _to_png(image_bytes: bytes) -> bytes:
+        """画像（webp/png）をPNGに変換する"""
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            if img.format == 'PNG':
+                return image_bytes
+            output = io.BytesIO()
+            img.convert('RGB').save(output, 'PNG')
+            return output.getvalue()
 
     def load_birthdays(self):
         """誕生日データを読み込みます（リスト形式）。dataフォルダがなければ作成。"""
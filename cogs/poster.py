@@ -1,29 +1,36 @@
 import discord
 from discord import app_commands
-from discord.ext import commands
-import urllib.request
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException
-from PIL import Image, ImageDraw, ImageFont
+from discord.ext import commands, tasks
 import logging
 import traceback
 import config
-import platform
-import math
+from poster_core import (
+    CharacterInfoCache, CircuitBreaker, DriverPool, EncodeStats, ImageStore, JobQueue, JobQueueFullError, JobTicket,
+    OutputCache, PosterJobError, PosterPipeline, ProcessSupervisor, RenderClient, RenderJobError, RenderNodeError,
+    RenderPool, RenderQueueFullError, UploadIndex, UploadRecord, content_hash, create_chrome_driver, extension_for,
+    is_url_alive, resolve_profile,
+)
+from poster_core.browser import measure_transfer
+from poster_core.encoding import DEFAULT_PROFILE, PROFILES
+from poster_core.renderer import create_asset_store
+from poster_core.scraper import fetch_character_info_http, is_complete, scrape_character_info_selenium
 import asyncio
 import functools
+import collections
+import aiohttp
 
-import os
 import io
+import math
+import re
+import statistics
+import time
 
 logger = logging.getLogger(__name__)
 
+# /poster・/poster_format で選べるエンコード設定
+_PROFILE_CHOICES = [app_commands.Choice(name=profile.label, value=profile.name) for profile in PROFILES.values()]
+
+
 class Poster(commands.Cog):
     """
     キャラクターポスター生成コグ
@@ -31,723 +38,772 @@ class Poster(commands.Cog):
     """
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        # config.pyからパスを取得
-        self.mask_path = config.POSTER_MASK_PATH
-        self.peaceful_path = config.POSTER_PEACEFUL_PATH
-        self.brave_path = config.POSTER_BRAVE_PATH
-        self.glory_path = config.POSTER_GLORY_PATH
-        self.freedom_path = config.POSTER_FREEDOM_PATH
-        self.dst_path = config.POSTER_DST_PATH
-        
-        # 画像アセットの存在確認
-        self._check_assets()
+        # 起動したChromeのプロセス監視（1回あたりの上限と孤児プロセスの回収）
+        self.supervisor = ProcessSupervisor(
+            max_rss_mb=config.POSTER_SCRAPE_MAX_RSS_MB,
+            max_cpu_seconds=config.POSTER_SCRAPE_MAX_CPU_SEC,
+        )
+        self._sweep_task_started = False
+        # スクレイピング用のChromeを使い回すプール（起動はcog_loadでバックグラウンド実行）
+        self.driver_pool = DriverPool(
+            self._create_driver,
+            size=config.POSTER_DRIVER_POOL_SIZE,
+            max_pages=config.POSTER_DRIVER_MAX_PAGES,
+            lease_timeout=config.POSTER_DRIVER_LEASE_TIMEOUT,
+            finalizer=self.supervisor.quit_driver,
+        )
+        self._warmup_task: asyncio.Task | None = None
+        # HTTP高速経路用のセッションと、どの経路で取得したかの集計
+        self._http_session: aiohttp.ClientSession | None = None
+        self._scrape_sources = collections.Counter()
+        # スクレイピング結果の永続キャッシュと、裏で走っている再取得タスク
+        self.info_cache = CharacterInfoCache(config.POSTER_INFO_CACHE_PATH, config.POSTER_INFO_CACHE_TTL)
+        self.image_store = ImageStore(config.POSTER_IMAGE_CACHE_DIR)
+        # 描画・エンコードはイベントループを止めないよう別プロセスで行う
+        # （各ワーカーがフォント・マスク・国旗・描画済みレイヤーを保持する）
+        self.render_pool = RenderPool(workers=config.POSTER_RENDER_WORKERS, max_queue=config.POSTER_RENDER_QUEUE)
+        # 完成したポスター画像のキャッシュ（キーはキャラ画像・情報・テンプレートとアセットの版・出力形式のハッシュ）
+        self.output_cache = OutputCache(
+            config.POSTER_OUTPUT_CACHE_DIR,
+            max_memory_bytes=config.POSTER_OUTPUT_CACHE_MEMORY_MB * 1024 * 1024,
+            max_disk_bytes=config.POSTER_OUTPUT_CACHE_DISK_MB * 1024 * 1024,
+        )
+        # アセットの版を調べるためだけに使う（画像の読み込みは描画ワーカーが行う）
+        self.assets = create_asset_store()
+        # ポスター作成の順番待ち（同時実行数の上限と、同じキャラクターの同時リクエストの相乗り）
+        self.jobs = JobQueue(concurrency=config.POSTER_JOB_CONCURRENCY, max_waiting=config.POSTER_JOB_QUEUE_LIMIT)
+        self._refresh_tasks: dict[str, asyncio.Task] = {}
+        # 公式サイトの連続障害時にスクレイピングを一時停止するブレーカー
+        self.scrape_breaker = CircuitBreaker(
+            'キャラクター情報の取得',
+            failure_threshold=config.POSTER_BREAKER_FAILURES,
+            reset_timeout=config.POSTER_BREAKER_RESET_SEC,
+        )
+        self._degraded_count = 0
+        # 出力形式（サーバーごとの既定値は data/config.json の poster セクションに保存）とエンコード結果の集計
+        self.default_profile = self._validated_profile(config.POSTER_ENCODING_PROFILE)
+        self.guild_profiles = self._load_guild_profiles()
+        self.encode_stats = EncodeStats()
+        # 画像・情報の取得から描画・完成画像キャッシュへの保存まで（描画サービスと共通）
+        self.pipeline = PosterPipeline(
+            self.image_store, self.render_pool, self.output_cache, self.assets, self.encode_stats
+        )
+        # 送信済みポスターの添付URL（同じ画像はアップロードし直さず、このURLを埋め込みで示す）
+        self.upload_index = UploadIndex(config.POSTER_UPLOAD_INDEX_PATH, max_entries=config.POSTER_UPLOAD_INDEX_SIZE)
+        # ジョブごとのプレビュー（下書き画像）の受け渡し先と、最初の画像・完成までの所要時間（直近分）
+        self._previews: dict[tuple, asyncio.Future] = {}
+        self._first_image_seconds: collections.deque = collections.deque(maxlen=200)
+        self._total_seconds: collections.deque = collections.deque(maxlen=200)
+        self._previews_shown = 0
+        # 描画サービスのノードが指定されていれば、画像・情報の取得と描画・エンコードはそちらに依頼する
+        self.render_client: RenderClient | None = None
+        if config.POSTER_RENDER_NODES:
+            self.render_client = RenderClient(
+                config.POSTER_RENDER_NODES,
+                timeout=config.POSTER_DEADLINE_SEC + 10,
+                health_interval=config.POSTER_RENDER_HEALTH_SEC,
+            )
         logger.info("Poster が初期化されました")
+
+    @staticmethod
+    def _validated_profile(name: str) -> str:
+        try:
+            return resolve_profile(name).name
+        except ValueError as e:
+            logger.warning(f"{e}。{DEFAULT_PROFILE} を使用します")
+            return DEFAULT_PROFILE
+
+    def _load_guild_profiles(self) -> dict[str, str]:
+        stored = config.get_runtime_section("poster").get("guild_profiles")
+        if not isinstance(stored, dict):
+            return {}
+        return {str(guild_id): name for guild_id, name in stored.items() if name in PROFILES}
+
+    def _persist_guild_profiles(self) -> None:
+        try:
+            settings = config.get_runtime_section("poster")
+            settings["guild_profiles"] = self.guild_profiles
+            config.set_runtime_section("poster", settings)
+        except Exception as exc:
+            logger.error("ポスター設定の保存に失敗しました: %s", exc, exc_info=True)
+
+    def _profile_for(self, interaction: discord.Interaction, requested: str | None) -> str:
+        """使うエンコード設定（コマンドでの指定 → サーバーの既定値 → 環境変数の既定値）"""
+        if requested:
+            return resolve_profile(requested).name
+        if interaction.guild is not None:
+            return self.guild_profiles.get(str(interaction.guild.id), self.default_profile)
+        return self.default_profile
+
+    @staticmethod
+    def _upload_budget(interaction: discord.Interaction) -> int:
+        """出力サイズの上限（設定値と、サーバーの添付ファイル上限の小さい方。0で無制限）"""
+        budget = max(0, config.POSTER_UPLOAD_BUDGET_MB) * 1024 * 1024
+        guild_limit = getattr(interaction.guild, 'filesize_limit', 0) if interaction.guild is not None else 0
+        if isinstance(guild_limit, int) and guild_limit > 0:
+            budget = min(budget, guild_limit) if budget else guild_limit
+        return budget
+
+    def _create_driver(self):
+        """Chromeを起動し、プロセス監視の対象に登録する（ブロッキング）"""
+        driver = create_chrome_driver()
+        self.supervisor.track(driver)
+        return driver
+
+    def _prepare_drivers(self) -> None:
+        """描画ワーカーを起動し、前回の取り残しを回収してからドライバプールを温める（ブロッキング）"""
+        self.render_pool.start()
+        self.supervisor.reap_orphans()
+        if config.POSTER_DRIVER_WARMUP:
+            self.driver_pool.warm()
+
+    async def cog_load(self):
+        """コグ読み込み時に孤児プロセスを回収し、ドライバプールをウォームアップする（起動を待たずに続行）
+
+        描画サービスを使う場合は、描画ワーカー・Chrome を起動せずにノードの死活確認だけを始める。
+        """
+        if self.render_client is not None:
+            self.render_client.start()
+            return
+        self._warmup_task = asyncio.create_task(asyncio.to_thread(self._prepare_drivers))
+
+    async def cog_unload(self):
+        """コグ解放時にプール内のChromeを終了する"""
+        if self._warmup_task and not self._warmup_task.done():
+            self._warmup_task.cancel()
+        if self.orphan_sweep.is_running():
+            self.orphan_sweep.cancel()
+        for task in self._refresh_tasks.values():
+            task.cancel()
+        self.jobs.cancel_all()
+        if self._http_session and not self._http_session.closed:
+            await self._http_session.close()
+        if self.render_client is not None:
+            await self.render_client.close()
+        await asyncio.to_thread(self.driver_pool.close)
+        self.render_pool.close()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if not self._sweep_task_started:
+            self.orphan_sweep.start()
+            self._sweep_task_started = True
+
+    @tasks.loop(minutes=config.POSTER_ORPHAN_SWEEP_MINUTES)
+    async def orphan_sweep(self):
+        """取り残された chromedriver / Chrome を定期的に回収する"""
+        try:
+            await asyncio.to_thread(self.supervisor.reap_orphans)
+        except Exception as e:
+            logger.error(f"孤児プロセスの回収に失敗: {e}", exc_info=True)
+
+    def _get_http_session(self) -> aiohttp.ClientSession:
+        """HTTP取得用の共有セッションを返す（未作成・クローズ済みなら作り直す）"""
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = aiohttp.ClientSession()
+        return self._http_session
     
-    def _check_assets(self):
-        """オプション画像アセットの存在を確認し、情報を出力する"""
-        optional_assets = {
-            'mask.png': self.mask_path,
-            'peaceful.png': self.peaceful_path,
-            'brave.png': self.brave_path,
-            'glory.png': self.glory_path,
-            'freedom.png': self.freedom_path,
-        }
-        
-        missing = []
-        for name, path in optional_assets.items():
-            if not os.path.exists(path):
-                missing.append(name)
-        
-        if missing:
-            logger.info("ℹ️ 以下のオプション画像アセットが見つかりません（処理は続行されます）:")
-            for item in missing:
-                logger.info(f"  - {item}")
-            logger.info("必要に応じて data/assets/ ディレクトリに画像ファイルを配置してください。")
-    def _try_load_font(self, prefer_path: str, size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
-        """フォントを安全に読み込む。存在しない場合は自動ダウンロードまたはシステムフォントにフォールバック。
-
-        優先順:
-        1) config で指定されたパス（相対の場合はリポジトリルートや data/fonts も探索）
-        2) システムの既存日本語フォント（Windows/Linux 共通）
-        3) Noto Sans JP を Google Fonts からダウンロード（data/fonts/ にキャッシュ）
-        4) PIL のデフォルトフォント
+    def _scrape_character_info(self, character_id: str, timeout: float | None = None) -> dict:
+        """Seleniumでキャラクター情報をスクレイピングする（同期メソッド、別スレッドで呼び出す）
+
+        ドライバはプールから借りて使い回す。
+
+        Args:
+            character_id: キャラクターID
+            timeout: 貸し出し待ち・ページ読み込み・要素待ちそれぞれの上限（秒、省略時は従来の値）
+
+        Returns:
+            キャラクター情報の辞書
+
+        Raises:
+            Exception: スクレイピングに失敗した場合
         """
-        candidates = []
-        repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-        
-        # まず指定パス
-        if prefer_path:
-            candidates.append(prefer_path)
-            if not os.path.isabs(prefer_path):
-                candidates.append(os.path.join(repo_root, prefer_path))
-                candidates.append(os.path.join(repo_root, 'data', 'fonts', prefer_path))
-
-        # システムフォント候補（環境に応じて最適化）
-        is_linux = platform.system() == "Linux"
-        if is_linux:
-            # Linux環境のフォントパス
-            system_fonts = [
-                "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
-                "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
-                "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-                "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
-            ]
-        else:
-            # Windows環境のフォントパス
-            system_fonts = [
-                r"C:\Windows\Fonts\meiryo.ttc",
-                r"C:\Windows\Fonts\msgothic.ttc",
-                r"C:\Windows\Fonts\YuGothM.ttc",
-            ]
-        candidates.extend(system_fonts)
-
-        # 既存候補を試す
-        for path in candidates:
-            try:
-                if os.path.exists(path):
-                    return ImageFont.truetype(path, size)
-            except Exception:
-                continue
+        logger.info(f"キャラクター情報のスクレイピングを開始します: character_id={character_id}")
+        with self.driver_pool.lease(timeout) as driver, self.supervisor.limit(driver):
+            started = time.perf_counter()
+            info = scrape_character_info_selenium(driver, character_id, timeout)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            transferred, requests = measure_transfer(driver)
+            logger.info(
+                f"キャラクター情報のスクレイピングが完了しました: character_id={character_id}, "
+                f"{elapsed_ms:.0f}ms, 転送量={transferred / 1024:.1f}KB, リクエスト数={requests}"
+            )
+            return info
 
-        # ここまで見つからなければ Noto Sans JP を自動ダウンロード
-        downloaded_font = self._download_fallback_font()
-        if downloaded_font and os.path.exists(downloaded_font):
-            try:
-                return ImageFont.truetype(downloaded_font, size)
-            except Exception:
-                pass
+    async def _fetch_character_info(self, character_id: str, timeout: float | None = None) -> tuple[dict, str]:
+        """サーキットブレーカーと制限時間つきでキャラクター情報を取得する
 
-        # 最終手段: PIL デフォルト
-        logger.warning("フォントを読み込めませんでした。PILのデフォルトフォントを使用します。")
-        return ImageFont.load_default()
+        連続で失敗している間は公式サイトへアクセスせず、即座に CircuitOpenError を送出する。
 
-    def _download_fallback_font(self) -> str:
-        """Google Fonts から Noto Sans JP をダウンロードし、data/fonts/ にキャッシュする。
+        Args:
+            character_id: キャラクターID
+            timeout: 取得全体の制限時間（秒、省略時は無制限）
 
         Returns:
-            str: ダウンロードしたフォントファイルのパス。失敗時は空文字列。
+            (キャラクター情報, 取得経路 'http' または 'selenium')
+
+        Raises:
+            CircuitOpenError: ブレーカーが開いている場合
+            asyncio.TimeoutError: 制限時間内に取得できなかった場合
+            Exception: すべての経路で取得に失敗した場合
         """
-        repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-        fonts_dir = os.path.join(repo_root, 'data', 'fonts')
-        os.makedirs(fonts_dir, exist_ok=True)
-        
-        font_path = os.path.join(fonts_dir, 'NotoSansJP-Regular.ttf')
-        
-        # すでにダウンロード済みならそれを返す
-        if os.path.exists(font_path):
-            return font_path
-        
-        # Google Fonts の直リンク（Noto Sans JP Regular）
-        # 注：このURLは変わる可能性があるため、本番では fonts.google.com API や CDN を利用推奨
-        font_url = "https://github.com/google/fonts/raw/main/ofl/notosansjp/NotoSansJP%5Bwght%5D.ttf"
-        
+        self.scrape_breaker.before_call()
         try:
-            logger.info("フォントが見つからないため、Noto Sans JP をダウンロードします: %s", font_url)
-            urllib.request.urlretrieve(font_url, font_path)
-            logger.info("フォントをダウンロードしました: %s", font_path)
-            return font_path
-        except Exception as e:
-            logger.error("フォントのダウンロードに失敗しました: %s", e)
-            return ""
+            result = await asyncio.wait_for(self._fetch_from_site(character_id, timeout), timeout)
+        except asyncio.CancelledError:
+            # 取り消された試行が半開状態の枠を持ったままにならないようにする
+            self.scrape_breaker.record_cancelled()
+            raise
+        except Exception:
+            self.scrape_breaker.record_failure()
+            raise
+        self.scrape_breaker.record_success()
+        return result
+
+    async def _fetch_from_site(self, character_id: str, timeout: float | None = None) -> tuple[dict, str]:
+        """設定された方式でキャラクター情報を取得する
+
+        auto モードではまずHTTPで取得し、名前が取れなかった場合のみSeleniumにフォールバックする。
 
-    def _draw_text_with_glow(self, draw: ImageDraw.Draw, text: str, x: int, y: int, 
-                             font: ImageFont.FreeTypeFont, glow_layers: list, 
-                             main_color: tuple = (255, 255, 255)) -> None:
-        """
-        グロー（光彩）効果付きでテキストを描画する
-        
         Args:
-            draw: ImageDrawオブジェクト
-            text: 描画するテキスト
-            x: X座標
-            y: Y座標
-            font: フォント
-            glow_layers: グロー効果のレイヤー設定 [(radius, (r, g, b, a)), ...]
-            main_color: メインテキストの色 (デフォルト: 白)
-        """
-        # グロー効果を描画
-        for radius, color in glow_layers:
-            for angle in range(0, 360, 30):  # 12方向
-                dx = int(radius * math.cos(math.radians(angle)))
-                dy = int(radius * math.sin(math.radians(angle)))
-                draw.text((x + dx, y + dy), text, fill=color, font=font)
-        
-        # 本体を描画
-        draw.text((x, y), text, fill=main_color, font=font)
-
-    def _draw_poster(self, char, mask, info):
-        """
-        新仕様：1600×2100pxのポスター画像を生成
+            character_id: キャラクターID
+            timeout: Selenium側に渡す待ち時間の上限（秒）
+
+        Returns:
+            (キャラクター情報, 取得経路 'http' または 'selenium')
+
+        Raises:
+            Exception: すべての経路で取得に失敗した場合
         """
-        
-        # 1. 1600×2100pxのキャンバスを生成
-        canvas = Image.new('RGB', (1600, 2100), color=(255, 255, 255))
-        draw = ImageDraw.Draw(canvas)
-        
-        # 2. キャラクター画像を上揃えで配置（1600×1600にリサイズ）
-        char_resized = char.resize((1600, 1600))
-        canvas.paste(char_resized, (0, 0))
-        
-        # 3. マスク画像の適用（存在する場合）
-        # 仕様: キャラクター画像と文字（および後続の描画）との間に重ねる
-        # マスクはキャンバス全体(1600x2100)にフィット
-        if mask and os.path.exists(self.mask_path):
+        mode = config.POSTER_SCRAPE_MODE
+        if mode in ('auto', 'http'):
+            started = time.perf_counter()
             try:
-                mask_resized = mask.resize((1640, 2140))
-                # 透明PNGをそのままオーバーレイ
-                canvas.paste(mask_resized, (-20, -20), mask_resized)
+                info = await fetch_character_info_http(self._get_http_session(), character_id)
             except Exception as e:
-                logger.warning(f"マスク適用に失敗: {e}")
-        
-        # フォント読み込み
-        font_name = self._try_load_font(config.POSTER_FONT_C, 80)
-        
-        # 国旗画像の読み込み（描画はテキストの直前に行う）
-        country_raw = info.get('country', '') or ''
-        country_clean = country_raw.strip()
-        flag_img = None
-        if country_clean:
-            # 探索候補: 元文字列, lower, title, capitalize
-            variants = []
-            seen = set()
-            for v in [country_clean, country_clean.lower(), country_clean.title(), country_clean.capitalize()]:
-                if v and v not in seen:
-                    variants.append(v)
-                    seen.add(v)
-            assets_dir = os.path.join(os.path.dirname(__file__), '..', 'data', 'assets')
-            for base in variants:
-                candidate = os.path.join(assets_dir, f"{base}.png")
-                if os.path.exists(candidate):
-                    try:
-                        flag_img = Image.open(candidate)
-                        logger.info(f"国旗画像を読み込みました: {candidate}")
-                        break
-                    except Exception as e:
-                        logger.warning(f"国旗画像の読み込みに失敗 ({candidate}): {e}")
-        
-        # 6. セリフ（lines）を縦書きで右揃え（50, 100）から（350, 1400）に列折り返し表示
-        lines_text = info.get('lines', '')
-        if lines_text:
-            # lines用のフォントサイズを文字数に応じて調整
-            lines_length = len(lines_text)
-            if lines_length <= 8:
-                font_lines = self._try_load_font(config.POSTER_FONT_D, 120)
-            elif lines_length <= 12:
-                font_lines = self._try_load_font(config.POSTER_FONT_D, 100)
-            else:
-                font_lines = self._try_load_font(config.POSTER_FONT_D, 80)
-            
-            # 表示領域
-            x_left, x_right = 50, 350
-            y_top, y_bottom = 100, 1400
-            column_gap = 10
-
-            # フィットするまでフォントサイズを下げて試す（最大120 → 最小40）
-            chosen = None
-            for size in [120, 110, 100, 90, 80, 70, 60, 50, 40]:
-                f = self._try_load_font(config.POSTER_FONT_D, size)
-                # 代表文字でサイズ計測（縦書き用の概算）
-                sample_bbox = draw.textbbox((0, 0), '漢', font=f)
-                char_w = sample_bbox[2] - sample_bbox[0]
-                char_h = sample_bbox[3] - sample_bbox[1]
-                char_spacing = int(char_h * 1.05)
-
-                # 1列に入る行数と必要列数
-                rows_per_col = max(1, (y_bottom - y_top) // char_spacing)
-                needed_cols = (len(lines_text) + rows_per_col - 1) // rows_per_col
-                max_cols = max(1, (x_right - x_left) // (char_w + column_gap))
-
-                if needed_cols <= max_cols:
-                    chosen = (f, char_w, char_h, char_spacing, rows_per_col)
-                    break
-
-            # それでも入らなければ、最小サイズで詰め込み（はみ出しは許容せず省略しないよう列幅計算を緩める）
-            if not chosen:
-                f = self._try_load_font(config.POSTER_FONT_D, 40)
-                sample_bbox = draw.textbbox((0, 0), '漢', font=f)
-                char_w = sample_bbox[2] - sample_bbox[0]
-                char_h = sample_bbox[3] - sample_bbox[1]
-                char_spacing = int(char_h * 0.95)
-                rows_per_col = max(1, (y_bottom - y_top) // char_spacing)
-                chosen = (f, char_w, char_h, char_spacing, rows_per_col)
-
-            font_lines, char_w, char_h, char_spacing, rows_per_col = chosen
-
-            # 右端から左方向へ列を積む
-            col = 0
-            x_col_right = x_right - col * (char_w + column_gap)
-            y_cursor = y_top
-            for idx, ch in enumerate(lines_text):
-                # 改行判定（列折り返し）
-                if (idx > 0) and (idx % rows_per_col == 0):
-                    col += 1
-                    x_col_right = x_right - col * (char_w + column_gap)
-                    y_cursor = y_top
-
-                # 列が領域外に出たら終了（理論上、フォント調整で入る想定）
-                if x_col_right - char_w < x_left:
-                    break
-
-                # 各文字の実幅で右揃えオフセット調整
-                cb = draw.textbbox((0, 0), ch, font=font_lines)
-                cw = cb[2] - cb[0]
-                x_draw = x_col_right - cw
-                y_draw = y_cursor
-
-                # グロー（光彩）効果付きで描画
-                glow_layers = [
-                    (8, (80, 80, 80, 255)),    # 最外層
-                    (6, (95, 95, 95, 255)),    # 外層
-                    (4, (110, 110, 110, 255)), # 中層
-                    (2, (130, 130, 130, 255)), # 内層
-                ]
-                self._draw_text_with_glow(draw, ch, x_draw, y_draw, font_lines, glow_layers)
-
-                y_cursor += char_spacing
-        
-        # 7. 名前を中央揃え（100, 1400）から（1500, 1500）
-        name = info.get('name', '')
-        if name:
-            # テキストサイズを取得して中央揃え
-            bbox = draw.textbbox((0, 0), name, font=font_name)
-            text_width = bbox[2] - bbox[0]
-            x_center = 100 + (1400 - text_width) // 2
-            y_pos = 1420
-
-            # グロー（光彩）効果付きで描画
-            glow_layers = [
-                (8, (80, 80, 80, 255)),    # 最外層
-                (6, (95, 95, 95, 255)),    # 外層
-                (4, (110, 110, 110, 255)), # 中層
-                (2, (130, 130, 130, 255)), # 内層
-            ]
-            self._draw_text_with_glow(draw, name, x_center, y_pos, font_name, glow_layers)
-        
-        # 目標（goal）を領域中央揃えで配置（850, 1500）から（1550, 2050）
-        goal = info.get('goal', '')
-        if goal:
-            # 領域定義
-            goal_x_left, goal_x_right = 850, 1550
-            goal_y_top, goal_y_bottom = 1500, 2050
-            goal_width = goal_x_right - goal_x_left
-            goal_height = goal_y_bottom - goal_y_top
-            
-            # 最大80pxから順にサイズを試して、領域に収まる最大サイズを見つける
-            best_font = None
-            best_lines = []
-            best_total_height = 0
-
-            for font_size in range(80, 19, -5):  # 80→75→70...→20
-                test_font = self._try_load_font(config.POSTER_FONT_A, font_size)
-                line_height = int(font_size * 1.3)
-                
-                # テキストを行に分割
-                lines = []
-                current_line = ""
-                
-                for ch in goal:
-                    test_line = current_line + ch
-                    bbox = draw.textbbox((0, 0), test_line, font=test_font)
-                    line_width = bbox[2] - bbox[0]
-                    
-                    if line_width > goal_width:
-                        if current_line:
-                            lines.append(current_line)
-                            current_line = ch
-                        else:
-                            # 1文字でも幅を超える場合はそのまま追加
-                            lines.append(ch)
-                            current_line = ""
-                    else:
-                        current_line = test_line
-                
-                if current_line:
-                    lines.append(current_line)
-                
-                # 総高さチェック
-                total_height = len(lines) * line_height
-                
-                if total_height <= goal_height:
-                    best_font = test_font
-                    best_lines = lines
-                    best_total_height = total_height
-                    best_line_height = line_height
-                    break
-            
-            # フォントが見つからない場合は最小サイズで強制的に描画
-            if not best_font:
-                best_font = self._try_load_font(config.POSTER_FONT_A, 20)
-                best_line_height = 26
-                best_lines = []
-                current_line = ""
-                
-                for ch in goal:
-                    test_line = current_line + ch
-                    bbox = draw.textbbox((0, 0), test_line, font=best_font)
-                    line_width = bbox[2] - bbox[0]
-                    
-                    if line_width > goal_width:
-                        if current_line:
-                            best_lines.append(current_line)
-                            current_line = ch
-                        else:
-                            best_lines.append(ch)
-                            current_line = ""
-                    else:
-                        current_line = test_line
-                
-                if current_line:
-                    best_lines.append(current_line)
-                
-                best_total_height = len(best_lines) * best_line_height
-            
-            # 垂直方向の中央揃え
-            y_offset = (goal_height - best_total_height) // 2
-            y_current = goal_y_top + y_offset
-            
-            # 各行を描画（水平方向も中央揃え）
-            for line in best_lines:
-                bbox = draw.textbbox((0, 0), line, font=best_font)
-                line_width = bbox[2] - bbox[0]
-                x_centered = goal_x_left + (goal_width - line_width) // 2
-
-                # グロー（光彩）効果付きで描画（青み系）
-                glow_layers = [
-                    (8, (100, 100, 150, 255)),  # 最外層（薄い青み）
-                    (6, (120, 120, 170, 255)),  # 外層
-                    (4, (140, 140, 190, 255)),  # 中層
-                    (2, (160, 160, 210, 255)),  # 内層
-                ]
-                self._draw_text_with_glow(draw, line, x_centered, y_current, best_font, glow_layers)
-
-                y_current += best_line_height
-        
-        # その他の情報をテーブル形式で配置（50, 1500）から（800, 2100）
-        info_items = [
-            ('スキル', info.get('skill', '')),
-            ('センスタイプ', info.get('sencetype', '')),
-            ('性格', info.get('personality', '')),
-            ('ジルパワー', info.get('zirpower', '')),
-            ('ジルコンギア', info.get('zircongear', '')),
-            ('一人称', info.get('firstperson', '')),
-            ('愛称/ニックネーム', info.get('nickname', '')),
-            ('弱み', info.get('weakness', ''))
-        ]
-        
-        x_start = 50
-        y_start = 1520
-        row_height = 65
-        label_width = 250
-        value_width = 500
-        font_table = self._try_load_font(config.POSTER_FONT_A, 24)
-        
-        for i, (label, value) in enumerate(info_items):
-            y_pos = y_start + i * row_height
-            if y_pos + row_height > 2080:
-                break
-            
-            # ラベル部分（背景黒）
-            draw.rectangle([(x_start, y_pos), (x_start + label_width, y_pos + row_height - 5)],
-                          fill=(30, 30, 30))
-            draw.text((x_start + 10, y_pos + 15), label, fill=(255, 255, 255), font=font_table)
-            
-            # 値部分（背景グレー）
-            draw.rectangle([(x_start + label_width, y_pos), 
-                          (x_start + label_width + value_width, y_pos + row_height - 5)],
-                          fill=(120, 120, 120))
-            
-            # 値を折り返して表示（2行まで、省略せず全表示）
-            pad_x = 10
-            avail_w = value_width - pad_x * 2
-            max_font, min_font = 24, 12
-
-            def wrap_text_two_lines(txt: str, font: ImageFont.FreeTypeFont, max_width: int):
-                lines = []
-                current = ""
-                for ch in txt:
-                    test = current + ch
-                    bbox = draw.textbbox((0, 0), test, font=font)
-                    w = bbox[2] - bbox[0]
-                    if w > max_width and current:
-                        lines.append(current)
-                        current = ch
-                        if len(lines) >= 2:
-                            # 2行を超えそうなら即終了して多いことを示す
-                            # 呼び出し側でフォントサイズを下げる
-                            # ここでは3行目に入れず返す
-                            # currentは次の判定へ
-                            pass
-                    else:
-                        current = test
-                if current:
-                    lines.append(current)
-                return lines
-
-            chosen_font = None
-            chosen_lines = None
-            chosen_line_h = None
-
-            for size in range(max_font, min_font - 1, -2):
-                f = self._try_load_font(config.POSTER_FONT_A, size)
-                line_h = int(size * 1.2)
-                lines = wrap_text_two_lines(value, f, avail_w)
-                if len(lines) <= 2 and (len(lines) * line_h) <= (row_height - 10):
-                    chosen_font = f
-                    chosen_lines = lines
-                    chosen_line_h = line_h
-                    break
-
-            # まだ2行に収まらない場合は最小サイズで2行に均等分割
-            if chosen_font is None:
-                size = min_font
-                chosen_font = self._try_load_font(config.POSTER_FONT_A, size)
-                chosen_line_h = int(size * 1.2)
-                # 幅を見ながら、だいたい半分で分割して2行に
-                mid = len(value) // 2
-                # 左右の幅が近くなる位置を探索
-                best_split = mid
-                best_diff = 10**9
-                for i in range(max(1, mid - 10), min(len(value) - 1, mid + 10)):
-                    left = value[:i]
-                    right = value[i:]
-                    w1 = draw.textbbox((0, 0), left, font=chosen_font)[2]
-                    w2 = draw.textbbox((0, 0), right, font=chosen_font)[2]
-                    if w1 <= avail_w and w2 <= avail_w:
-                        diff = abs(w1 - w2)
-                        if diff < best_diff:
-                            best_diff = diff
-                            best_split = i
-                chosen_lines = [value[:best_split], value[best_split:]]
-
-            # 垂直方向センタリング
-            total_h = len(chosen_lines) * chosen_line_h
-            y_text = y_pos + (row_height - total_h) // 2
-
-            for line in chosen_lines:
-                # 水平センタリングではなく左寄せ（表っぽさ維持）
-                x_text = x_start + label_width + pad_x
-                draw.text((x_text, y_text), line, fill=(255, 255, 255), font=chosen_font)
-                y_text += chosen_line_h
-            
-            # 縦罫線
-            draw.line([(x_start + label_width, y_pos), 
-                      (x_start + label_width, y_pos + row_height - 5)],
-                     fill=(255, 255, 255), width=2)
-        
-        # 国旗画像の配置（1200, 1200）を左上として横幅300pxで配置
-        # 最終レイヤー: すべての要素の上に重ねる
-        if flag_img:
+                if mode == 'http':
+                    raise
+                logger.warning(f"HTTPでの取得に失敗したためSeleniumで再試行します: character_id={character_id}, {e}")
+                info = {}
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if is_complete(info):
+                self._scrape_sources['http'] += 1
+                logger.info(f"キャラクター情報をHTTPで取得しました: character_id={character_id}, {elapsed_ms:.0f}ms")
+                return info, 'http'
+            if mode == 'http':
+                raise ValueError(f"HTTPで取得したページにステータス欄がありません: character_id={character_id}")
+            logger.info(f"HTTPで項目が取れなかったためSeleniumにフォールバックします: character_id={character_id}")
+
+        started = time.perf_counter()
+        info = await asyncio.to_thread(self._scrape_character_info, character_id, timeout)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if not is_complete(info):
+            # ステータス欄の待ちがタイムアウトすると空の項目が返るため、失敗として扱う（キャッシュにも保存しない）
+            raise ValueError(f"Seleniumで取得したページにステータス欄がありません: character_id={character_id}")
+        self._scrape_sources['selenium'] += 1
+        logger.info(f"キャラクター情報をSeleniumで取得しました: character_id={character_id}, {elapsed_ms:.0f}ms")
+        return info, 'selenium'
+
+    async def _get_character_info(self, character_id: str, timeout: float | None = None) -> tuple[dict, str]:
+        """キャッシュを優先してキャラクター情報を取得する
+
+        - 新鮮なキャッシュがあればそのまま返す
+        - TTL切れのキャッシュは即座に返し、裏で再取得してキャッシュを更新する
+        - キャッシュが無ければ取得してから保存する（timeout はこの取得の制限時間）
+
+        Returns:
+            (キャラクター情報, 取得経路 'cache' / 'cache-stale' / 'http' / 'selenium')
+        """
+        entry = await asyncio.to_thread(self.info_cache.get, character_id)
+        if entry is not None:
+            if entry.stale:
+                self._schedule_info_refresh(character_id)
+                logger.info(f"期限切れのキャッシュを返し、裏で再取得します: character_id={character_id}")
+                return entry.info, 'cache-stale'
+            logger.info(f"キャラクター情報をキャッシュから取得しました: character_id={character_id}")
+            return entry.info, 'cache'
+
+        info, source = await self._fetch_character_info(character_id, timeout)
+        await asyncio.to_thread(self.info_cache.put, character_id, info)
+        return info, source
+
+    def _schedule_info_refresh(self, character_id: str) -> None:
+        """キャラクター情報の再取得をバックグラウンドで起動する（同じIDは重複させない）"""
+        if character_id in self._refresh_tasks:
+            return
+
+        async def refresh():
             try:
-                flag_width, flag_height = flag_img.size
-                # 横幅300pxに固定、アスペクト比維持
-                target_width = 300
-                ratio = target_width / flag_width
-                new_height = int(flag_height * ratio)
-                new_size = (target_width, new_height)
-                flag_resized = flag_img.resize(new_size, Image.Resampling.LANCZOS)
-                
-                # 左上が(1200, 1200)となるように配置
-                flag_x = 1200
-                flag_y = 1200
-                
-                # アルファチャンネルがあればそれを使って合成、なければそのまま貼り付け
-                if flag_resized.mode == 'RGBA':
-                    canvas.paste(flag_resized, (flag_x, flag_y), flag_resized)
-                else:
-                    canvas.paste(flag_resized, (flag_x, flag_y))
-                    
-                logger.info(f"国旗画像を配置しました: 位置=({flag_x}, {flag_y}), サイズ={new_size}")
+                info, _ = await self._fetch_character_info(character_id, config.POSTER_STAGE_TIMEOUTS['scrape'])
+                await asyncio.to_thread(self.info_cache.put, character_id, info)
+                logger.info(f"キャラクター情報のキャッシュを更新しました: character_id={character_id}")
             except Exception as e:
-                logger.warning(f"国旗画像の配置に失敗: {e}")
-                import traceback
-                logger.warning(traceback.format_exc())
-        else:
-            logger.info(f"国旗画像が見つかりませんでした。country={country_clean}")
-        
-        return canvas
+                logger.warning(f"キャラクター情報の再取得に失敗しました（古いキャッシュを維持）: character_id={character_id}, {e}")
+            finally:
+                self._refresh_tasks.pop(character_id, None)
 
-    def _scrape_character_info(self, character_id: str) -> dict:
-        """Seleniumでキャラクター情報をスクレイピングする（同期メソッド、別スレッドで呼び出す）
+        self._refresh_tasks[character_id] = asyncio.create_task(refresh())
+
+    @app_commands.command(
+        name="poster", 
+        description="キャラクターポスターを作成します"
+    )
+    @app_commands.describe(
+        character_id="キャラクターIDを入力してください",
+        format="出力形式（省略時はサーバーの設定）",
+    )
+    @app_commands.choices(format=_PROFILE_CHOICES)
+    async def poster(self, interaction: discord.Interaction, character_id: str, format: str | None = None):
+        started = time.monotonic()
+        profile = self._profile_for(interaction, format)
+        max_bytes = self._upload_budget(interaction)
+        key = (character_id, profile, max_bytes)
+        # 相乗りした呼び出し元にも同じプレビューを渡すため、ジョブより先に受け渡し先を用意する
+        preview = None
+        registered = False
+        if config.POSTER_PREVIEW and self.render_client is None:
+            preview = self._previews.get(key)
+            if preview is None:
+                preview = self._previews[key] = asyncio.get_running_loop().create_future()
+                registered = True
+        # 同じキャラクター・同じ出力形式の作成中・順番待ちのジョブがあれば相乗りし、無ければ順番待ちに並べる
+        try:
+            ticket = self.jobs.submit(key, functools.partial(self._build_poster, character_id, profile, max_bytes, preview))
+        except JobQueueFullError as e:
+            logger.warning(f"ポスター作成の待ちが上限に達しています: {e}")
+            if registered:
+                self._previews.pop(key, None)
+            await interaction.response.send_message(
+                "ただいま混み合っています。しばらくしてから再度お試しください。", ephemeral=True
+            )
+            return
+        if ticket.shared and registered:
+            # 相乗りした先はプレビュー無しのジョブ（/poster_batch）なので、用意した受け渡し先は使われない
+            self._previews.pop(key, None)
+            preview = None
+        await interaction.response.send_message(self._queue_message(ticket))
+
+        result = asyncio.ensure_future(ticket.result())
+        # 完成版より先に下書きができたら、受付メッセージを下書き画像に差し替える
+        preview_shown = False
+        first_image = None
+        if preview is not None:
+            await asyncio.wait({result, preview}, return_when=asyncio.FIRST_COMPLETED)
+            if not result.done() and preview.result() is not None:
+                preview_shown = await self._show_preview(interaction, character_id, preview.result())
+                if preview_shown:
+                    first_image = time.monotonic() - started
+
+        try:
+            img_bytes, degraded = await result
+        except PosterJobError as e:
+            await self._clear_preview(interaction, preview_shown)
+            await interaction.followup.send(e.user_message, ephemeral=True)
+            return
+        except Exception as e:
+            logger.error(f"予期せぬエラー: {e}")
+            logger.error(traceback.format_exc())
+            await self._clear_preview(interaction, preview_shown)
+            await interaction.followup.send("エラーが発生しました。管理者に連絡してください。", ephemeral=True)
+            return
+
+        # ポスター画像をユーザーに送信（相乗りした呼び出し元にもそれぞれ送る）
+        try:
+            content = f"✅ キャラクター #{character_id} のポスターが完成しました！"
+            if degraded:
+                content += "\n⚠️ 公式サイトからキャラクター情報を取得できなかったため、画像のみで作成しました。"
+            await self._send_poster(interaction, character_id, img_bytes, content, edit=preview_shown)
+        except Exception as e:
+            logger.error(f"Discordへの画像送信に失敗: {e}")
+            await self._clear_preview(interaction, preview_shown)
+            await interaction.followup.send("画像の送信に失敗しました。管理者に連絡してください。", ephemeral=True)
+            return
+        total = time.monotonic() - started
+        if first_image is None:
+            first_image = total
+        self._first_image_seconds.append(first_image)
+        self._total_seconds.append(total)
+        logger.info(
+            f"ポスターを送信しました: character_id={character_id}, "
+            f"first_image={first_image:.1f}s{' (preview)' if preview_shown else ''}, total={total:.1f}s"
+        )
+
+    async def _show_preview(self, interaction: discord.Interaction, character_id: str, draft: bytes) -> bool:
+        """受付メッセージを下書き画像に差し替える（失敗しても完成版の送信は続ける）"""
+        try:
+            await asyncio.wait_for(
+                interaction.edit_original_response(
+                    content=f"🖼️ キャラクター #{character_id} のプレビューです。高画質版を仕上げています…",
+                    attachments=[discord.File(io.BytesIO(draft), filename=f"poster_{character_id}_preview.jpg")],
+                ),
+                timeout=config.POSTER_STAGE_TIMEOUTS['upload'],
+            )
+        except Exception as e:
+            logger.warning(f"プレビューの送信に失敗: character_id={character_id}, {e}")
+            return False
+        self._previews_shown += 1
+        return True
+
+    @staticmethod
+    async def _clear_preview(interaction: discord.Interaction, preview_shown: bool) -> None:
+        """作成・送信に失敗した場合に、表示済みの下書き画像を取り下げる"""
+        if not preview_shown:
+            return
+        try:
+            await interaction.edit_original_response(content="ポスターを作成できませんでした。", attachments=[])
+        except Exception as e:
+            logger.warning(f"プレビューの取り下げに失敗: {e}")
+
+    async def _send_poster(self, interaction: discord.Interaction, character_id: str, img_bytes: bytes,
+                           content: str, edit: bool = False) -> None:
+        """ポスターを送信する。送信済みの同じ画像があり、そのURLがまだ有効なら埋め込みで示すだけにする。
+
+        Args:
+            edit: True なら新しく送らず、プレビューを表示している受付メッセージを完成版に差し替える
+        """
+        timeout = config.POSTER_STAGE_TIMEOUTS['upload']
+        digest = await asyncio.to_thread(content_hash, img_bytes)
+        if config.POSTER_UPLOAD_REUSE:
+            record = await asyncio.to_thread(self.upload_index.get, digest)
+            if record is not None:
+                if await is_url_alive(self._get_http_session(), record.url, config.POSTER_UPLOAD_CHECK_TIMEOUT):
+                    embed = discord.Embed(color=discord.Color.blue())
+                    embed.set_image(url=record.url)
+                    if record.guild_id is not None and record.guild_id == interaction.guild_id:
+                        embed.description = f"[最初の投稿]({record.jump_url})"
+                    if edit:
+                        send = interaction.edit_original_response(content=content, embed=embed, attachments=[])
+                    else:
+                        send = interaction.followup.send(content=content, embed=embed)
+                    await asyncio.wait_for(send, timeout=timeout)
+                    self.upload_index.record_reuse(record)
+                    logger.info(f"送信済みのポスターURLを再利用しました: character_id={character_id}")
+                    return
+                logger.info(f"送信済みのポスターURLが無効になっているため再アップロードします: character_id={character_id}")
+                await asyncio.to_thread(self.upload_index.forget, digest)
+
+        file = discord.File(io.BytesIO(img_bytes), filename=f"poster_{character_id}.{extension_for(img_bytes)}")
+        if edit:
+            send = interaction.edit_original_response(content=content, attachments=[file])
+        else:
+            send = interaction.followup.send(content=content, file=file, wait=True)
+        message = await asyncio.wait_for(send, timeout=timeout)
+        if message is not None and message.attachments:
+            await self._remember_upload(interaction, message, message.attachments[0], digest, len(img_bytes))
+
+    async def _remember_upload(self, interaction: discord.Interaction, message: discord.Message,
+                               attachment: discord.Attachment, digest: str, size: int) -> None:
+        """アップロードした添付ファイルのURLを、次回の再利用のために記録する"""
+        if not config.POSTER_UPLOAD_REUSE:
+            return
+        record = UploadRecord(
+            url=attachment.url,
+            channel_id=message.channel.id,
+            message_id=message.id,
+            guild_id=interaction.guild_id,
+            size=size,
+            uploaded_at=time.time(),
+        )
+        await asyncio.to_thread(self.upload_index.put, digest, record)
+
+    @staticmethod
+    def _queue_message(ticket: JobTicket) -> str:
+        """受付時に返す、待ち順と完成までの目安のメッセージ"""
+        eta = f"完成まで約{math.ceil(ticket.eta)}秒"
+        if ticket.shared:
+            return f"同じキャラクターのカードを作成中です。完成したらあわせてお送りします（{eta}）"
+        if ticket.position == 0:
+            return f"キャラクターカード作成中です（{eta}）"
+        return f"キャラクターカード作成の順番待ちです：{ticket.position}番目（{eta}）"
+
+    async def _build_poster(self, character_id: str, profile: str = DEFAULT_PROFILE, max_bytes: int = 0,
+                            preview: asyncio.Future | None = None) -> tuple[bytes, bool]:
+        """画像の取得・情報取得・描画を行い、ポスター画像を作る（ジョブキューから呼ばれる）
 
         Args:
             character_id: キャラクターID
+            profile: エンコードのプロファイル名
+            max_bytes: 出力サイズの上限（超えたら次のプロファイルに落とす、0で無制限）
+            preview: 指定すると、情報取得後に描いた下書き画像（できなければ None）を結果に入れる
 
         Returns:
-            キャラクター情報の辞書
+            (エンコード済みのポスター画像, 情報を取得できず画像のみで作成したか)
 
         Raises:
-            Exception: スクレイピングに失敗した場合
+            PosterJobError: 作成に失敗した場合（ユーザー向けのメッセージ付き）
         """
-        driver = None
         try:
-            # ChromeDriverのオプションを設定（ログ抑制）
-            chrome_options = Options()
-            chrome_options.add_argument('--disable-logging')  # ロギング無効化
-            chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])  # DevToolsログ抑制
-
-            # ヘッドレスモード（ブラウザウィンドウを開かない）
-            chrome_options.add_argument('--headless=new')
-            chrome_options.add_argument('--disable-gpu')  # GPU無効化（ヘッドレス環境で不要）
-
-            # サンドボックス・共有メモリ設定（全環境で有効化 — EC2等で必須）
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-
-            # メモリ管理オプション（EC2等の小規模インスタンス向け）
-            chrome_options.add_argument('--disable-extensions')  # 拡張機能無効化
-            chrome_options.add_argument('--disable-plugins')  # プラグイン無効化
-            chrome_options.add_argument('--blink-settings=imagesEnabled=false')  # 画像読み込み無効化（高速化）
-            chrome_options.add_argument('--disable-software-rasterizer')  # ソフトウェアラスタライザ無効化
-
-            # 追加の安定化オプション（リソース制約環境向け）
-            chrome_options.add_argument('--disable-background-networking')
-            chrome_options.add_argument('--disable-default-apps')
-            chrome_options.add_argument('--disable-sync')
-            chrome_options.add_argument('--disable-translate')
-            chrome_options.add_argument('--no-first-run')
-            chrome_options.add_argument('--window-size=1280,720')
-            chrome_options.add_argument('--disable-features=VizDisplayCompositor')
-
-            logger.info(f"Chromeドライバを起動します: character_id={character_id}")
-            driver = webdriver.Chrome(options=chrome_options)
-
-            # タイムアウト設定（リソース枯渇防止）
-            driver.set_page_load_timeout(30)  # ページ読み込みタイムアウト
-            driver.set_script_timeout(30)  # スクリプト実行タイムアウト
-            driver.implicitly_wait(5)  # 暗黙的待機
-
-            # キャラクターページURL（config.pyで一元管理）
-            character_page_url = config.get_character_page_url(character_id)
-            driver.get(character_page_url)
-
-            # WebDriverWaitで要素の読み込みを待機（time.sleepより効率的）
-            try:
-                WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "#root > main > div > section.status"))
-                )
-            except TimeoutException:
-                logger.warning(f"ページ読み込みタイムアウト: character_id={character_id}")
-                # タイムアウトでも続行を試みる
-
-            html = driver.page_source.encode("utf-8")
-            soup = BeautifulSoup(html, "html.parser")
-            selectors = {
-                'name': "#root > main > div > section.status > div > dl:nth-of-type(1) > dd > p",
-                'country': "#root > main > div > section.status > div > dl:nth-of-type(4) > dd > p",
-                'skill': "#root > main > div > section.status > div > dl:nth-of-type(5) > dd > p",
-                'sencetype': "#root > main > div > section.status > div > dl:nth-of-type(6) > dd > p",
-                'personality': "#root > main > div > section.status > div > dl:nth-of-type(7) > dd > p",
-                'goal': "#root > main > div > section.status > div > dl:nth-of-type(8) > dd > p",
-                'zirpower': "#root > main > div > section.status > div > dl:nth-of-type(9) > dd > p",
-                'zircongear': "#root > main > div > section.status > div > dl:nth-of-type(10) > dd > p",
-                'firstperson': "#root > main > div > section.status > div > dl:nth-of-type(11) > dd > p",
-                'nickname': "#root > main > div > section.status > div > dl:nth-of-type(12) > dd > p",
-                'lines': "#root > main > div > section.status > div > dl:nth-of-type(13) > dd > p",
-                'weakness': "#root > main > div > section.status > div > dl:nth-of-type(14) > dd > p"
-            }
+            if self.render_client is not None:
+                return await self._build_poster_remote(character_id, profile, max_bytes)
+            return await self._build_poster_stages(character_id, profile, max_bytes, preview)
+        finally:
+            if preview is not None:
+                if not preview.done():
+                    preview.set_result(None)
+                if self._previews.get((character_id, profile, max_bytes)) is preview:
+                    del self._previews[(character_id, profile, max_bytes)]
+
+    async def _build_poster_stages(self, character_id: str, profile: str, max_bytes: int,
+                                   preview: asyncio.Future | None) -> tuple[bytes, bool]:
+        # キャラ情報はキャッシュ → HTTP高速経路 → 必要ならSeleniumをスレッドプールで実行して取得する
+        async def get_info(cid: str, timeout: float | None) -> dict:
+            info, _ = await self._get_character_info(cid, timeout)
+            return info
+
+        # 完成版と並行して下書きを描き、先に届ける
+        draft = None
+        if preview is not None:
+            draft = functools.partial(self._render_preview, character_id=character_id, preview=preview)
+        try:
+            build = await self.pipeline.build(
+                self._get_http_session(), character_id, profile, max_bytes, get_info, draft
+            )
+        except RenderQueueFullError as e:
+            logger.warning(f"描画の待ちが上限に達しています: {e}")
+            raise PosterJobError("ただいま混み合っています。しばらくしてから再度お試しください。") from e
+        if build.degraded:
+            self._degraded_count += 1
+        return build.data, build.degraded
+
+    async def _build_poster_remote(self, character_id: str, profile: str, max_bytes: int) -> tuple[bytes, bool]:
+        """描画サービスのノードにポスターの作成を依頼する（プレビューは作らない）
+
+        キャラクター情報は Bot 側で取得して依頼に添える（POSTER_SCRAPE_MODE・/poster_cache_clear を Bot 側と同じに効かせる）。
+        """
+        try:
+            info, _ = await self._get_character_info(character_id, config.POSTER_STAGE_TIMEOUTS['scrape'])
+        except Exception as e:
+            logger.warning(f"キャラクター情報を取得できないため画像のみで作成します: character_id={character_id}, {e!r}")
             info = {}
-            for key, selector in selectors.items():
-                el = soup.select_one(selector)
-                info[key] = el.text if el else ''
+        try:
+            response = await self.render_client.render(character_id, profile, max_bytes, info)
+        except RenderJobError as e:
+            raise PosterJobError(e.user_message) from e
+        except RenderNodeError as e:
+            logger.error(f"描画ノードに依頼できませんでした: character_id={character_id}, {e}")
+            if e.busy:
+                raise PosterJobError("ただいま混み合っています。しばらくしてから再度お試しください。") from e
+            raise PosterJobError("描画サーバーに接続できませんでした。管理者に連絡してください。") from e
+        if response.degraded:
+            self._degraded_count += 1
+        logger.info(
+            f"ポスターを作成しました: character_id={character_id}, node={response.node}, "
+            f"{extension_for(response.data)} {len(response.data) // 1024}KB{' (cached)' if response.cached else ''}"
+        )
+        return response.data, response.degraded
 
-            logger.info(f"キャラクター情報のスクレイピングが完了しました: character_id={character_id}")
-            return info
-        finally:
-            if driver:
-                try:
-                    driver.quit()
-                    logger.info("Chromeドライバを正常に終了しました")
-                except Exception as e:
-                    logger.error(f"Seleniumドライバの終了に失敗: {e}")
+    async def _render_preview(self, char_bytes: bytes, info: dict, character_id: str, preview: asyncio.Future) -> None:
+        """下書き画像を描いてプレビューの受け渡し先に入れる（失敗したら None を入れる）"""
+        try:
+            draft = await self.render_pool.render(char_bytes, info, character_id, draft=True)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"プレビューの描画に失敗: character_id={character_id}, {e}")
+            draft = None
+        if not preview.done():
+            preview.set_result(draft.data if draft is not None else None)
+
+    async def _collect_stats(self) -> dict:
+        """/poster_stats 用の内部統計をセクションごとに集める"""
+        if self.render_client is not None:
+            # 取得・描画はノード側で行うため、ここでは受付・送信まわりとノードの状態だけを示す
+            return {
+                '描画ノード': self.render_client.stats(),
+                '作成ジョブ': self.jobs.stats(),
+                '送信済みURL': {'reuse': config.POSTER_UPLOAD_REUSE, **self.upload_index.stats()},
+                '送信までの時間': self._delivery_stats(),
+                '画像のみで作成': {'degraded_posters': self._degraded_count},
+            }
+        try:
+            worker_stats = await asyncio.wait_for(self.render_pool.worker_stats(), timeout=5)
+        except Exception as e:
+            logger.warning(f"描画ワーカーの統計を取得できませんでした: {e}")
+            worker_stats = {}
+        return {
+            'ドライバプール': self.driver_pool.stats(),
+            '情報取得経路': {'mode': config.POSTER_SCRAPE_MODE, **self._scrape_sources},
+            '情報キャッシュ': self.info_cache.stats(),
+            '画像キャッシュ': self.image_store.stats(),
+            '作成ジョブ': self.jobs.stats(),
+            '完成画像キャッシュ': self.output_cache.stats(),
+            '送信済みURL': {'reuse': config.POSTER_UPLOAD_REUSE, **self.upload_index.stats()},
+            'エンコード': {'default': self.default_profile, **self.encode_stats.stats()},
+            '送信までの時間': self._delivery_stats(),
+            '描画プール': self.render_pool.stats(),
+            **worker_stats,
+            'サーキットブレーカー': {**self.scrape_breaker.stats(), 'degraded_posters': self._degraded_count},
+            'プロセス監視': self.supervisor.stats(),
+        }
+
+    def _delivery_stats(self) -> dict:
+        """最初の画像（プレビューまたは完成版）と完成版が届くまでの時間の中央値（直近分）"""
+        values = {'preview': config.POSTER_PREVIEW and self.render_client is None, 'previews_shown': self._previews_shown}
+        for name, samples in (('first_image', self._first_image_seconds), ('total', self._total_seconds)):
+            values[f'{name}_p50_s'] = round(statistics.median(samples), 1) if samples else '-'
+        return values
 
     @app_commands.command(
-        name="poster", 
-        description="キャラクターポスターを作成します"
+        name="poster_cache_clear",
+        description="キャラクター情報のキャッシュを削除します（次回は公式サイトから再取得）"
+    )
+    @app_commands.describe(character_id="削除するキャラクターID（省略時は全件削除）")
+    async def poster_cache_clear(self, interaction: discord.Interaction, character_id: str | None = None):
+        try:
+            removed = await asyncio.to_thread(self.info_cache.invalidate, character_id)
+            target = f"キャラクター #{character_id}" if character_id else "全キャラクター"
+            await interaction.response.send_message(
+                f"{target} のキャッシュを削除しました（{removed}件）。", ephemeral=True
+            )
+        except Exception as e:
+            logger.error(f"キャッシュの削除に失敗: {e}", exc_info=True)
+            await interaction.response.send_message("キャッシュの削除に失敗しました。", ephemeral=True)
+
+    @app_commands.command(
+        name="poster_batch",
+        description="複数のキャラクターのポスターをまとめて作成します"
     )
     @app_commands.describe(
-        character_id="キャラクターIDを入力してください"
+        ids="キャラクターIDをカンマ区切りで入力してください（例: 12,345,6789、最大10件）",
+        format="出力形式（省略時はサーバーの設定）",
     )
-    async def poster(self, interaction: discord.Interaction, character_id: str):
-
-        # 画像アセットの存在確認（マスクと国旗はオプション）
-        # 現在は必須アセットなし（すべてオプション）
-        optional_assets = [
-            ('mask.png', self.mask_path),
-            ('peaceful.png', self.peaceful_path),
-            ('brave.png', self.brave_path),
-            ('glory.png', self.glory_path),
-            ('freedom.png', self.freedom_path),
-        ]
-        
-        missing = [name for name, path in optional_assets if not os.path.exists(path)]
-        
-        if missing:
-            logger.info(f"オプション画像が不足していますが、処理を続行します: {', '.join(missing)}")
-        
-        await interaction.response.send_message(
-            "キャラクターカード作成中です\nカードが完成するまでコマンドを入力しないようお願いします"
-        )
+    @app_commands.choices(format=_PROFILE_CHOICES)
+    async def poster_batch(self, interaction: discord.Interaction, ids: str, format: str | None = None):
         try:
-            # キャラ画像URL取得（config.pyで一元管理）
-            url = config.get_character_image_url(character_id)
-            try:
-                urllib.request.urlretrieve(url, self.dst_path)
-            except Exception as e:
-                logger.error(f"画像のダウンロードに失敗: {e}")
-                await interaction.followup.send("キャラクター画像の取得に失敗しました。番号が正しいかご確認ください。", ephemeral=True)
-                return
+            character_ids = self._parse_batch_ids(ids, config.POSTER_BATCH_MAX_IDS)
+        except ValueError as e:
+            await interaction.response.send_message(str(e), ephemeral=True)
+            return
+        profile = self._profile_for(interaction, format)
+        max_bytes = self._upload_budget(interaction)
+        # 1件ずつ通常のジョブとして並べる（同時実行数の上限・同じキャラクターの相乗りは /poster と共通）
+        tickets: dict[str, JobTicket] = {}
+        failures: dict[str, str] = {}
+        for character_id in character_ids:
             try:
-                # キャラクター画像を開く
-                char = Image.open(self.dst_path)
-                
-                # WebP形式の場合はPNGに変換
-                if char.format == 'WEBP':
-                    char = char.convert('RGB')
-                
-                # マスク画像（オプション）
-                mask = None
-                if os.path.exists(self.mask_path):
-                    mask = Image.open(self.mask_path)
-                
-                # 注: peaceful, brave, glory, freedom 画像は現在使用されていません
-                # 将来の機能拡張のために読み込み処理は残していますが、_draw_poster()には渡していません
-            except Exception as e:
-                logger.error(f"画像ファイルの読み込みに失敗: {e}")
-                await interaction.followup.send("画像ファイルの読み込みに失敗しました。管理者に連絡してください。", ephemeral=True)
-                return
-            # Seleniumでキャラ情報取得（ブロッキング処理をスレッドプールで実行）
-            try:
-                info = await asyncio.to_thread(
-                    self._scrape_character_info, character_id
+                tickets[character_id] = self.jobs.submit(
+                    (character_id, profile, max_bytes),
+                    functools.partial(self._build_poster, character_id, profile, max_bytes),
                 )
-            except Exception as e:
-                logger.error(f"Selenium/スクレイピングに失敗: {e}", exc_info=True)
-                await interaction.followup.send("キャラクター情報の取得に失敗しました。番号が正しいか、または公式サイトの仕様変更がないかご確認ください。", ephemeral=True)
-                return
-            try:
-                poster_img = self._draw_poster(char, mask, info)
-                img_bytes = io.BytesIO()
-                poster_img.save(img_bytes, format='PNG')
-                img_bytes.seek(0)
-            except Exception as e:
-                logger.error(f"画像合成・保存に失敗: {e}")
-                await interaction.followup.send("画像の合成または保存に失敗しました。管理者に連絡してください。", ephemeral=True)
-                return
-            # ポスター画像をユーザーに送信
-            try:
-                filename = f"poster_{character_id}.png"
-                await interaction.followup.send(
-                    content=f"✅ キャラクター #{character_id} のポスターが完成しました！",
-                    file=discord.File(img_bytes, filename=filename)
+            except JobQueueFullError as e:
+                logger.warning(f"ポスター作成の待ちが上限に達しています: character_id={character_id}, {e}")
+                failures[character_id] = "混み合っているため受け付けられませんでした"
+        if not tickets:
+            await interaction.response.send_message(
+                "ただいま混み合っています。しばらくしてから再度お試しください。", ephemeral=True
+            )
+            return
+        eta = max(ticket.eta for ticket in tickets.values())
+        await interaction.response.send_message(
+            f"{len(tickets)}件のキャラクターカードを作成中です（完成まで約{math.ceil(eta)}秒）"
+        )
+
+        results = await asyncio.gather(*(ticket.result() for ticket in tickets.values()), return_exceptions=True)
+        posters: dict[str, tuple[bytes, bool]] = {}
+        for character_id, result in zip(tickets, results):
+            if isinstance(result, PosterJobError):
+                failures[character_id] = result.user_message
+            elif isinstance(result, BaseException):
+                logger.error(f"予期せぬエラー: character_id={character_id}, {result!r}")
+                failures[character_id] = "エラーが発生しました"
+            else:
+                posters[character_id] = result
+
+        # 結果は入力順に1行ずつ示し、失敗したものもその場で理由を書く
+        lines = []
+        for character_id in character_ids:
+            if character_id in posters:
+                note = "（画像のみ）" if posters[character_id][1] else ""
+                lines.append(f"✅ #{character_id}{note}")
+            else:
+                lines.append(f"❌ #{character_id}: {failures[character_id]}")
+        content = f"ポスターの一括作成が完了しました（{len(posters)}/{len(character_ids)}件）\n" + "\n".join(lines)
+
+        try:
+            batches = self._pack_attachments([(cid, data) for cid, (data, _) in posters.items()], max_bytes)
+            for index, batch in enumerate(batches or [[]]):
+                files = [
+                    discord.File(io.BytesIO(data), filename=f"poster_{cid}.{extension_for(data)}") for cid, data in batch
+                ]
+                message = await asyncio.wait_for(
+                    interaction.followup.send(content=content if index == 0 else discord.utils.MISSING,
+                                              files=files, wait=True),
+                    timeout=config.POSTER_STAGE_TIMEOUTS['upload'],
                 )
-            except Exception as e:
-                logger.error(f"Discordへの画像送信に失敗: {e}")
-                await interaction.followup.send("画像の送信に失敗しました。管理者に連絡してください。", ephemeral=True)
-                return
+                for (_, data), attachment in zip(batch, message.attachments if message is not None else []):
+                    await self._remember_upload(interaction, message, attachment, content_hash(data), len(data))
         except Exception as e:
-            logger.error(f"予期せぬエラー: {e}")
-            logger.error(traceback.format_exc())
-            await interaction.followup.send("エラーが発生しました。管理者に連絡してください。", ephemeral=True)
+            logger.error(f"Discordへの画像送信に失敗: {e}")
+            await interaction.followup.send("画像の送信に失敗しました。管理者に連絡してください。", ephemeral=True)
+            return
+        logger.info(f"ポスターを一括送信しました: ok={len(posters)}, failed={len(failures)}")
+
+    @staticmethod
+    def _parse_batch_ids(text: str, limit: int) -> list[str]:
+        """カンマ・空白区切りのキャラクターIDを重複を除いて順に返す。
+
+        Raises:
+            ValueError: 数字以外が含まれる、件数が0件または上限を超える場合（ユーザー向けのメッセージ付き）
+        """
+        character_ids = []
+        for token in re.split(r'[,、\s]+', text.strip()):
+            if not token:
+                continue
+            if not token.isdigit():
+                raise ValueError(f"キャラクターIDは数字で指定してください: {token}")
+            if token not in character_ids:
+                character_ids.append(token)
+        if not character_ids:
+            raise ValueError("キャラクターIDを1つ以上指定してください。")
+        if len(character_ids) > limit:
+            raise ValueError(f"一度に作成できるのは{limit}件までです（{len(character_ids)}件指定されています）。")
+        return character_ids
+
+    @staticmethod
+    def _pack_attachments(posters: list[tuple[str, bytes]], max_bytes: int,
+                          max_files: int = 10) -> list[list[tuple[str, bytes]]]:
+        """1メッセージの添付が合計 max_bytes（0で無制限）・max_files 件に収まるよう順に詰める"""
+        batches: list[list[tuple[str, bytes]]] = []
+        size = 0
+        for item in posters:
+            if not batches or len(batches[-1]) >= max_files or (max_bytes and size + len(item[1]) > max_bytes):
+                batches.append([])
+                size = 0
+            batches[-1].append(item)
+            size += len(item[1])
+        return batches
+
+    @app_commands.command(
+        name="poster_format",
+        description="このサーバーでのポスターの出力形式の既定値を設定します"
+    )
+    @app_commands.describe(format="出力形式")
+    @app_commands.choices(format=_PROFILE_CHOICES)
+    async def poster_format(self, interaction: discord.Interaction, format: str):
+        if interaction.guild is None:
+            await interaction.response.send_message("このコマンドはサーバー内でのみ使用できます。", ephemeral=True)
+            return
+        profile = resolve_profile(format)
+        self.guild_profiles[str(interaction.guild.id)] = profile.name
+        self._persist_guild_profiles()
+        await interaction.response.send_message(
+            f"このサーバーのポスターの出力形式を {profile.label} に設定しました。", ephemeral=True
+        )
+
+    @app_commands.command(
+        name="poster_stats",
+        description="ポスター生成の内部統計を表示します"
+    )
+    async def poster_stats(self, interaction: discord.Interaction):
+        try:
+            embed = discord.Embed(title="📊 ポスター生成の統計", color=discord.Color.blue())
+            for section, values in (await self._collect_stats()).items():
+                lines = [f"{key}: {value}" for key, value in values.items()]
+                embed.add_field(name=section, value="\n".join(lines) or "-", inline=False)
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+        except Exception as e:
+            logger.error(f"統計の表示に失敗: {e}", exc_info=True)
+            await interaction.response.send_message("統計の取得に失敗しました。", ephemeral=True)
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(Poster(bot))
\ No newline at end of file
@@ -144,7 +144,8 @@ def get_token():
         raise ValueError(error_msg)
     return token
 
-TOKEN = get_token()
+# トークンはボット起動時（main.py）にだけ解決する。
+# ポスターの描画ツールなどDiscordに接続しないものは、トークン無しでこのモジュールを読み込める。
 
 # 即時ギルド同期用のGuild ID（開発/本番で切替可能）
 # 設定すると、そのギルドに対してスラッシュコマンドを即時同期します（数秒で反映）。
@@ -161,15 +162,97 @@ POSTER_PEACEFUL_PATH = os.getenv('POSTER_PEACEFUL_PATH', os.path.join(_ASSETS_DI
 POSTER_BRAVE_PATH = os.getenv('POSTER_BRAVE_PATH', os.path.join(_ASSETS_DIR, 'brave.png'))
 POSTER_GLORY_PATH = os.getenv('POSTER_GLORY_PATH', os.path.join(_ASSETS_DIR, 'glory.png'))
 POSTER_FREEDOM_PATH = os.getenv('POSTER_FREEDOM_PATH', os.path.join(_ASSETS_DIR, 'freedom.png'))
-# 環境に依存しないパス構築（プロジェクトルートからの相対パス）
-_POSTER_DST_DEFAULT = os.path.join(os.path.dirname(__file__), 'poster_output.png')
-POSTER_DST_PATH = os.getenv('POSTER_DST_PATH', _POSTER_DST_DEFAULT)
+POSTER_FLAG_DIR = os.getenv('POSTER_FLAG_DIR', _ASSETS_DIR)  # 国旗画像（<国名>.png）を置くディレクトリ
+POSTER_ASSET_RELOAD_SEC = _safe_int(os.getenv('POSTER_ASSET_RELOAD_SEC'), 10)  # アセットの更新を確認する間隔（秒）
 POSTER_FONT_A = os.getenv('POSTER_FONT_A', 'ヒラギノ明朝 ProN.ttc')
 POSTER_FONT_B = os.getenv('POSTER_FONT_B', 'ヒラギノ明朝 ProN.ttc')
 POSTER_FONT_C = os.getenv('POSTER_FONT_C', 'ヒラギノ明朝 ProN.ttc')
 POSTER_FONT_D = os.getenv('POSTER_FONT_D', 'ヒラギノ明朝 ProN.ttc')
+POSTER_FONT_CACHE_SIZE = _safe_int(os.getenv('POSTER_FONT_CACHE_SIZE'), 64)  # 保持する (フォント, サイズ) の組の上限
+POSTER_GLYPH_CACHE_MB = _safe_int(os.getenv('POSTER_GLYPH_CACHE_MB'), 32)  # グロー付き文字タイルのキャッシュ上限（MB）
+POSTER_BASE_CACHE_SIZE = _safe_int(os.getenv('POSTER_BASE_CACHE_SIZE'), 8)  # 保持するキャラ画像＋マスクの土台の数（1枚約10MB）
+POSTER_RENDER_WORKERS = _safe_int(os.getenv('POSTER_RENDER_WORKERS'), 2)  # 描画プロセス数（0で同一プロセスのスレッドで描画）
+POSTER_RENDER_QUEUE = _safe_int(os.getenv('POSTER_RENDER_QUEUE'), 8)  # 実行中に加えて待たせられる描画の数
+POSTER_JOB_CONCURRENCY = _safe_int(os.getenv('POSTER_JOB_CONCURRENCY'), 2)  # 同時に作成するポスターの数
+POSTER_JOB_QUEUE_LIMIT = _safe_int(os.getenv('POSTER_JOB_QUEUE_LIMIT'), 50)  # 順番待ちにできるポスターの数
+# /poster_batch で一度に指定できるキャラクター数（1メッセージの添付上限の10件まで）
+POSTER_BATCH_MAX_IDS = min(10, max(1, _safe_int(os.getenv('POSTER_BATCH_MAX_IDS'), 10)))
+# 出力形式の既定値（png / webp_lossless / jpeg / webp、サーバーごとに /poster_format で変更可能）
+POSTER_ENCODING_PROFILE = os.getenv('POSTER_ENCODING_PROFILE', 'png').strip().lower()
+# 出力サイズの上限（MB、0で無制限）。超えたら上の順で次の形式に落とす。サーバーの添付上限の方が小さければそちらを使う
+POSTER_UPLOAD_BUDGET_MB = _safe_int(os.getenv('POSTER_UPLOAD_BUDGET_MB'), 8)
+# 完成版より先に、縮小・光彩を簡略化した下書き（JPEG）を表示し、完成したら差し替える
+POSTER_PREVIEW = os.getenv('POSTER_PREVIEW', 'true').strip().lower() in {'true', '1', 'yes', 'on'}
+# 描画サービス（python -m tools.render_service）のURL（カンマ区切り）。指定すると画像・情報の取得と描画・エンコードを
+# それらのノードに振り分け、Bot のプロセスでは行わない（空なら従来どおり Bot のプロセスで作成する）
+POSTER_RENDER_NODES = [
+    u.strip().rstrip('/') for u in os.getenv('POSTER_RENDER_NODES', '').split(',') if u.strip()
+]
+POSTER_RENDER_HEALTH_SEC = max(1, _safe_int(os.getenv('POSTER_RENDER_HEALTH_SEC'), 10))  # ノードの死活確認の間隔（秒）
 POSTER_CHANNEL_ID = int(os.getenv('POSTER_CHANNEL_ID', '0'))
 
+# Posterスクレイピング用 WebDriver プール設定
+# 起動済みのChromeを使い回し、/poster ごとのブラウザ起動コストを削減する
+POSTER_DRIVER_POOL_SIZE = _safe_int(os.getenv('POSTER_DRIVER_POOL_SIZE'), 1)  # 同時に保持するドライバ数
+POSTER_DRIVER_MAX_PAGES = _safe_int(os.getenv('POSTER_DRIVER_MAX_PAGES'), 50)  # この回数使用したら作り直す
+POSTER_DRIVER_LEASE_TIMEOUT = _safe_int(os.getenv('POSTER_DRIVER_LEASE_TIMEOUT'), 60)  # 貸し出し待ちの上限（秒）
+POSTER_DRIVER_WARMUP = os.getenv('POSTER_DRIVER_WARMUP', 'true').strip().lower() in {'true', '1', 'yes', 'on'}
+# スクレイピング1回あたりのChromeプロセスツリーの上限（0で無制限）と、孤児プロセス回収の間隔
+POSTER_SCRAPE_MAX_RSS_MB = _safe_int(os.getenv('POSTER_SCRAPE_MAX_RSS_MB'), 1024)
+POSTER_SCRAPE_MAX_CPU_SEC = _safe_int(os.getenv('POSTER_SCRAPE_MAX_CPU_SEC'), 60)
+POSTER_ORPHAN_SWEEP_MINUTES = max(1, _safe_int(os.getenv('POSTER_ORPHAN_SWEEP_MINUTES'), 10))
+
+# Seleniumスクレイピング時の通信削減設定
+# ページ読み込み戦略: normal（全リソース待ち）/ eager（DOM構築まで）/ none（待たない）
+# いずれもステータス欄の出現は WebDriverWait で別途待機する
+POSTER_PAGE_LOAD_STRATEGY = os.getenv('POSTER_PAGE_LOAD_STRATEGY', 'eager').strip().lower()
+# DevTools Protocol でブロックするリソース種別（カンマ区切り: image,font,stylesheet,media）
+POSTER_BLOCK_RESOURCE_TYPES = [
+    t.strip().lower() for t in os.getenv('POSTER_BLOCK_RESOURCE_TYPES', 'image,font,stylesheet,media').split(',') if t.strip()
+]
+# ブロックするURLパターン（カンマ区切り、* はワイルドカード）。解析タグ等の外部スクリプトを想定
+POSTER_BLOCK_URL_PATTERNS = [
+    p.strip() for p in os.getenv(
+        'POSTER_BLOCK_URL_PATTERNS',
+        '*google-analytics.com*,*googletagmanager.com*,*doubleclick.net*,*facebook.net*,*connect.facebook.com*'
+    ).split(',') if p.strip()
+]
+
+# キャラクター情報の取得方式
+#   auto     : HTTPで取得し、項目が取れなければSeleniumにフォールバック（デフォルト）
+#   http     : HTTPのみ（Chromeを使わない）
+#   selenium : 従来どおりSeleniumのみ
+POSTER_SCRAPE_MODE = os.getenv('POSTER_SCRAPE_MODE', 'auto').strip().lower()
+POSTER_HTTP_TIMEOUT = _safe_int(os.getenv('POSTER_HTTP_TIMEOUT'), 10)  # HTTP取得のタイムアウト（秒）
+POSTER_IMAGE_MAX_MB = _safe_int(os.getenv('POSTER_IMAGE_MAX_MB'), 10)  # ダウンロードするキャラクター画像の上限サイズ（MB）
+
+# キャラクター情報キャッシュ（TTL経過後は古い値を返しつつ裏で再取得する）
+POSTER_INFO_CACHE_PATH = os.getenv('POSTER_INFO_CACHE_PATH', os.path.join(_DATA_DIR, 'character_info.sqlite3'))
+POSTER_INFO_CACHE_TTL = _safe_int(os.getenv('POSTER_INFO_CACHE_TTL'), 7 * 24 * 60 * 60)  # 秒（デフォルト7日）
+# キャラクター画像の保存先（tools.crawl での事前取得や /poster・誕生日通知で取得した画像を再利用する）
+POSTER_IMAGE_CACHE_DIR = os.getenv('POSTER_IMAGE_CACHE_DIR', os.path.join(_DATA_DIR, 'cache', 'images'))
+POSTER_OUTPUT_CACHE_DIR = os.getenv('POSTER_OUTPUT_CACHE_DIR', os.path.join(_DATA_DIR, 'cache', 'posters'))
+POSTER_OUTPUT_CACHE_MEMORY_MB = _safe_int(os.getenv('POSTER_OUTPUT_CACHE_MEMORY_MB'), 64)  # 完成画像をメモリに保持する上限（MB）
+POSTER_OUTPUT_CACHE_DISK_MB = _safe_int(os.getenv('POSTER_OUTPUT_CACHE_DISK_MB'), 512)  # 完成画像をディスクに保存する上限（MB、0で保存しない）
+# 送信済みポスターの添付URLを記録し、同じ画像は再アップロードせずにURLを埋め込みで示す
+POSTER_UPLOAD_REUSE = os.getenv('POSTER_UPLOAD_REUSE', 'true').strip().lower() in {'true', '1', 'yes', 'on'}
+POSTER_UPLOAD_INDEX_PATH = os.getenv('POSTER_UPLOAD_INDEX_PATH', os.path.join(_DATA_DIR, 'cache', 'poster_uploads.json'))
+POSTER_UPLOAD_INDEX_SIZE = _safe_int(os.getenv('POSTER_UPLOAD_INDEX_SIZE'), 1000)  # 記録する件数の上限
+POSTER_UPLOAD_CHECK_TIMEOUT = _safe_int(os.getenv('POSTER_UPLOAD_CHECK_TIMEOUT'), 5)  # URLが有効かの確認の上限（秒）
+
+# 公式サイト障害時の待ち時間対策
+# 連続で取得に失敗したら一定時間スクレイピングを止め、キャッシュまたは画像のみでポスターを作る
+POSTER_BREAKER_FAILURES = _safe_int(os.getenv('POSTER_BREAKER_FAILURES'), 3)  # 停止するまでの連続失敗回数
+POSTER_BREAKER_RESET_SEC = _safe_int(os.getenv('POSTER_BREAKER_RESET_SEC'), 60)  # 停止してから再試行するまでの秒数
+# /poster 1回あたりの制限時間（秒）と、工程ごとの上限（秒）
+POSTER_DEADLINE_SEC = _safe_int(os.getenv('POSTER_DEADLINE_SEC'), 90)
+POSTER_STAGE_TIMEOUTS = {
+    'download': _safe_int(os.getenv('POSTER_DOWNLOAD_TIMEOUT'), 15),
+    'scrape': _safe_int(os.getenv('POSTER_SCRAPE_TIMEOUT'), 25),
+    'render': _safe_int(os.getenv('POSTER_RENDER_TIMEOUT'), 30),
+    'upload': _safe_int(os.getenv('POSTER_UPLOAD_TIMEOUT'), 30),
+}
+
 QUOTE_CHANNEL_ID = _safe_int(os.getenv('QUOTE_CHANNEL_ID_DEV' if ENV == 'development' else 'QUOTE_CHANNEL_ID_PROD', '0'), 0)
 
 FEATURES = {
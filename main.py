@@ -103,7 +103,7 @@ except Exception as e:
 async def main():
     try:
         async with bot:
-            await bot.start(config.TOKEN)
+            await bot.start(config.get_token())
     except asyncio.CancelledError:
         # Silent cancellation (Ctrl+C)
         logger.info('シャットダウン要求を受け取りました (Cancelled).')
@@ -113,6 +113,11 @@ async def main():
         pass
 
 if __name__ == '__main__':
+    try:
+        config.get_token()
+    except ValueError:
+        sys.exit(1)  # トークン未設定は再試行しない
+
     retry_count = 0
     
     while retry_count < MAX_RETRIES:
@@ -0,0 +1,73 @@
+"""
+ポスター生成の基盤モジュールを管理するパッケージ。
+cogs/poster.py から利用されるスクレイピング・描画まわりの部品を提供します。
+"""
+
+from .assets import AssetStore
+from .browser import build_chrome_options, create_chrome_driver
+from .driver_pool import DriverPool
+from .encoding import EncodeResult, EncodeStats, EncodingProfile, encode_image, extension_for, resolve_profile
+from .fonts import FontManager, get_font_manager
+from .glow import draw_text_with_glow, render_glow_masks
+from .glyph_cache import GlyphCache, get_glyph_cache
+from .image_store import ImageStore, ImageTooLargeError, download_character_image
+from .info_cache import CacheEntry, CharacterInfoCache
+from .job_queue import JobQueue, JobQueueFullError, JobTicket
+from .layers import LayerCache
+from .output_cache import OutputCache
+from .pipeline import PosterBuild, PosterJobError, PosterPipeline
+from .process_supervisor import ProcessSupervisor
+from .render_client import RenderClient, RenderJobError, RenderNodeError, RenderResponse
+from .render_pool import RenderPool, RenderQueueFullError
+from .renderer import PosterRenderer
+from .resilience import CircuitBreaker, CircuitOpenError, Deadline, StageTimeoutError
+from .upload_index import UploadIndex, UploadRecord, content_hash, is_url_alive, url_expired
+
+__all__ = [
+    'AssetStore',
+    'build_chrome_options',
+    'create_chrome_driver',
+    'DriverPool',
+    'EncodeResult',
+    'EncodeStats',
+    'EncodingProfile',
+    'encode_image',
+    'extension_for',
+    'resolve_profile',
+    'FontManager',
+    'get_font_manager',
+    'draw_text_with_glow',
+    'render_glow_masks',
+    'GlyphCache',
+    'get_glyph_cache',
+    'ImageStore',
+    'ImageTooLargeError',
+    'download_character_image',
+    'CacheEntry',
+    'CharacterInfoCache',
+    'JobQueue',
+    'JobQueueFullError',
+    'JobTicket',
+    'LayerCache',
+    'OutputCache',
+    'PosterBuild',
+    'PosterJobError',
+    'PosterPipeline',
+    'ProcessSupervisor',
+    'RenderClient',
+    'RenderJobError',
+    'RenderNodeError',
+    'RenderResponse',
+    'RenderPool',
+    'RenderQueueFullError',
+    'PosterRenderer',
+    'CircuitBreaker',
+    'CircuitOpenError',
+    'Deadline',
+    'StageTimeoutError',
+    'UploadIndex',
+    'UploadRecord',
+    'content_hash',
+    'is_url_alive',
+    'url_expired',
+]
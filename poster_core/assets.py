@@ -0,0 +1,191 @@
+"""
+ポスター用画像アセットの事前読み込み
+マスクは描画サイズにリサイズ・RGBA変換した状態で、国旗は国名（大文字小文字を区別しない）から
+引ける辞書に幅を揃えた状態で保持します。ファイルの更新時刻を見て、再起動せずに差し替えを反映します。
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# ポスター上のマスクの大きさ（キャンバスより一回り大きく、(-20, -20) に貼る）
+MASK_SIZE = (1640, 2140)
+# 国旗の横幅（アスペクト比は維持）
+FLAG_WIDTH = 300
+
+
+def _load_mask(path: str, size: Tuple[int, int]) -> Image.Image:
+    with Image.open(path) as img:
+        # 従来どおり元のモードのままリサイズしてから、貼り付けに使えるRGBAにする
+        return img.resize(size).convert('RGBA')
+
+
+def _load_flag(path: str, width: int) -> Image.Image:
+    with Image.open(path) as img:
+        has_alpha = 'A' in img.getbands() or 'transparency' in img.info
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+        height = max(1, int(img.height * width / img.width))
+        return img.resize((width, height), Image.Resampling.LANCZOS)
+
+
+class AssetStore:
+    """マスク・国旗画像を読み込み済みの状態で保持するクラス（スレッドセーフ）"""
+
+    def __init__(self, mask_path: str, flag_dir: str, country_paths: Optional[Dict[str, str]] = None,
+                 reload_interval: float = 10.0, mask_size: Tuple[int, int] = MASK_SIZE,
+                 flag_width: int = FLAG_WIDTH, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            mask_path: マスク画像のパス
+            flag_dir: 国旗画像（<国名>.png）を置くディレクトリ
+            country_paths: 国名 → 国旗画像のパス（ディレクトリ内のファイルより優先）
+            reload_interval: ファイルの更新を確認する間隔（秒、0で毎回確認）
+            mask_size: マスクのリサイズ後の大きさ
+            flag_width: 国旗のリサイズ後の横幅
+            clock: 時刻取得関数（テスト用）
+        """
+        self.mask_path = mask_path
+        self.flag_dir = flag_dir
+        self.country_paths = dict(country_paths or {})
+        self.reload_interval = reload_interval
+        self.mask_size = mask_size
+        self.flag_width = flag_width
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[Any, ...]] = None
+        self._checked_at: Optional[float] = None
+        self._mask: Optional[Image.Image] = None
+        self._flags: Dict[str, Image.Image] = {}
+        self._reloads = 0
+
+    def mask(self) -> Optional[Image.Image]:
+        """リサイズ済みのマスク画像（無ければ None）"""
+        self.refresh()
+        return self._mask
+
+    def flag(self, country: str) -> Optional[Image.Image]:
+        """国名に対応するリサイズ済みの国旗画像（大文字小文字を区別しない、無ければ None）"""
+        key = (country or '').strip().casefold()
+        if not key:
+            return None
+        self.refresh()
+        return self._flags.get(key)
+
+    def missing(self) -> List[str]:
+        """見つからないオプションアセットのファイル名一覧"""
+        paths = [self.mask_path, *self.country_paths.values()]
+        return [os.path.basename(path) for path in paths if not os.path.exists(path)]
+
+    def refresh(self, force: bool = False) -> bool:
+        """前回の確認から reload_interval 秒以上経っていれば更新時刻を確認し、変わっていれば読み直す。
+
+        Returns:
+            読み直した場合 True
+        """
+        now = self._clock()
+        with self._lock:
+            if not force and self._checked_at is not None and now - self._checked_at < self.reload_interval:
+                return False
+            self._checked_at = now
+            signature = self._scan()
+            if not force and signature == self._signature:
+                return False
+            self._load(signature)
+            return True
+
+    def fingerprint(self) -> str:
+        """アセットファイルの構成と更新時刻から作る識別子（画像は読み込まない。出力キャッシュのキー用）"""
+        with self._lock:
+            signature = self._scan()
+        return self._digest(signature)
+
+    def loaded_fingerprint(self) -> Optional[str]:
+        """読み込み済みのアセットの識別子（fingerprint と同じ形式、未読み込みなら None）
+
+        確認間隔の間はファイルを差し替えても読み直さないため、fingerprint と異なる場合がある。
+        """
+        with self._lock:
+            signature = self._signature
+        return self._digest(signature) if signature is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'mask': self._mask is not None,
+                'flags': len(self._flags),
+                'reloads': self._reloads,
+            }
+
+    # ------------------------------------------------------------------
+
+    def _flag_files(self) -> Dict[str, str]:
+        """国名（casefold）→ 国旗画像のパス"""
+        files: Dict[str, str] = {}
+        mask_file = os.path.abspath(self.mask_path)
+        try:
+            entries = sorted(os.listdir(self.flag_dir))
+        except OSError:
+            entries = []
+        for filename in entries:
+            stem, ext = os.path.splitext(filename)
+            path = os.path.join(self.flag_dir, filename)
+            if ext.lower() == '.png' and os.path.abspath(path) != mask_file:
+                files.setdefault(stem.casefold(), path)
+        for country, path in self.country_paths.items():
+            if os.path.exists(path):
+                files[country.casefold()] = path
+        return files
+
+    @staticmethod
+    def _digest(signature: Tuple[Any, ...]) -> str:
+        return hashlib.sha256(repr(signature).encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def _mtime(path: str) -> Optional[float]:
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return None
+
+    def _scan(self) -> Tuple[Any, ...]:
+        flags = self._flag_files()
+        return (
+            self._mtime(self.mask_path),
+            tuple(sorted((key, path, self._mtime(path)) for key, path in flags.items())),
+        )
+
+    def _load(self, signature: Tuple[Any, ...]) -> None:
+        mask_mtime, flag_entries = signature
+        mask = None
+        if mask_mtime is not None:
+            try:
+                mask = _load_mask(self.mask_path, self.mask_size)
+            except Exception as e:
+                logger.warning(f"マスク画像の読み込みに失敗: {e}")
+
+        flags: Dict[str, Image.Image] = {}
+        for key, path, _ in flag_entries:
+            try:
+                flags[key] = _load_flag(path, self.flag_width)
+            except Exception as e:
+                logger.warning(f"国旗画像の読み込みに失敗 ({path}): {e}")
+
+        self._mask = mask
+        self._flags = flags
+        self._signature = signature
+        self._reloads += 1
+        logger.info(f"画像アセットを読み込みました: マスク={'あり' if mask is not None else 'なし'}, 国旗={len(flags)}件")
+
+        missing = self.missing()
+        if missing:
+            logger.info("ℹ️ 以下のオプション画像アセットが見つかりません（処理は続行されます）:")
+            for item in missing:
+                logger.info(f"  - {item}")
+            logger.info(f"必要に応じて {self.flag_dir} に画像ファイルを配置してください。")
@@ -0,0 +1,124 @@
+"""
+スクレイピング用Chromeドライバの生成
+ヘッドレスChromeの起動オプションを一元管理します。
+"""
+
+import logging
+from typing import List, Tuple
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+import config
+from .process_supervisor import CHROME_MARKER
+
+logger = logging.getLogger(__name__)
+
+# リソース種別ごとのブロック対象URLパターン（Network.setBlockedURLs はURLでしか指定できないため拡張子で近似）
+_RESOURCE_TYPE_PATTERNS = {
+    'image': ['png', 'jpg', 'jpeg', 'gif', 'webp', 'svg', 'ico', 'avif'],
+    'font': ['woff', 'woff2', 'ttf', 'otf', 'eot'],
+    'stylesheet': ['css'],
+    'media': ['mp4', 'webm', 'mp3', 'm4a', 'ogg'],
+}
+
+_VALID_PAGE_LOAD_STRATEGIES = {'normal', 'eager', 'none'}
+
+# 現在のページで転送されたバイト数とリクエスト数（Resource Timing API）
+_TRANSFER_SCRIPT = """
+const entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));
+let bytes = 0;
+for (const e of entries) { bytes += e.transferSize || 0; }
+return [bytes, entries.length];
+"""
+
+
+def blocked_url_patterns() -> List[str]:
+    """設定からブロック対象のURLパターン一覧を組み立てる。"""
+    patterns = list(config.POSTER_BLOCK_URL_PATTERNS)
+    for resource_type in config.POSTER_BLOCK_RESOURCE_TYPES:
+        extensions = _RESOURCE_TYPE_PATTERNS.get(resource_type)
+        if not extensions:
+            logger.warning(f"未対応のリソース種別のためブロック対象外です: {resource_type}")
+            continue
+        for ext in extensions:
+            patterns.append(f"*.{ext}")
+            patterns.append(f"*.{ext}?*")
+    return patterns
+
+
+def measure_transfer(driver: webdriver.Chrome) -> Tuple[int, int]:
+    """現在のページの転送バイト数とリクエスト数を返す（取得できなければ (0, 0)）。"""
+    try:
+        bytes_transferred, requests = driver.execute_script(_TRANSFER_SCRIPT)
+        return int(bytes_transferred), int(requests)
+    except Exception:
+        return 0, 0
+
+
+def build_chrome_options() -> Options:
+    """スクレイピング用のChromeオプションを生成する。
+
+    Returns:
+        Options: ヘッドレス・省メモリ設定済みのChromeオプション
+    """
+    chrome_options = Options()
+    chrome_options.add_argument('--disable-logging')  # ロギング無効化
+    chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])  # DevToolsログ抑制
+
+    # ヘッドレスモード（ブラウザウィンドウを開かない）
+    chrome_options.add_argument('--headless=new')
+    chrome_options.add_argument('--disable-gpu')  # GPU無効化（ヘッドレス環境で不要）
+
+    # サンドボックス・共有メモリ設定（全環境で有効化 — EC2等で必須）
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+
+    # メモリ管理オプション（EC2等の小規模インスタンス向け）
+    chrome_options.add_argument('--disable-extensions')  # 拡張機能無効化
+    chrome_options.add_argument('--disable-plugins')  # プラグイン無効化
+    chrome_options.add_argument('--blink-settings=imagesEnabled=false')  # 画像読み込み無効化（高速化）
+    chrome_options.add_argument('--disable-software-rasterizer')  # ソフトウェアラスタライザ無効化
+
+    # 追加の安定化オプション（リソース制約環境向け）
+    chrome_options.add_argument('--disable-background-networking')
+    chrome_options.add_argument('--disable-default-apps')
+    chrome_options.add_argument('--disable-sync')
+    chrome_options.add_argument('--disable-translate')
+    chrome_options.add_argument('--no-first-run')
+    chrome_options.add_argument('--window-size=1280,720')
+    chrome_options.add_argument('--disable-features=VizDisplayCompositor')
+    chrome_options.add_argument(CHROME_MARKER)  # 孤児プロセス回収時に自分のChromeを識別する目印
+
+    # ステータス欄の出現は WebDriverWait で待つため、全リソースの読み込み完了は待たない
+    strategy = config.POSTER_PAGE_LOAD_STRATEGY
+    if strategy not in _VALID_PAGE_LOAD_STRATEGIES:
+        logger.warning(f"不正なページ読み込み戦略のため normal を使用します: {strategy}")
+        strategy = 'normal'
+    chrome_options.page_load_strategy = strategy
+    return chrome_options
+
+
+def create_chrome_driver() -> webdriver.Chrome:
+    """タイムアウト設定済みのヘッドレスChromeを起動する（ブロッキング）。
+
+    Returns:
+        webdriver.Chrome: 起動したドライバ
+    """
+    logger.info("Chromeドライバを起動します")
+    driver = webdriver.Chrome(options=build_chrome_options())
+
+    # タイムアウト設定（リソース枯渇防止）
+    driver.set_page_load_timeout(30)  # ページ読み込みタイムアウト
+    driver.set_script_timeout(30)  # スクリプト実行タイムアウト
+    driver.implicitly_wait(5)  # 暗黙的待機
+
+    # DevTools Protocol でフォント・CSS・解析スクリプト等の通信を遮断
+    patterns = blocked_url_patterns()
+    if patterns:
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+        except Exception as e:
+            logger.warning(f"リクエストブロックの設定に失敗しました（ブロックなしで続行）: {e}")
+    return driver
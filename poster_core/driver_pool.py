@@ -0,0 +1,209 @@
+"""
+WebDriverプール
+起動済みのドライバを貸し出し・回収し、ブラウザ起動のコストを/posterごとに払わないようにします。
+"""
+
+import contextlib
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from selenium.common.exceptions import WebDriverException
+
+logger = logging.getLogger(__name__)
+
+
+class _PooledDriver:
+    """プール内のドライバと利用回数の組"""
+
+    def __init__(self, driver: Any):
+        self.driver = driver
+        self.pages = 0
+        self.created_at = time.monotonic()
+
+
+class DriverPool:
+    """上限付きのWebDriverプール（スレッドセーフ）
+
+    ドライバは ``lease()`` で貸し出し、ブロックを抜けると回収されます。
+    クラッシュした場合や ``max_pages`` 回使用した場合は破棄して作り直します。
+    """
+
+    def __init__(self, factory: Callable[[], Any], size: int = 1, max_pages: int = 50,
+                 lease_timeout: float = 60.0, finalizer: Optional[Callable[[Any], None]] = None):
+        """
+        Args:
+            factory: ドライバを生成する関数（ブロッキング）
+            size: 同時に保持するドライバ数の上限
+            max_pages: 1ドライバあたりの最大使用回数（超えたら作り直す）
+            lease_timeout: 貸し出し待ちの上限（秒）
+            finalizer: ドライバを終了する関数（省略時は driver.quit()）
+        """
+        self._factory = factory
+        self._finalizer = finalizer
+        self._size = max(1, size)
+        self._max_pages = max(1, max_pages)
+        self._lease_timeout = lease_timeout
+        self._idle: List[_PooledDriver] = []
+        self._live = 0  # 貸し出し中 + 待機中 + 起動中のドライバ数
+        self._closed = False
+        self._cond = threading.Condition()
+
+        # メトリクス
+        self._lease_count = 0
+        self._lease_wait_total = 0.0
+        self._lease_wait_max = 0.0
+        self._recycle_count = 0
+
+    def warm(self) -> int:
+        """上限までドライバを起動しておく（ブロッキング）。
+
+        Returns:
+            int: 新たに起動したドライバ数
+        """
+        started = 0
+        while True:
+            with self._cond:
+                if self._closed or self._live >= self._size:
+                    break
+                self._live += 1
+            try:
+                entry = self._create()
+            except Exception as e:
+                logger.error(f"ドライバのウォームアップに失敗しました: {e}")
+                break
+            self._release(entry, healthy=True, count_page=False)
+            started += 1
+        if started:
+            logger.info(f"ドライバプールをウォームアップしました: {started}個")
+        return started
+
+    @contextlib.contextmanager
+    def lease(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """ドライバを1つ借りる。
+
+        Args:
+            timeout: 貸し出し待ちの上限（秒、省略時は lease_timeout。lease_timeout より長くはならない）
+
+        Raises:
+            TimeoutError: 上限以内に空きができなかった場合
+            RuntimeError: プールが閉じられている場合
+        """
+        entry = self._acquire(timeout)
+        healthy = True
+        try:
+            yield entry.driver
+        except WebDriverException:
+            # ブラウザ側の異常はドライバごと作り直す
+            healthy = False
+            raise
+        finally:
+            self._release(entry, healthy=healthy)
+
+    def close(self) -> None:
+        """待機中のドライバをすべて終了する。貸し出し中のものは返却時に終了する。"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._live -= len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            self._quit(entry)
+
+    def stats(self) -> Dict[str, Any]:
+        """プールのメトリクスを返す。"""
+        with self._cond:
+            idle = len(self._idle)
+            avg_wait = self._lease_wait_total / self._lease_count if self._lease_count else 0.0
+            return {
+                'size': self._size,
+                'live': self._live,
+                'idle': idle,
+                'in_use': self._live - idle,
+                'leases': self._lease_count,
+                'lease_wait_avg_ms': round(avg_wait * 1000, 1),
+                'lease_wait_max_ms': round(self._lease_wait_max * 1000, 1),
+                'recycled': self._recycle_count,
+            }
+
+    # ------------------------------------------------------------------
+
+    def _create(self) -> _PooledDriver:
+        try:
+            return _PooledDriver(self._factory())
+        except Exception:
+            with self._cond:
+                self._live -= 1
+                self._cond.notify()
+            raise
+
+    def _acquire(self, timeout: Optional[float] = None) -> _PooledDriver:
+        start = time.monotonic()
+        wait_limit = self._lease_timeout if timeout is None else min(timeout, self._lease_timeout)
+        deadline = start + wait_limit
+        entry: Optional[_PooledDriver] = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("ドライバプールは終了しています")
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._live < self._size:
+                    self._live += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("空きドライバの待機がタイムアウトしました")
+                self._cond.wait(remaining)
+
+        if entry is not None and not self._is_healthy(entry):
+            logger.warning("応答しないドライバを検出したため作り直します")
+            self._quit(entry)
+            with self._cond:
+                self._recycle_count += 1
+            entry = None
+        if entry is None:
+            entry = self._create()
+
+        waited = time.monotonic() - start
+        with self._cond:
+            self._lease_count += 1
+            self._lease_wait_total += waited
+            self._lease_wait_max = max(self._lease_wait_max, waited)
+        return entry
+
+    def _release(self, entry: _PooledDriver, healthy: bool, count_page: bool = True) -> None:
+        if count_page:
+            entry.pages += 1
+        with self._cond:
+            keep = healthy and not self._closed and entry.pages < self._max_pages
+            if keep:
+                self._idle.append(entry)
+            else:
+                self._live -= 1
+                if not self._closed:
+                    self._recycle_count += 1
+            self._cond.notify()
+        if not keep:
+            reason = "異常終了" if not healthy else f"{entry.pages}ページ使用"
+            logger.info(f"ドライバを破棄します（{reason}）")
+            self._quit(entry)
+
+    @staticmethod
+    def _is_healthy(entry: _PooledDriver) -> bool:
+        try:
+            entry.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _quit(self, entry: _PooledDriver) -> None:
+        try:
+            if self._finalizer is not None:
+                self._finalizer(entry.driver)
+            else:
+                entry.driver.quit()
+        except Exception as e:
+            logger.error(f"Seleniumドライバの終了に失敗: {e}")
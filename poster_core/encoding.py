@@ -0,0 +1,202 @@
+"""
+ポスター画像のエンコード設定
+出力形式ごとの保存パラメータ（プロファイル）と、サイズ上限を超えたら次のプロファイルに落とすエンコード処理、
+形式ごとのエンコード時間・サイズの集計を提供します。
+"""
+
+import io
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class EncodingProfile:
+    """出力形式と保存パラメータの組
+
+    Attributes:
+        name: プロファイル名（コマンドの選択肢・設定値に使う）
+        label: 表示名
+        format: Pillow の保存形式
+        extension: ファイル名の拡張子
+        options: Image.save に渡すパラメータ
+    """
+    name: str
+    label: str
+    format: str
+    extension: str
+    options: Mapping[str, Any] = field(default_factory=dict)
+
+
+PROFILES: Dict[str, EncodingProfile] = {
+    profile.name: profile for profile in (
+        EncodingProfile('png', 'PNG（最適化）', 'PNG', 'png', {'optimize': True}),
+        # lossless の quality は圧縮の手間（大きいほど小さく・遅くなる）
+        EncodingProfile('webp_lossless', 'WebP（可逆）', 'WEBP', 'webp', {'lossless': True, 'quality': 80, 'method': 4}),
+        # 色の間引き（4:2:0）で文字の光彩がにじまないよう 4:4:4 で保存する
+        EncodingProfile('jpeg', 'JPEG（高画質）', 'JPEG', 'jpg',
+                        {'quality': 92, 'optimize': True, 'progressive': True, 'subsampling': 0}),
+        EncodingProfile('webp', 'WebP（非可逆）', 'WEBP', 'webp', {'quality': 85, 'method': 4}),
+    )
+}
+# サイズ上限を超えたときに落としていく順（画質の高い順）
+PROFILE_ORDER: Tuple[str, ...] = tuple(PROFILES)
+
+DEFAULT_PROFILE = 'png'
+
+_MAGIC = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+)
+
+
+def resolve_profile(name: Optional[str]) -> EncodingProfile:
+    """プロファイル名から EncodingProfile を返す（None・空文字ならデフォルト）。
+
+    Raises:
+        ValueError: 不明なプロファイル名の場合
+    """
+    key = (name or DEFAULT_PROFILE).strip().lower()
+    if key not in PROFILES:
+        raise ValueError(f"不明なエンコード設定です: {name}（{', '.join(PROFILE_ORDER)} から選択）")
+    return PROFILES[key]
+
+
+def extension_for(data: bytes) -> str:
+    """エンコード済みのバイト列から拡張子を判定する（判定できなければ 'png'）"""
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    for magic, extension in _MAGIC:
+        if data.startswith(magic):
+            return extension
+    return 'png'
+
+
+@dataclass
+class EncodeResult:
+    """エンコード結果
+
+    Attributes:
+        data: エンコード済みの画像
+        profile: 実際に使ったプロファイル名
+        requested: 指定されたプロファイル名
+        encode_ms: エンコードにかかった時間（上限超過で作り直した分も含む、ミリ秒）
+        attempts: 試したプロファイルと、そのサイズ（バイト）
+        over_budget: どのプロファイルでも上限に収まらなかった場合 True（最も小さい結果を返す）
+        template_version: 描画に実際に使ったテンプレート・アセットの版（出力キャッシュのキー用、
+            描画中にアセットが読み直された場合は None）
+    """
+    data: bytes
+    profile: str
+    requested: str
+    encode_ms: float
+    attempts: List[Tuple[str, int]]
+    over_budget: bool = False
+    template_version: Optional[str] = None
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    @property
+    def fell_back(self) -> bool:
+        return self.profile != self.requested
+
+    def summary(self) -> str:
+        """ログ用の1行表記（例: encode=webp_lossless 812KB 240ms (png 9650KB超過)）"""
+        text = f"encode={self.profile} {self.size // 1024}KB {self.encode_ms:.0f}ms"
+        skipped = [f"{name} {size // 1024}KB" for name, size in self.attempts if name != self.profile]
+        if skipped:
+            text += f" ({', '.join(skipped)}超過)"
+        return text
+
+
+def encode_image(img: Image.Image, profile: str = DEFAULT_PROFILE, max_bytes: int = 0) -> EncodeResult:
+    """画像をプロファイルに従ってエンコードする。
+
+    max_bytes を超えた場合は PROFILE_ORDER で後ろのプロファイルから順に作り直し、
+    最初に収まったものを返します。
+
+    Args:
+        img: エンコードする画像
+        profile: 最初に試すプロファイル名
+        max_bytes: 出力サイズの上限（0で無制限）
+
+    Raises:
+        ValueError: 不明なプロファイル名の場合
+    """
+    first = resolve_profile(profile)
+    candidates = PROFILE_ORDER[PROFILE_ORDER.index(first.name):]
+    started = time.perf_counter()
+    attempts: List[Tuple[str, int]] = []
+    best: Optional[Tuple[bytes, str]] = None
+    for name in candidates:
+        data = _encode(img, PROFILES[name])
+        attempts.append((name, len(data)))
+        if best is None or len(data) < len(best[0]):
+            best = (data, name)
+        if not max_bytes or len(data) <= max_bytes:
+            return EncodeResult(data, name, first.name, (time.perf_counter() - started) * 1000, attempts)
+    logger.warning(
+        f"ポスター画像がどのエンコード設定でも上限に収まりません: 上限={max_bytes // 1024}KB, "
+        f"最小={len(best[0]) // 1024}KB ({best[1]})"
+    )
+    return EncodeResult(best[0], best[1], first.name, (time.perf_counter() - started) * 1000, attempts, over_budget=True)
+
+
+def _encode(img: Image.Image, profile: EncodingProfile) -> bytes:
+    if profile.format == 'JPEG' and img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+    buf = io.BytesIO()
+    try:
+        img.save(buf, format=profile.format, **profile.options)
+    except OSError:
+        if profile.format != 'JPEG':
+            raise
+        # optimize/progressive は出力全体が画素数ぶんのバッファに収まる前提のため、
+        # ノイズの多い画像では失敗することがある。その場合は通常の保存で作り直す
+        buf = io.BytesIO()
+        options = {k: v for k, v in profile.options.items() if k not in ('optimize', 'progressive')}
+        img.save(buf, format=profile.format, **options)
+    return buf.getvalue()
+
+
+class EncodeStats:
+    """プロファイルごとのエンコード時間・サイズの集計（スレッドセーフ）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._count: Dict[str, int] = {}
+        self._bytes: Dict[str, int] = {}
+        self._ms: Dict[str, float] = {}
+        self._fallbacks = 0
+        self._over_budget = 0
+
+    def record(self, result: EncodeResult) -> None:
+        with self._lock:
+            self._count[result.profile] = self._count.get(result.profile, 0) + 1
+            self._bytes[result.profile] = self._bytes.get(result.profile, 0) + result.size
+            self._ms[result.profile] = self._ms.get(result.profile, 0.0) + result.encode_ms
+            if result.fell_back:
+                self._fallbacks += 1
+            if result.over_budget:
+                self._over_budget += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            values: Dict[str, Any] = {}
+            for name in PROFILE_ORDER:
+                count = self._count.get(name)
+                if count:
+                    values[name] = (
+                        f"{count}件 平均{self._bytes[name] / count / 1024:.0f}KB {self._ms[name] / count:.0f}ms"
+                    )
+            values['fallbacks'] = self._fallbacks
+            values['over_budget'] = self._over_budget
+            return values
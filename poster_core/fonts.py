@@ -0,0 +1,245 @@
+"""
+フォント管理
+フォントファイルの探索を起動時に1回だけ行い、ファイルの中身をメモリに保持したうえで
+(パス, サイズ) ごとの FreeTypeFont を上限付きLRUでキャッシュします。
+"""
+
+import collections
+import io
+import logging
+import os
+import platform
+import threading
+import urllib.request
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from PIL import ImageFont
+
+import config
+
+logger = logging.getLogger(__name__)
+
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+_FONTS_DIR = os.path.join(_REPO_ROOT, 'data', 'fonts')
+_FONT_EXTENSIONS = ('.ttf', '.ttc', '.otf', '.otc')
+
+# 探索するフォントディレクトリ（存在するものだけ使う）
+_FONT_DIRS = [
+    _FONTS_DIR,
+    '/usr/share/fonts',
+    '/usr/local/share/fonts',
+    os.path.expanduser('~/.fonts'),
+    os.path.expanduser('~/.local/share/fonts'),
+    '/System/Library/Fonts',
+    '/Library/Fonts',
+    r'C:\Windows\Fonts',
+]
+
+# 指定フォントが見つからない場合のシステムフォント候補
+_LINUX_FALLBACKS = [
+    "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+]
+_WINDOWS_FALLBACKS = [
+    r"C:\Windows\Fonts\meiryo.ttc",
+    r"C:\Windows\Fonts\msgothic.ttc",
+    r"C:\Windows\Fonts\YuGothM.ttc",
+]
+
+# Google Fonts の直リンク（Noto Sans JP）
+# 注：このURLは変わる可能性があるため、本番では fonts.google.com API や CDN を利用推奨
+_FALLBACK_FONT_URL = "https://github.com/google/fonts/raw/main/ofl/notosansjp/NotoSansJP%5Bwght%5D.ttf"
+
+FontType = Any  # ImageFont.FreeTypeFont | ImageFont.ImageFont
+
+
+def build_font_index(dirs: Iterable[str] = _FONT_DIRS) -> Dict[str, str]:
+    """フォントディレクトリを走査し、ファイル名（小文字）→ フルパスの索引を作る。"""
+    index: Dict[str, str] = {}
+    for root_dir in dirs:
+        if not os.path.isdir(root_dir):
+            continue
+        for dirpath, _, filenames in os.walk(root_dir):
+            for filename in filenames:
+                if filename.lower().endswith(_FONT_EXTENSIONS):
+                    index.setdefault(filename.lower(), os.path.join(dirpath, filename))
+    return index
+
+
+def download_fallback_font() -> str:
+    """Google Fonts から Noto Sans JP をダウンロードし、data/fonts/ にキャッシュする。
+
+    Returns:
+        str: ダウンロードしたフォントファイルのパス。失敗時は空文字列。
+    """
+    os.makedirs(_FONTS_DIR, exist_ok=True)
+    font_path = os.path.join(_FONTS_DIR, 'NotoSansJP-Regular.ttf')
+
+    # すでにダウンロード済みならそれを返す
+    if os.path.exists(font_path):
+        return font_path
+
+    try:
+        logger.info("フォントが見つからないため、Noto Sans JP をダウンロードします: %s", _FALLBACK_FONT_URL)
+        urllib.request.urlretrieve(_FALLBACK_FONT_URL, font_path)
+        logger.info("フォントをダウンロードしました: %s", font_path)
+        return font_path
+    except Exception as e:
+        logger.error("フォントのダウンロードに失敗しました: %s", e)
+        return ""
+
+
+class FontManager:
+    """フォントの解決・読み込みをまとめて行うクラス（スレッドセーフ）
+
+    解決順:
+    1) 指定されたパス（相対の場合はリポジトリルートや data/fonts も探索）
+    2) フォントディレクトリの索引からファイル名で検索
+    3) システムの既存日本語フォント（Windows/Linux 共通）
+    4) Noto Sans JP を Google Fonts からダウンロード（data/fonts/ にキャッシュ）
+    5) PIL のデフォルトフォント
+
+    指定パスごとの解決結果は保持するので、探索・ダウンロードは最初の1回だけです。
+    """
+
+    def __init__(self, cache_size: int = 64, font_dirs: Iterable[str] = _FONT_DIRS, allow_download: bool = True):
+        """
+        Args:
+            cache_size: 保持する FreeTypeFont の上限数
+            font_dirs: 索引を作るフォントディレクトリ
+            allow_download: 見つからない場合にフォントをダウンロードするか
+        """
+        self.cache_size = max(1, cache_size)
+        self._font_dirs = list(font_dirs)
+        self._allow_download = allow_download
+        self._index: Optional[Dict[str, str]] = None
+        self._resolved: Dict[str, Optional[str]] = {}
+        self._data: Dict[str, bytes] = {}
+        self._fonts: 'collections.OrderedDict[Tuple[str, int], FontType]' = collections.OrderedDict()
+        self._default_font: Optional[FontType] = None
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def preload(self, prefer_paths: Iterable[str]) -> None:
+        """指定フォントのパス解決とファイル読み込みを先に済ませておく。"""
+        for prefer_path in prefer_paths:
+            self.resolve(prefer_path)
+
+    def resolve(self, prefer_path: str) -> Optional[str]:
+        """指定フォントに対応する実ファイルのパスを返す（結果は保持する）。見つからなければ None。"""
+        with self._lock:
+            if prefer_path in self._resolved:
+                return self._resolved[prefer_path]
+            path = self._find(prefer_path)
+            if path is None:
+                logger.warning(f"フォントを読み込めませんでした。PILのデフォルトフォントを使用します: {prefer_path}")
+            else:
+                logger.info(f"フォントを解決しました: {prefer_path} -> {path}")
+            self._resolved[prefer_path] = path
+            return path
+
+    def get(self, prefer_path: str, size: int) -> FontType:
+        """指定フォント・サイズの FreeTypeFont を返す（LRUキャッシュ）。"""
+        path = self.resolve(prefer_path)
+        if path is None:
+            with self._lock:
+                if self._default_font is None:
+                    self._default_font = ImageFont.load_default()
+                return self._default_font
+        key = (path, size)
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is not None:
+                self._fonts.move_to_end(key)
+                self._hits += 1
+                return font
+            self._misses += 1
+            font = ImageFont.truetype(io.BytesIO(self._data[path]), size)
+            self._fonts[key] = font
+            if len(self._fonts) > self.cache_size:
+                self._fonts.popitem(last=False)
+                self._evictions += 1
+            return font
+
+    def clear(self) -> None:
+        """解決結果・フォントデータ・キャッシュをすべて破棄する。"""
+        with self._lock:
+            self._index = None
+            self._resolved.clear()
+            self._data.clear()
+            self._fonts.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """キャッシュの統計を返す。"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / total, 3) if total else 0.0,
+                'cached': len(self._fonts),
+                'evictions': self._evictions,
+                'font_files': len(self._data),
+                'font_bytes_mb': round(sum(len(d) for d in self._data.values()) / 1024 / 1024, 1),
+            }
+
+    # ------------------------------------------------------------------
+
+    def _candidates(self, prefer_path: str) -> List[str]:
+        candidates = []
+        if prefer_path:
+            candidates.append(prefer_path)
+            if not os.path.isabs(prefer_path):
+                candidates.append(os.path.join(_REPO_ROOT, prefer_path))
+                candidates.append(os.path.join(_FONTS_DIR, prefer_path))
+            if self._index is None:
+                self._index = build_font_index(self._font_dirs)
+            indexed = self._index.get(os.path.basename(prefer_path).lower())
+            if indexed:
+                candidates.append(indexed)
+        candidates.extend(_LINUX_FALLBACKS if platform.system() == "Linux" else _WINDOWS_FALLBACKS)
+        return candidates
+
+    def _find(self, prefer_path: str) -> Optional[str]:
+        for path in self._candidates(prefer_path):
+            if self._load(path):
+                return path
+
+        # ここまで見つからなければ Noto Sans JP を自動ダウンロード
+        if self._allow_download:
+            downloaded = download_fallback_font()
+            if downloaded and self._load(downloaded):
+                return downloaded
+        return None
+
+    def _load(self, path: str) -> bool:
+        """フォントファイルを読み込み、PILで開けることを確認してメモリに保持する。"""
+        if path in self._data:
+            return True
+        try:
+            if not os.path.exists(path):
+                return False
+            with open(path, 'rb') as f:
+                data = f.read()
+            ImageFont.truetype(io.BytesIO(data), 10)
+        except Exception:
+            return False
+        self._data[path] = data
+        return True
+
+
+_default_manager: Optional[FontManager] = None
+_default_lock = threading.Lock()
+
+
+def get_font_manager() -> FontManager:
+    """プロセス全体で共有するフォントマネージャーを返す。"""
+    global _default_manager
+    with _default_lock:
+        if _default_manager is None:
+            _default_manager = FontManager(cache_size=config.POSTER_FONT_CACHE_SIZE)
+        return _default_manager
@@ -0,0 +1,112 @@
+"""
+グロー付き文字のビットマップキャッシュ
+句読点・かな・「…」などポスター間で繰り返し現れる文字について、光彩込みのマスクを
+(文字, フォント, サイズ, 光彩スタイル) ごとに保持し、次回からは貼り付けるだけで描画します。
+"""
+
+import collections
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+import config
+from .glow import GlowLayers, paste_glow_masks, render_glow_masks
+
+# (光彩レイヤーのマスク, 本体のマスク, 描画位置からのオフセット)
+GlyphTile = Tuple[List[Image.Image], Image.Image, Tuple[int, int]]
+
+
+def _font_key(font) -> Tuple[Any, ...]:
+    """フォントの識別子（メモリから読み込んだフォントはパスを持たないため名前とサイズで識別する）"""
+    try:
+        return tuple(font.getname()) + (font.size,)
+    except Exception:
+        return (id(font),)
+
+
+class GlyphCache:
+    """グロー付き文字タイルの上限付きLRU（メモリ量で上限を設ける、スレッドセーフ）"""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, max_text_len: int = 16):
+        """
+        Args:
+            max_bytes: 保持するマスクの合計バイト数の上限
+            max_text_len: キャッシュする文字列の最大長（長い文は再利用されにくいので都度描画する）
+        """
+        self.max_bytes = max(0, max_bytes)
+        self.max_text_len = max_text_len
+        self._tiles: 'collections.OrderedDict[Tuple[Any, ...], Tuple[GlyphTile, int]]' = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get_tile(self, text: str, font, glow_layers: GlowLayers,
+                 main_color: Tuple[int, ...] = (255, 255, 255)) -> GlyphTile:
+        """文字のタイルを返す（無ければ描画して保持する）。"""
+        if len(text) > self.max_text_len or not self.max_bytes:
+            return render_glow_masks(text, font, glow_layers)
+
+        key = (text, _font_key(font), tuple((r, tuple(c)) for r, c in glow_layers), tuple(main_color))
+        with self._lock:
+            cached = self._tiles.get(key)
+            if cached is not None:
+                self._tiles.move_to_end(key)
+                self._hits += 1
+                return cached[0]
+            self._misses += 1
+
+        tile = render_glow_masks(text, font, glow_layers)
+        halos, mask, _ = tile
+        size = mask.width * mask.height * (len(halos) + 1)
+        with self._lock:
+            if key not in self._tiles:
+                self._tiles[key] = (tile, size)
+                self._bytes += size
+                while self._bytes > self.max_bytes and self._tiles:
+                    _, (_, evicted_size) = self._tiles.popitem(last=False)
+                    self._bytes -= evicted_size
+                    self._evictions += 1
+        return tile
+
+    def draw(self, canvas: Image.Image, text: str, x: int, y: int, font, glow_layers: GlowLayers,
+             main_color: Tuple[int, ...] = (255, 255, 255)) -> None:
+        """グロー付きテキストをキャッシュ経由でキャンバスの (x, y) に描画する（draw.text と同じ基準位置）。"""
+        if not text:
+            return
+        halos, mask, (ox, oy) = self.get_tile(text, font, glow_layers, main_color)
+        paste_glow_masks(canvas, halos, mask, x + ox, y + oy, glow_layers, main_color)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tiles.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """ヒット率などの統計を返す。"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'entries': len(self._tiles),
+                'size_mb': round(self._bytes / 1024 / 1024, 1),
+                'max_mb': round(self.max_bytes / 1024 / 1024, 1),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / total, 3) if total else 0.0,
+                'evictions': self._evictions,
+            }
+
+
+_default_cache: Optional[GlyphCache] = None
+_default_lock = threading.Lock()
+
+
+def get_glyph_cache() -> GlyphCache:
+    """プロセス全体で共有するグリフキャッシュを返す。"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = GlyphCache(max_bytes=config.POSTER_GLYPH_CACHE_MB * 1024 * 1024)
+        return _default_cache
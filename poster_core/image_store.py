@@ -0,0 +1,151 @@
+"""
+キャラクター画像（pfp）のローカル保存
+画像ストレージから取得した画像をファイルとして保存し、/poster や誕生日通知で再ダウンロードせずに使えるようにします。
+"""
+
+import io
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+import aiohttp
+from PIL import Image, UnidentifiedImageError
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class ImageStore:
+    """character_id ごとの画像ファイルを保存・読み出すクラス（スレッドセーフ）
+
+    ファイル名は画像ストレージ上の名前（例: pfp_12.webp）をそのまま使います。
+    """
+
+    def __init__(self, root: str):
+        """
+        Args:
+            root: 画像を保存するディレクトリ
+        """
+        self.root = root
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def path_for(self, character_id: str) -> str:
+        """画像の保存先パスを返す。"""
+        filename = os.path.basename(config.get_character_image_url(character_id))
+        return os.path.join(self.root, filename)
+
+    def has(self, character_id: str) -> bool:
+        """画像が保存済みか"""
+        return os.path.exists(self.path_for(character_id))
+
+    def get(self, character_id: str) -> Optional[bytes]:
+        """保存済みの画像を読み出す。無ければ None。"""
+        try:
+            with open(self.path_for(character_id), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = None
+        except OSError as e:
+            logger.warning(f"保存済み画像の読み込みに失敗: character_id={character_id}, {e}")
+            data = None
+        with self._lock:
+            if data:
+                self._hits += 1
+            else:
+                self._misses += 1
+        return data or None
+
+    def put(self, character_id: str, data: bytes) -> None:
+        """画像を保存する（一時ファイルに書いてから置き換えるので、読み手が途中の状態を見ることはない）。"""
+        path = self.path_for(character_id)
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.tmp_')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """保存数とヒット率などの統計を返す。"""
+        try:
+            files = sum(1 for name in os.listdir(self.root) if not name.startswith('.'))
+        except OSError:
+            files = 0
+        with self._lock:
+            return {'files': files, 'hits': self._hits, 'misses': self._misses}
+
+
+_CHUNK_SIZE = 64 * 1024
+# ここまで受信しても画像の形式が分からなければ、画像ではないとみなして打ち切る
+_HEADER_LIMIT = 64 * 1024
+
+
+class ImageTooLargeError(Exception):
+    """ダウンロードする画像が上限サイズを超えた場合の例外"""
+
+    def __init__(self, limit: int):
+        super().__init__(f"画像が上限サイズ（{limit}バイト）を超えています")
+        self.limit = limit
+
+
+async def download_character_image(session: aiohttp.ClientSession, character_id: str,
+                                   timeout: Optional[float] = None, max_bytes: Optional[int] = None) -> bytes:
+    """画像ストレージからキャラクター画像をメモリ上にダウンロードする。
+
+    受信しながら画像ヘッダーを解析し、先頭 64KiB で画像と分からないものや上限サイズを超えるものは途中で打ち切る。
+
+    Args:
+        session: 共有の aiohttp セッション
+        character_id: キャラクターID
+        timeout: タイムアウト（秒、省略時は POSTER_HTTP_TIMEOUT）
+        max_bytes: 上限サイズ（バイト、省略時は POSTER_IMAGE_MAX_MB）
+
+    Returns:
+        bytes: 画像データ
+
+    Raises:
+        aiohttp.ClientError: 通信に失敗した場合（404 等を含む）
+        asyncio.TimeoutError: タイムアウトした場合
+        ImageTooLargeError: 上限サイズを超えた場合
+        PIL.UnidentifiedImageError: 画像として解析できない場合
+    """
+    url = config.get_character_image_url(character_id)
+    limit = max_bytes or config.POSTER_IMAGE_MAX_MB * 1024 * 1024
+    client_timeout = aiohttp.ClientTimeout(total=timeout or config.POSTER_HTTP_TIMEOUT)
+    async with session.get(url, timeout=client_timeout) as resp:
+        resp.raise_for_status()
+        if resp.content_length is not None and resp.content_length > limit:
+            raise ImageTooLargeError(limit)
+        buf = bytearray()
+        identified = False
+        # 形式が分かるまでは受信のたびにヘッダーだけ読む（デコード本体は描画時にこのバイト列から行う）
+        async for chunk in resp.content.iter_chunked(_CHUNK_SIZE):
+            buf += chunk
+            if len(buf) > limit:
+                raise ImageTooLargeError(limit)
+            if not identified:
+                identified = _is_image_header(buf)
+                if not identified and len(buf) >= _HEADER_LIMIT:
+                    break
+    if not identified:
+        raise UnidentifiedImageError(f"画像として解析できません: character_id={character_id}")
+    return bytes(buf)
+
+
+def _is_image_header(data: bytearray) -> bool:
+    """受信済みの先頭部分から画像の形式を判別できるか（ピクセルはデコードしない）"""
+    try:
+        with Image.open(io.BytesIO(data)):
+            return True
+    except (OSError, SyntaxError, EOFError):
+        # UnidentifiedImageError のほか、ヘッダーの途中までしか届いていない場合の読み込みエラー
+        return False
@@ -0,0 +1,143 @@
+"""
+キャラクター情報のキャッシュ
+スクレイピング結果をキャラクターIDごとにSQLiteへ保存し、再取得を省きます。
+"""
+
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry:
+    """キャッシュされたキャラクター情報"""
+
+    def __init__(self, info: Dict[str, str], fetched_at: float, ttl: float):
+        self.info = info
+        self.fetched_at = fetched_at
+        self.ttl = ttl
+
+    @property
+    def age(self) -> float:
+        """取得からの経過秒数"""
+        return time.time() - self.fetched_at
+
+    @property
+    def stale(self) -> bool:
+        """TTLを過ぎているか（古くても返却は可能）"""
+        return self.age > self.ttl
+
+
+class CharacterInfoCache:
+    """character_id をキーにした永続キャッシュ（スレッドセーフ）
+
+    TTLを過ぎたエントリも削除はせず stale として返すので、
+    呼び出し側で「古い値を即返しつつ裏で更新する」運用ができます。
+    """
+
+    def __init__(self, path: str, ttl: float):
+        """
+        Args:
+            path: SQLiteファイルのパス
+            ttl: エントリを新鮮とみなす秒数
+        """
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS character_info ("
+                " character_id TEXT PRIMARY KEY,"
+                " info TEXT NOT NULL,"
+                " fetched_at REAL NOT NULL)"
+            )
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """コミット後に必ずクローズする接続を返す"""
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, character_id: str) -> Optional[CacheEntry]:
+        """キャッシュを取得する。存在しなければ None。"""
+        try:
+            with self._lock, self._connect() as conn:
+                row = conn.execute(
+                    "SELECT info, fetched_at FROM character_info WHERE character_id = ?",
+                    (str(character_id),),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"キャラクター情報キャッシュの読み込みに失敗: {e}")
+            row = None
+        if row is None:
+            self._misses += 1
+            return None
+        try:
+            info = json.loads(row[0])
+        except json.JSONDecodeError:
+            logger.warning(f"キャッシュの形式が不正なため無視します: character_id={character_id}")
+            self._misses += 1
+            return None
+        entry = CacheEntry(info, row[1], self.ttl)
+        if entry.stale:
+            self._stale_hits += 1
+        else:
+            self._hits += 1
+        return entry
+
+    def put(self, character_id: str, info: Dict[str, str], fetched_at: Optional[float] = None) -> None:
+        """キャッシュを保存（上書き）する。"""
+        payload = json.dumps(info, ensure_ascii=False)
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO character_info (character_id, info, fetched_at) VALUES (?, ?, ?)",
+                    (str(character_id), payload, fetched_at if fetched_at is not None else time.time()),
+                )
+        except sqlite3.Error as e:
+            logger.error(f"キャラクター情報キャッシュの保存に失敗: {e}")
+
+    def invalidate(self, character_id: Optional[str] = None) -> int:
+        """キャッシュを削除する。
+
+        Args:
+            character_id: 削除するID。None の場合は全件削除。
+
+        Returns:
+            int: 削除した件数
+        """
+        with self._lock, self._connect() as conn:
+            if character_id is None:
+                cur = conn.execute("DELETE FROM character_info")
+            else:
+                cur = conn.execute("DELETE FROM character_info WHERE character_id = ?", (str(character_id),))
+            return cur.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """ヒット率などの統計を返す。"""
+        try:
+            with self._lock, self._connect() as conn:
+                entries = conn.execute("SELECT COUNT(*) FROM character_info").fetchone()[0]
+        except sqlite3.Error:
+            entries = -1
+        return {
+            'entries': entries,
+            'hits': self._hits,
+            'stale_hits': self._stale_hits,
+            'misses': self._misses,
+            'ttl_sec': self.ttl,
+        }
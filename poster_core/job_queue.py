@@ -0,0 +1,170 @@
+"""
+ポスター作成ジョブのキュー
+同時に実行するジョブ数に上限を設け、同じキーのジョブが実行中・待機中なら新しく作らずに相乗りさせます
+（singleflight）。受付時に待ち順と完成までの目安時間を返します。
+"""
+
+import asyncio
+import collections
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFullError(Exception):
+    """待機中のジョブが上限に達していて受け付けられない場合の例外"""
+
+    def __init__(self, waiting: int):
+        super().__init__(f"ジョブの待ちが上限に達しています（{waiting}件）")
+        self.waiting = waiting
+
+
+@dataclass
+class JobTicket:
+    """受付結果
+
+    Attributes:
+        future: ジョブの結果（相乗りした呼び出し元とも共有）
+        position: 待ち順（0 ならすぐに実行、1 以上は前に並んでいるジョブ数＋1）
+        eta: 完成までの目安（秒）
+        shared: 実行中・待機中の同じジョブに相乗りした場合 True
+    """
+    future: 'asyncio.Future'
+    position: int
+    eta: float
+    shared: bool
+
+    async def result(self) -> Any:
+        # 呼び出し元が待つのをやめても、共有しているジョブ自体は止めない
+        return await asyncio.shield(self.future)
+
+
+class _Job:
+    def __init__(self, key: Hashable, factory: Callable[[], Awaitable[Any]], future: 'asyncio.Future'):
+        self.key = key
+        self.factory = factory
+        self.future = future
+        self.started_at: Optional[float] = None
+
+
+class JobQueue:
+    """同時実行数に上限のあるジョブキュー（キーごとに重複を除く、イベントループ内で使う）"""
+
+    def __init__(self, concurrency: int = 2, max_waiting: int = 50, initial_estimate: float = 20.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            concurrency: 同時に実行するジョブ数
+            max_waiting: 待機させられるジョブ数の上限（相乗りは数えない）
+            initial_estimate: 実績が無いときの1ジョブあたりの所要時間の目安（秒）
+            clock: 時刻取得関数（テスト用）
+        """
+        self.concurrency = max(1, concurrency)
+        self.max_waiting = max(0, max_waiting)
+        self._clock = clock
+        self._avg_seconds = initial_estimate
+        self._waiting: 'collections.OrderedDict[Hashable, _Job]' = collections.OrderedDict()
+        self._running: Dict[Hashable, _Job] = {}
+        self._tasks: set = set()
+        self._completed = 0
+        self._failed = 0
+        self._shared = 0
+        self._rejected = 0
+
+    def submit(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> JobTicket:
+        """ジョブを受け付ける。同じキーのジョブが実行中・待機中ならそれに相乗りする。
+
+        Args:
+            key: 重複をまとめるキー（キャラクターIDなど）
+            factory: ジョブ本体のコルーチンを作る関数（相乗りした場合は呼ばれない）
+
+        Raises:
+            JobQueueFullError: 待機中のジョブが上限に達している場合
+        """
+        job = self._running.get(key) or self._waiting.get(key)
+        if job is not None:
+            self._shared += 1
+            return JobTicket(job.future, self._position(key), self._eta(job), shared=True)
+
+        if len(self._running) >= self.concurrency and len(self._waiting) >= self.max_waiting:
+            self._rejected += 1
+            raise JobQueueFullError(len(self._waiting))
+
+        job = _Job(key, factory, asyncio.get_running_loop().create_future())
+        self._waiting[key] = job
+        position = self._position(key)
+        eta = self._eta(job)
+        self._dispatch()
+        return JobTicket(job.future, position, eta, shared=False)
+
+    def _position(self, key: Hashable) -> int:
+        if key in self._running:
+            return 0
+        index = list(self._waiting).index(key)
+        free = self.concurrency - len(self._running)
+        return 0 if index < free else index - free + 1
+
+    def _eta(self, job: _Job) -> float:
+        if job.started_at is not None:
+            return max(1.0, self._avg_seconds - (self._clock() - job.started_at))
+        position = self._position(job.key)
+        # 前に並んでいるジョブが concurrency 件ずつ捌けていく
+        return self._avg_seconds * (math.ceil(position / self.concurrency) + 1) if position else self._avg_seconds
+
+    def _dispatch(self) -> None:
+        while self._waiting and len(self._running) < self.concurrency:
+            key, job = self._waiting.popitem(last=False)
+            self._running[key] = job
+            job.started_at = self._clock()
+            task = asyncio.create_task(self._run(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job: _Job) -> None:
+        try:
+            result = await job.factory()
+        except BaseException as e:
+            self._failed += 1
+            if not job.future.done():
+                if isinstance(e, asyncio.CancelledError):
+                    job.future.cancel()
+                else:
+                    job.future.set_exception(e)
+                    # 誰も結果を取りに来なかった場合に未取得の例外として警告されないようにする
+                    job.future.exception()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        else:
+            self._completed += 1
+            elapsed = self._clock() - job.started_at
+            # 所要時間の移動平均で目安を更新する
+            self._avg_seconds = self._avg_seconds * 0.8 + elapsed * 0.2
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._running.pop(job.key, None)
+            self._dispatch()
+
+    def cancel_all(self) -> None:
+        """待機中・実行中のジョブをすべて取り消す（コグの解放時用）"""
+        for job in self._waiting.values():
+            job.future.cancel()
+        self._waiting.clear()
+        for task in list(self._tasks):
+            task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'concurrency': self.concurrency,
+            'running': len(self._running),
+            'waiting': len(self._waiting),
+            'completed': self._completed,
+            'failed': self._failed,
+            'shared': self._shared,
+            'rejected': self._rejected,
+            'avg_seconds': round(self._avg_seconds, 1),
+        }
@@ -0,0 +1,88 @@
+"""
+ポスターの描画レイヤーキャッシュ
+毎回同じになる部分（表のラベル欄などテンプレートの枠）と、キャラクターごとに同じになる部分
+（キャラ画像＋マスクの土台）を描画済みで保持し、リクエストごとには変化するテキストだけを描きます。
+"""
+
+import collections
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from PIL import Image
+
+# テンプレートの枠の位置を変えたら上げる（保持している枠を作り直す）
+TEMPLATE_VERSION = 1
+
+# (レイヤー画像, 貼り付け位置)
+Layer = Tuple[Image.Image, Tuple[int, int]]
+
+
+class LayerCache:
+    """テンプレートの枠と、キャラクターごとの土台画像のキャッシュ（スレッドセーフ）"""
+
+    def __init__(self, max_bases: int = 8):
+        """
+        Args:
+            max_bases: 保持するキャラクターごとの土台画像の上限数（0で保持しない）
+        """
+        self.max_bases = max(0, max_bases)
+        self._lock = threading.Lock()
+        self._chrome: Dict[Hashable, Layer] = {}
+        self._bases: 'collections.OrderedDict[Hashable, Tuple[Any, Image.Image]]' = collections.OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def chrome(self, key: Hashable, build: Callable[[], Layer]) -> Layer:
+        """テンプレートの枠のレイヤーを返す（key が変わったら作り直し、古いものは捨てる）。"""
+        with self._lock:
+            layer = self._chrome.get(key)
+            if layer is None:
+                layer = build()
+                self._chrome = {key: layer}
+            return layer
+
+    def base(self, key: Optional[Hashable], depends_on: Any, build: Callable[[], Image.Image]) -> Image.Image:
+        """キャラクターごとの土台画像の複製を返す（描き込んでも保持しているものは変わらない）。
+
+        Args:
+            key: キャラクターを識別するキー（None ならキャッシュしない）
+            depends_on: 土台の作成に使った共有アセット（マスクなど）。同一オブジェクトの場合だけ再利用する
+            build: 土台画像を作る関数
+        """
+        if key is None or not self.max_bases:
+            return build()
+        with self._lock:
+            cached = self._bases.get(key)
+            if cached is not None and cached[0] is depends_on:
+                self._bases.move_to_end(key)
+                self._hits += 1
+                return cached[1].copy()
+            self._misses += 1
+
+        image = build()
+        with self._lock:
+            self._bases[key] = (depends_on, image.copy())
+            self._bases.move_to_end(key)
+            while len(self._bases) > self.max_bases:
+                self._bases.popitem(last=False)
+                self._evictions += 1
+        return image
+
+    def clear(self) -> None:
+        with self._lock:
+            self._chrome.clear()
+            self._bases.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'template_version': TEMPLATE_VERSION,
+                'chrome_layers': len(self._chrome),
+                'bases': len(self._bases),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / total, 3) if total else 0.0,
+                'evictions': self._evictions,
+            }
@@ -0,0 +1,176 @@
+"""
+テキストレイアウト
+フォントごとに文字幅を1回だけ測って保持し、累積幅（prefix sum）を使って線形時間で折り返し、
+領域に収まる最大のフォントサイズを二分探索で求めます。縦書きのセリフ・目標・表の値で共通に使います。
+"""
+
+import bisect
+import threading
+import weakref
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar('T')
+
+# 縦書きの文字送り・列幅の基準にする代表文字
+REFERENCE_CHAR = '漢'
+
+
+class FontMetrics:
+    """1つのフォントの文字幅を保持するクラス（スレッドセーフ）"""
+
+    def __init__(self, font):
+        self.font = font
+        self._advances: Dict[str, float] = {}
+        self._boxes: Dict[str, Tuple[int, int, int, int]] = {}
+        self._lock = threading.Lock()
+
+    def advance(self, ch: str) -> float:
+        """文字の送り幅"""
+        width = self._advances.get(ch)
+        if width is None:
+            width = self.font.getlength(ch)
+            with self._lock:
+                self._advances[ch] = width
+        return width
+
+    def bbox(self, ch: str) -> Tuple[int, int, int, int]:
+        """文字のインク領域（draw.textbbox((0, 0), ch) と同じ値）"""
+        box = self._boxes.get(ch)
+        if box is None:
+            box = tuple(self.font.getbbox(ch))
+            with self._lock:
+                self._boxes[ch] = box
+        return box
+
+    def ink_width(self, ch: str) -> int:
+        """文字のインク幅"""
+        left, _, right, _ = self.bbox(ch)
+        return right - left
+
+    def prefix_widths(self, text: str) -> List[float]:
+        """累積幅。text[i:j] の幅は prefix[j] - prefix[i]"""
+        prefix = [0.0]
+        total = 0.0
+        for ch in text:
+            total += self.advance(ch)
+            prefix.append(total)
+        return prefix
+
+    def text_width(self, text: str) -> float:
+        """文字列の幅（送り幅の合計）"""
+        return sum(self.advance(ch) for ch in text)
+
+
+_metrics: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+_metrics_lock = threading.Lock()
+
+
+def metrics_for(font) -> FontMetrics:
+    """フォントに対応する FontMetrics を返す（フォントオブジェクトが生きている間は使い回す）。"""
+    with _metrics_lock:
+        metrics = _metrics.get(font)
+        if metrics is None:
+            metrics = FontMetrics(font)
+            _metrics[font] = metrics
+        return metrics
+
+
+def wrap_spans(prefix: Sequence[float], max_width: float) -> List[Tuple[int, int]]:
+    """累積幅から、幅 max_width に収まるよう1文字単位で折り返した (開始, 終了) の一覧を作る。
+
+    1文字だけで幅を超える場合はその1文字で1行にする。
+    """
+    spans: List[Tuple[int, int]] = []
+    n = len(prefix) - 1
+    start = 0
+    while start < n:
+        # prefix[end] - prefix[start] <= max_width を満たす最大の end
+        end = bisect.bisect_right(prefix, prefix[start] + max_width, start + 1, n + 1) - 1
+        end = max(end, start + 1)
+        spans.append((start, end))
+        start = end
+    return spans
+
+
+def wrap_text(text: str, font, max_width: float) -> List[str]:
+    """文字列を1文字単位で折り返す。"""
+    prefix = metrics_for(font).prefix_widths(text)
+    return [text[start:end] for start, end in wrap_spans(prefix, max_width)]
+
+
+def split_balanced(text: str, font, max_width: float, window: int = 10) -> List[str]:
+    """中央付近で、左右の幅がなるべく揃い、どちらも max_width に収まる位置で2行に分ける。
+
+    収まる位置が無ければ文字数の半分で分ける。
+    """
+    prefix = metrics_for(font).prefix_widths(text)
+    total = prefix[-1]
+    mid = len(text) // 2
+    best_split, best_diff = mid, None
+    for i in range(max(1, mid - window), min(len(text) - 1, mid + window)):
+        left, right = prefix[i], total - prefix[i]
+        if left <= max_width and right <= max_width:
+            diff = abs(left - right)
+            if best_diff is None or diff < best_diff:
+                best_split, best_diff = i, diff
+    return [text[:best_split], text[best_split:]]
+
+
+def fit_largest(candidates: Sequence[int], fits: Callable[[int], Optional[T]]) -> Optional[Tuple[int, T]]:
+    """大きい順に並んだ候補から、fits が None 以外を返す最大のものを二分探索で探す。
+
+    小さいサイズほど収まりやすい（単調）ことを前提とする。
+
+    Returns:
+        (サイズ, fits の戻り値)。どれも収まらなければ None
+    """
+    lo, hi = 0, len(candidates) - 1
+    best: Optional[Tuple[int, T]] = None
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        result = fits(candidates[mid])
+        if result is not None:
+            best = (candidates[mid], result)
+            hi = mid - 1
+        else:
+            lo = mid + 1
+    return best
+
+
+class VerticalGrid:
+    """縦書きの格子（1列の文字数・列の間隔）"""
+
+    def __init__(self, font, char_w: int, char_h: int, char_spacing: int, rows_per_col: int):
+        self.font = font
+        self.char_w = char_w
+        self.char_h = char_h
+        self.char_spacing = char_spacing
+        self.rows_per_col = rows_per_col
+
+    @classmethod
+    def measure(cls, font, height: int, spacing_ratio: float) -> 'VerticalGrid':
+        """代表文字の大きさから格子を決める。"""
+        left, top, right, bottom = metrics_for(font).bbox(REFERENCE_CHAR)
+        char_w, char_h = right - left, bottom - top
+        char_spacing = max(1, int(char_h * spacing_ratio))
+        rows_per_col = max(1, height // char_spacing)
+        return cls(font, char_w, char_h, char_spacing, rows_per_col)
+
+    def columns_needed(self, length: int) -> int:
+        return (length + self.rows_per_col - 1) // self.rows_per_col
+
+    def positions(self, text: str, x_left: int, x_right: int, y_top: int,
+                  column_gap: int) -> List[Tuple[str, int, int]]:
+        """右端の列から左へ、各文字を列の右端に揃えた描画位置 (文字, x, y) を返す。
+
+        領域の左端からはみ出す列に入る文字は含めない。
+        """
+        metrics = metrics_for(self.font)
+        positions = []
+        for idx, ch in enumerate(text):
+            col, row = divmod(idx, self.rows_per_col)
+            x_col_right = x_right - col * (self.char_w + column_gap)
+            if x_col_right - self.char_w < x_left:
+                break
+            positions.append((ch, x_col_right - metrics.ink_width(ch), y_top + row * self.char_spacing))
+        return positions
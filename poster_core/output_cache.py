@@ -0,0 +1,205 @@
+"""
+完成したポスター画像のキャッシュ
+(キャラクター画像, キャラクター情報, テンプレート・アセットの版, エンコード設定) のハッシュをキーに、
+エンコード済みの画像をメモリ（よく使うもの）とディスク（すべて）に保持します。
+どちらも合計サイズに上限があり、古く使われていないものから削除します。
+"""
+
+import collections
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_SUFFIX = '.bin'
+
+
+class OutputCache:
+    """エンコード済みポスター画像のキャッシュ（メモリ＋ディスク、スレッドセーフ）"""
+
+    def __init__(self, root: str, max_memory_bytes: int = 64 * 1024 * 1024, max_disk_bytes: int = 512 * 1024 * 1024):
+        """
+        Args:
+            root: ディスクに保存するディレクトリ
+            max_memory_bytes: メモリに保持する合計サイズの上限
+            max_disk_bytes: ディスクに保存する合計サイズの上限（0でディスクに保存しない）
+        """
+        self.root = root
+        self.max_memory_bytes = max(0, max_memory_bytes)
+        self.max_disk_bytes = max(0, max_disk_bytes)
+        self._lock = threading.Lock()
+        self._memory: 'collections.OrderedDict[str, bytes]' = collections.OrderedDict()
+        self._memory_bytes = 0
+        self._disk: Optional['collections.OrderedDict[str, int]'] = None
+        self._disk_bytes = 0
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def key_for(char_bytes: bytes, info: dict, version: str, encoding: str) -> str:
+        """キャッシュのキー（入力のSHA-256）
+
+        Args:
+            encoding: 出力を左右するエンコード設定（プロファイル名とサイズ上限など）
+        """
+        digest = hashlib.sha256()
+        for part in (
+            hashlib.sha256(char_bytes).digest(),
+            json.dumps(info, sort_keys=True, ensure_ascii=False).encode('utf-8'),
+            version.encode('utf-8'),
+            encoding.encode('utf-8'),
+        ):
+            # 区切りが曖昧にならないよう長さを前置する
+            digest.update(len(part).to_bytes(8, 'big'))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """キャッシュされた画像を返す。無ければ None。"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self._memory_hits += 1
+                return data
+            self._load_disk_index()
+            on_disk = key in self._disk
+
+        data = self._read(key) if on_disk else None
+        with self._lock:
+            if data is None:
+                self._misses += 1
+                if on_disk:
+                    self._forget_disk(key)
+                return None
+            self._disk_hits += 1
+            if key in self._disk:
+                self._disk.move_to_end(key)
+            self._remember(key, data)
+        try:
+            # ディスク側のLRU順（再起動後の索引の並び）にも反映する
+            os.utime(self._path(key))
+        except OSError:
+            pass
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """画像をメモリとディスクに保存する。"""
+        with self._lock:
+            self._remember(key, data)
+            if not self.max_disk_bytes:
+                return
+            self._load_disk_index()
+        try:
+            self._write(key, data)
+        except OSError as e:
+            logger.warning(f"ポスター画像のキャッシュ保存に失敗: {e}")
+            return
+        with self._lock:
+            self._forget_disk(key)
+            self._disk[key] = len(data)
+            self._disk_bytes += len(data)
+            while self._disk_bytes > self.max_disk_bytes and len(self._disk) > 1:
+                old_key, _ = next(iter(self._disk.items()))
+                self._forget_disk(old_key)
+                self._evictions += 1
+                try:
+                    os.remove(self._path(old_key))
+                except OSError:
+                    pass
+
+    def clear(self) -> None:
+        """メモリ・ディスクのキャッシュをすべて削除する。"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._load_disk_index()
+            for key in list(self._disk):
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self._disk.clear()
+            self._disk_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._load_disk_index()
+            total = self._memory_hits + self._disk_hits + self._misses
+            return {
+                'memory_entries': len(self._memory),
+                'memory_mb': round(self._memory_bytes / 1024 / 1024, 1),
+                'disk_entries': len(self._disk),
+                'disk_mb': round(self._disk_bytes / 1024 / 1024, 1),
+                'memory_hits': self._memory_hits,
+                'disk_hits': self._disk_hits,
+                'misses': self._misses,
+                'hit_rate': round((self._memory_hits + self._disk_hits) / total, 3) if total else 0.0,
+                'evictions': self._evictions,
+            }
+
+    # ------------------------------------------------------------------
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key + _SUFFIX)
+
+    def _remember(self, key: str, data: bytes) -> None:
+        """メモリに保持する（ロック取得済みで呼ぶ）"""
+        if len(data) > self.max_memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _forget_disk(self, key: str) -> None:
+        size = self._disk.pop(key, None)
+        if size is not None:
+            self._disk_bytes -= size
+
+    def _load_disk_index(self) -> None:
+        """ディスク上のファイル一覧を更新時刻順（古い順）に読み込む（初回のみ、ロック取得済みで呼ぶ）"""
+        if self._disk is not None:
+            return
+        entries = []
+        try:
+            with os.scandir(self.root) as it:
+                for entry in it:
+                    if entry.name.endswith(_SUFFIX) and entry.is_file():
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, entry.name[:-len(_SUFFIX)], stat.st_size))
+        except OSError:
+            pass
+        entries.sort()
+        self._disk = collections.OrderedDict((key, size) for _, key, size in entries)
+        self._disk_bytes = sum(size for _, _, size in entries)
+
+    def _read(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write(self, key: str, data: bytes) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.tmp_')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
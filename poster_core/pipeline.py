@@ -0,0 +1,168 @@
+"""
+ポスター作成の一連の処理
+キャラクター画像の取得 → キャラクター情報の取得 → 完成画像キャッシュの確認 → 描画・エンコード → キャッシュへの保存を、
+1件全体の制限時間（Deadline）の中で行います。Bot の /poster と描画サービス（tools.render_service）で共通です。
+"""
+
+import asyncio
+import io
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional
+
+import aiohttp
+from PIL import Image
+
+import config
+from .assets import AssetStore
+from .encoding import EncodeStats, extension_for
+from .image_store import ImageStore, ImageTooLargeError, download_character_image
+from .output_cache import OutputCache
+from .render_pool import RenderPool, RenderQueueFullError
+from .renderer import template_version
+from .resilience import Deadline, StageTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# (character_id, 制限時間) → キャラクター情報（取れなければ例外か空の辞書）
+InfoFetcher = Callable[[str, Optional[float]], Awaitable[Dict[str, str]]]
+# (キャラクター画像, キャラクター情報) → 完成版と並行して描く下書き
+DraftStarter = Callable[[bytes, Dict[str, str]], Awaitable[None]]
+
+
+class PosterJobError(Exception):
+    """ポスター作成の失敗（ユーザーに返すメッセージを持つ）"""
+
+    def __init__(self, user_message: str):
+        super().__init__(user_message)
+        self.user_message = user_message
+
+
+@dataclass
+class PosterBuild:
+    """作成結果
+
+    Attributes:
+        data: エンコード済みのポスター画像
+        degraded: キャラクター情報を取得できず画像のみで作成した場合 True
+        cached: 完成画像キャッシュから返した場合 True
+    """
+    data: bytes
+    degraded: bool
+    cached: bool
+
+
+class PosterPipeline:
+    """画像・情報の取得から描画・キャッシュへの保存までを行うクラス（イベントループ内で使う）"""
+
+    def __init__(self, image_store: ImageStore, render_pool: RenderPool, output_cache: OutputCache,
+                 assets: AssetStore, encode_stats: EncodeStats):
+        """
+        Args:
+            image_store: キャラクター画像のローカル保存
+            render_pool: 描画プール
+            output_cache: 完成画像キャッシュ
+            assets: アセットの版を調べるための AssetStore（画像の読み込みは描画ワーカーが行う）
+            encode_stats: エンコード結果の集計先
+        """
+        self.image_store = image_store
+        self.render_pool = render_pool
+        self.output_cache = output_cache
+        self.assets = assets
+        self.encode_stats = encode_stats
+
+    async def build(self, session: aiohttp.ClientSession, character_id: str, profile: str, max_bytes: int,
+                    get_info: InfoFetcher, draft: Optional[DraftStarter] = None) -> PosterBuild:
+        """ポスターを作成する。
+
+        Args:
+            session: 画像のダウンロードに使う共有の aiohttp セッション
+            character_id: キャラクターID
+            profile: エンコードのプロファイル名
+            max_bytes: 出力サイズの上限（超えたら次のプロファイルに落とす、0で無制限）
+            get_info: キャラクター情報の取得（失敗した場合は画像のみで作成する）
+            draft: 指定すると、キャッシュに無く描画する場合に完成版と並行して呼ぶ（完成版ができたら取り消す）
+
+        Raises:
+            PosterJobError: 作成に失敗した場合（ユーザー向けのメッセージ付き）
+            RenderQueueFullError: 描画待ちが上限に達している場合
+        """
+        # 1件全体の制限時間を ダウンロード / 情報取得 / 描画 に配分する
+        deadline = Deadline(config.POSTER_DEADLINE_SEC, config.POSTER_STAGE_TIMEOUTS)
+        char_bytes = await self._character_image(session, character_id, deadline)
+
+        # 取得できない場合は待ち続けず、画像のみでポスターを作る
+        try:
+            with deadline.stage('scrape') as timeout:
+                info = await get_info(character_id, timeout)
+        except Exception as e:
+            logger.warning(f"キャラクター情報を取得できないため画像のみで作成します: character_id={character_id}, {e!r}")
+            info = {}
+        degraded = not info
+
+        # 同じ入力・エンコード設定から作ったポスターがあれば描画を省く
+        encoding = f"{profile}:{max_bytes}"
+        version = await asyncio.to_thread(template_version, self.assets)
+        cache_key = await asyncio.to_thread(OutputCache.key_for, char_bytes, info, version, encoding)
+        img_bytes = await asyncio.to_thread(self.output_cache.get, cache_key)
+        if img_bytes is not None:
+            deadline.skip('render', 'cache')
+            logger.info(
+                f"ポスターを作成しました: character_id={character_id}, {deadline.summary()}, "
+                f"cached={extension_for(img_bytes)} {len(img_bytes) // 1024}KB"
+            )
+            return PosterBuild(img_bytes, degraded, cached=True)
+
+        draft_task = asyncio.create_task(draft(char_bytes, info)) if draft is not None else None
+        try:
+            result = await deadline.run(
+                'render', self.render_pool.render(char_bytes, info, character_id, profile, max_bytes)
+            )
+        except RenderQueueFullError:
+            raise
+        except StageTimeoutError as e:
+            logger.error(f"画像合成がタイムアウトしました: {e}")
+            raise PosterJobError("画像の合成がタイムアウトしました。時間をおいて再度お試しください。") from e
+        except Exception as e:
+            logger.error(f"画像合成に失敗: {e}")
+            raise PosterJobError("画像の合成または保存に失敗しました。管理者に連絡してください。") from e
+        finally:
+            if draft_task is not None and not draft_task.done():
+                draft_task.cancel()
+        self.encode_stats.record(result)
+        # 描画ワーカーが実際に使ったアセットの版で保存する（アセットの読み直し前に描いたものを新しい版で保存しない）
+        if result.template_version is not None:
+            if result.template_version != version:
+                cache_key = await asyncio.to_thread(
+                    OutputCache.key_for, char_bytes, info, result.template_version, encoding
+                )
+            await asyncio.to_thread(self.output_cache.put, cache_key, result.data)
+        logger.info(f"ポスターを作成しました: character_id={character_id}, {deadline.summary()}, {result.summary()}")
+        return PosterBuild(result.data, degraded, cached=False)
+
+    async def _character_image(self, session: aiohttp.ClientSession, character_id: str,
+                               deadline: Deadline) -> bytes:
+        """キャラ画像をローカル保存（tools.crawl で事前取得したもの等）から読み、無ければダウンロードして保存する"""
+        char_bytes = await asyncio.to_thread(self.image_store.get, character_id)
+        try:
+            if char_bytes is None:
+                # 共有の一時ファイルは使わず、メモリ上に受信する（同時に作成しても互いに上書きしない）
+                timeout = deadline.timeout_for('download')
+                char_bytes = await deadline.run('download', download_character_image(session, character_id, timeout))
+                await asyncio.to_thread(self.image_store.put, character_id, char_bytes)
+        except StageTimeoutError as e:
+            logger.error(f"画像のダウンロードがタイムアウトしました: {e}")
+            raise PosterJobError("キャラクター画像の取得がタイムアウトしました。時間をおいて再度お試しください。") from e
+        except ImageTooLargeError as e:
+            logger.error(f"画像のダウンロードを打ち切りました: character_id={character_id}, {e}")
+            raise PosterJobError("キャラクター画像が大きすぎるため作成できませんでした。") from e
+        except Exception as e:
+            logger.error(f"画像のダウンロードに失敗: {e}")
+            raise PosterJobError("キャラクター画像の取得に失敗しました。番号が正しいかご確認ください。") from e
+        try:
+            # 画像として読めるかだけ先に確認する（デコードは描画ワーカーで行う）
+            Image.open(io.BytesIO(char_bytes))
+        except Exception as e:
+            logger.error(f"画像ファイルの読み込みに失敗: {e}")
+            raise PosterJobError("画像ファイルの読み込みに失敗しました。管理者に連絡してください。") from e
+        return char_bytes
@@ -0,0 +1,256 @@
+"""
+Chrome / chromedriver プロセスの監視
+起動したドライバの子プロセスを追跡し、スクレイピングごとのメモリ・CPU時間の上限と
+取り残されたプロセス（孤児）の回収を行います。/proc を使うため Linux 以外では何もしません。
+"""
+
+import contextlib
+import logging
+import os
+import signal
+import threading
+import time
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# このボットが起動したChromeを識別するための目印（Chromeは未知のスイッチを無視する）
+CHROME_MARKER = '--zft-poster-scraper'
+
+_PROC_DIR = '/proc'
+_CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+class ProcInfo(NamedTuple):
+    """/proc から読み取ったプロセス情報"""
+    pid: int
+    ppid: int
+    name: str
+    cmdline: str
+    rss_bytes: int
+    cpu_seconds: float
+
+
+def is_supported() -> bool:
+    """プロセス監視が使える環境か（/proc があるか）"""
+    return os.path.isdir(_PROC_DIR)
+
+
+def read_process(pid: int) -> Optional[ProcInfo]:
+    """1プロセス分の情報を読む。消えていれば None。"""
+    try:
+        with open(f"{_PROC_DIR}/{pid}/stat", 'r', encoding='utf-8', errors='replace') as f:
+            stat = f.read()
+        with open(f"{_PROC_DIR}/{pid}/cmdline", 'rb') as f:
+            cmdline = f.read().replace(b'\0', b' ').decode('utf-8', errors='replace').strip()
+        with open(f"{_PROC_DIR}/{pid}/statm", 'r', encoding='utf-8') as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    # comm は括弧で囲まれ空白を含みうるので、最後の ')' 以降をフィールドとして扱う
+    name = stat[stat.find('(') + 1:stat.rfind(')')]
+    fields = stat[stat.rfind(')') + 2:].split()
+    try:
+        ppid = int(fields[1])
+        cpu_ticks = int(fields[11]) + int(fields[12])  # utime + stime
+    except (IndexError, ValueError):
+        return None
+    return ProcInfo(pid, ppid, name, cmdline, resident_pages * _PAGE_SIZE, cpu_ticks / _CLOCK_TICKS)
+
+
+def list_processes() -> Dict[int, ProcInfo]:
+    """全プロセスの情報を返す。"""
+    procs: Dict[int, ProcInfo] = {}
+    if not is_supported():
+        return procs
+    for entry in os.listdir(_PROC_DIR):
+        if entry.isdigit():
+            info = read_process(int(entry))
+            if info is not None:
+                procs[info.pid] = info
+    return procs
+
+
+def process_tree(root_pid: int, procs: Dict[int, ProcInfo]) -> List[int]:
+    """root_pid とその子孫のPIDを、子孫が先に来る順序で返す。"""
+    children: Dict[int, List[int]] = {}
+    for info in procs.values():
+        children.setdefault(info.ppid, []).append(info.pid)
+    order: List[int] = []
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        order.append(pid)
+        stack.extend(children.get(pid, []))
+    order.reverse()
+    return [pid for pid in order if pid in procs]
+
+
+def _owned_by_us(pid: int) -> bool:
+    """同じユーザーのプロセスか（他ユーザーのChromeには触れない）"""
+    try:
+        return os.stat(f"{_PROC_DIR}/{pid}").st_uid == os.getuid()
+    except (OSError, AttributeError):
+        return False
+
+
+def _kill(pids: List[int]) -> List[int]:
+    killed = []
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGKILL)
+            killed.append(pid)
+        except (ProcessLookupError, PermissionError):
+            continue
+    return killed
+
+
+def _driver_pid(driver: Any) -> Optional[int]:
+    """ドライバが起動した chromedriver のPIDを返す。"""
+    try:
+        return int(driver.service.process.pid)
+    except Exception:
+        return None
+
+
+class ProcessSupervisor:
+    """起動したドライバのプロセスツリーを追跡・制限するクラス（スレッドセーフ）"""
+
+    def __init__(self, max_rss_mb: int = 0, max_cpu_seconds: int = 0, poll_interval: float = 0.5):
+        """
+        Args:
+            max_rss_mb: 1回のスクレイピング中に許容するプロセスツリー全体のメモリ（MB、0で無制限）
+            max_cpu_seconds: 1回のスクレイピングで許容するCPU時間（秒、0で無制限）
+            poll_interval: 上限監視の間隔（秒）
+        """
+        self.max_rss_bytes = max(0, max_rss_mb) * 1024 * 1024
+        self.max_cpu_seconds = max(0, max_cpu_seconds)
+        self.poll_interval = poll_interval
+        self._tracked: Set[int] = set()
+        self._lock = threading.Lock()
+        self._orphans_reaped = 0
+        self._limit_kills = 0
+        self._leftovers_killed = 0
+        self._last_sweep: Optional[float] = None
+
+    def track(self, driver: Any) -> None:
+        """起動したドライバを追跡対象に加える。"""
+        pid = _driver_pid(driver)
+        if pid is not None:
+            with self._lock:
+                self._tracked.add(pid)
+
+    def quit_driver(self, driver: Any) -> None:
+        """ドライバを終了し、quit() 後も残った子プロセスを強制終了する。"""
+        pid = _driver_pid(driver)
+        tree = process_tree(pid, list_processes()) if pid is not None and is_supported() else []
+        try:
+            driver.quit()
+        finally:
+            if pid is not None:
+                with self._lock:
+                    self._tracked.discard(pid)
+            survivors = [p for p in tree if read_process(p) is not None]
+            if survivors:
+                killed = _kill(survivors)
+                with self._lock:
+                    self._leftovers_killed += len(killed)
+                logger.warning(f"driver.quit() 後に残ったプロセスを終了しました: {killed}")
+
+    @contextlib.contextmanager
+    def limit(self, driver: Any) -> Iterator[None]:
+        """ブロック内の処理中、ドライバのプロセスツリーのメモリ・CPU時間を監視する。
+
+        上限を超えた場合はツリーごと強制終了する（呼び出し側のSelenium操作は例外で中断される）。
+        """
+        pid = _driver_pid(driver)
+        if pid is None or not is_supported() or not (self.max_rss_bytes or self.max_cpu_seconds):
+            yield
+            return
+
+        stop = threading.Event()
+        baseline_cpu = self._tree_usage(pid)[1]
+
+        def monitor():
+            while not stop.wait(self.poll_interval):
+                rss, cpu = self._tree_usage(pid)
+                cpu_used = cpu - baseline_cpu
+                reason = None
+                if self.max_rss_bytes and rss > self.max_rss_bytes:
+                    reason = f"メモリ {rss / 1024 / 1024:.0f}MB"
+                elif self.max_cpu_seconds and cpu_used > self.max_cpu_seconds:
+                    reason = f"CPU時間 {cpu_used:.1f}秒"
+                if reason:
+                    killed = _kill(process_tree(pid, list_processes()))
+                    with self._lock:
+                        self._limit_kills += 1
+                    logger.error(f"スクレイピングが上限を超えたためChromeを強制終了しました（{reason}）: {killed}")
+                    return
+
+        watcher = threading.Thread(target=monitor, name="poster-scrape-limit", daemon=True)
+        watcher.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            watcher.join()
+
+    def find_orphans(self) -> List[ProcInfo]:
+        """追跡外で親を失った chromedriver / このボットのChromeを探す。"""
+        procs = list_processes()
+        with self._lock:
+            self._tracked &= set(procs)  # 既に消えたものは追跡から外す
+            owned: Set[int] = set()
+            for pid in self._tracked:
+                owned.update(process_tree(pid, procs))
+        orphans = []
+        for info in procs.values():
+            if info.pid in owned or info.pid == os.getpid():
+                continue
+            # init に引き取られた（または親が消えた）ものだけを対象にし、起動途中の自分の子は除外する
+            adopted_by_init = info.ppid == 1 and os.getpid() != 1
+            parentless = adopted_by_init or info.ppid not in procs
+            is_driver = info.name.startswith('chromedriver')
+            is_our_chrome = CHROME_MARKER in info.cmdline
+            if parentless and (is_driver or is_our_chrome) and _owned_by_us(info.pid):
+                orphans.append(info)
+        return orphans
+
+    def reap_orphans(self) -> List[ProcInfo]:
+        """孤児プロセスとその子孫を強制終了し、終了させたルートの一覧を返す。"""
+        self._last_sweep = time.time()
+        orphans = self.find_orphans()
+        if not orphans:
+            return []
+        procs = list_processes()
+        for orphan in orphans:
+            killed = _kill(process_tree(orphan.pid, procs))
+            logger.warning(
+                f"取り残されたプロセスを終了しました: pid={orphan.pid}, name={orphan.name}, "
+                f"RSS={orphan.rss_bytes / 1024 / 1024:.0f}MB, 終了数={len(killed)}"
+            )
+        with self._lock:
+            self._orphans_reaped += len(orphans)
+        return orphans
+
+    def stats(self) -> Dict[str, Any]:
+        """監視の統計を返す。"""
+        with self._lock:
+            tracked = sorted(self._tracked)
+        procs = list_processes() if tracked else {}
+        rss = sum(procs[p].rss_bytes for pid in tracked for p in process_tree(pid, procs))
+        return {
+            'supported': is_supported(),
+            'tracked_drivers': len(tracked),
+            'tracked_rss_mb': round(rss / 1024 / 1024, 1),
+            'orphans_reaped': self._orphans_reaped,
+            'limit_kills': self._limit_kills,
+            'leftovers_killed': self._leftovers_killed,
+            'last_sweep': time.strftime('%H:%M:%S', time.localtime(self._last_sweep)) if self._last_sweep else '-',
+        }
+
+    def _tree_usage(self, pid: int) -> Tuple[int, float]:
+        procs = list_processes()
+        tree = process_tree(pid, procs)
+        return sum(procs[p].rss_bytes for p in tree), sum(procs[p].cpu_seconds for p in tree)
@@ -0,0 +1,252 @@
+"""
+描画サービスのクライアント
+ポスターの作成（画像・情報の取得、描画、エンコード）を別プロセス・別ホストで動く描画サービス
+（python -m tools.render_service）に依頼します。複数のノードを登録でき、実行中の依頼が少ないノードから順に使い、
+つながらないノードは定期的な死活確認で復帰するまで後回しにします。
+
+API（JSON、ポスター画像はバイナリで返す）:
+    POST /render  {"character_id": "12", "profile": "png", "max_bytes": 0, "info": {"name": "...", ...}}
+        info を省略するとノードがキャラクター情報を自分で取得する（空の辞書なら画像のみで作成する）
+        200: ポスター画像（X-Poster-Degraded: 画像のみで作成した場合 1、X-Poster-Cached: 完成画像キャッシュから返した場合 1）
+        400: 依頼の内容が不正  422: 作成に失敗  503: 混雑中（いずれも {"error": ユーザー向けのメッセージ}）
+    GET /health   死活確認
+    GET /stats    内部統計
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+_HEALTH_TIMEOUT = 5.0  # 死活確認1回あたりの上限（秒）
+
+
+class RenderJobError(Exception):
+    """描画ノードがポスターを作成できなかった場合の例外（ユーザーに返すメッセージを持つ）"""
+
+    def __init__(self, user_message: str):
+        super().__init__(user_message)
+        self.user_message = user_message
+
+
+class RenderNodeError(Exception):
+    """どの描画ノードにも依頼できなかった場合の例外"""
+
+    def __init__(self, message: str, busy: bool = False):
+        """
+        Args:
+            message: エラーの内容
+            busy: すべてのノードが混雑していた場合 True（停止・通信失敗を含む場合は False）
+        """
+        super().__init__(message)
+        self.busy = busy
+
+
+@dataclass
+class RenderResponse:
+    """描画ノードが作成したポスター
+
+    Attributes:
+        data: エンコード済みのポスター画像
+        degraded: キャラクター情報を取得できず画像のみで作成した場合 True
+        cached: ノードの完成画像キャッシュから返された場合 True
+        node: 作成したノードのURL
+    """
+    data: bytes
+    degraded: bool
+    cached: bool
+    node: str
+
+
+class RenderNode:
+    """描画ノード1台の状態と集計"""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip('/')
+        self.healthy = True
+        self.inflight = 0
+        self.completed = 0
+        self.failed = 0
+        self.busy = 0
+        self.last_error = ''
+        self._seconds = 0.0
+
+    def record_success(self, seconds: float) -> None:
+        self.completed += 1
+        self._seconds += seconds
+
+    def mark_down(self, error: str) -> None:
+        if self.healthy:
+            logger.warning(f"描画ノードを停止中として扱います: {self.url}, {error}")
+        self.healthy = False
+        self.failed += 1
+        self.last_error = error
+
+    def mark_up(self) -> None:
+        if not self.healthy:
+            logger.info(f"描画ノードが復帰しました: {self.url}")
+        self.healthy = True
+
+    def summary(self) -> str:
+        avg_ms = round(self._seconds / self.completed * 1000) if self.completed else 0
+        state = 'up' if self.healthy else f"down ({self.last_error})"
+        return (
+            f"{state} 実行中={self.inflight} 完了={self.completed} 平均{avg_ms}ms "
+            f"混雑={self.busy} 失敗={self.failed}"
+        )
+
+
+class RenderClient:
+    """描画ノードへの振り分け・フェイルオーバー・死活確認を行うクライアント（イベントループ内で使う）"""
+
+    def __init__(self, urls: List[str], timeout: float = 90.0, health_interval: float = 10.0,
+                 session_factory: Callable[[], aiohttp.ClientSession] = aiohttp.ClientSession):
+        """
+        Args:
+            urls: 描画ノードのURL（例: http://127.0.0.1:8770）
+            timeout: 1回の依頼の上限（秒、ノード側の制限時間より少し長くする）
+            health_interval: 死活確認の間隔（秒）
+            session_factory: HTTPセッションを作る関数（テスト用）
+
+        Raises:
+            ValueError: URLが1つも無い場合
+        """
+        if not urls:
+            raise ValueError("描画ノードのURLを1つ以上指定してください")
+        self.nodes = [RenderNode(url) for url in urls]
+        self.timeout = timeout
+        self.health_interval = health_interval
+        self._session_factory = session_factory
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self._next = 0
+        self._failovers = 0
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = self._session_factory()
+        return self._session
+
+    def start(self) -> None:
+        """定期的な死活確認を始める。"""
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self) -> None:
+        """死活確認を止め、HTTPセッションを閉じる。"""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def _candidates(self) -> List[RenderNode]:
+        """依頼する順のノード（稼働中で実行中の依頼が少ない順、同数なら順番に回す。停止中のノードは最後に試す）"""
+        self._next = (self._next + 1) % len(self.nodes)
+        rotated = self.nodes[self._next:] + self.nodes[:self._next]
+        healthy = sorted((node for node in rotated if node.healthy), key=lambda node: node.inflight)
+        return healthy + [node for node in rotated if not node.healthy]
+
+    async def render(self, character_id: str, profile: str, max_bytes: int = 0,
+                     info: Optional[Dict[str, str]] = None) -> RenderResponse:
+        """ポスターの作成を依頼する。つながらない・混雑しているノードは飛ばして次のノードに依頼する。
+
+        Args:
+            character_id: キャラクターID
+            profile: エンコードのプロファイル名
+            max_bytes: 出力サイズの上限（0で無制限）
+            info: 依頼元で取得したキャラクター情報（None ならノードが自分で取得する）
+
+        Raises:
+            RenderJobError: ノードがポスターを作成できなかった場合（依頼の内容の誤りを含む）
+            RenderNodeError: どのノードにも依頼できなかった場合
+        """
+        payload: Dict[str, Any] = {'character_id': character_id, 'profile': profile, 'max_bytes': max_bytes}
+        if info is not None:
+            payload['info'] = info
+        errors = []
+        all_busy = True
+        for attempt, node in enumerate(self._candidates()):
+            if attempt:
+                self._failovers += 1
+            node.inflight += 1
+            started = time.monotonic()
+            try:
+                async with self._get_session().post(
+                    f"{node.url}/render", json=payload, timeout=aiohttp.ClientTimeout(total=self.timeout)
+                ) as response:
+                    if response.status == 200:
+                        data = await response.read()
+                        node.mark_up()
+                        node.record_success(time.monotonic() - started)
+                        return RenderResponse(
+                            data=data,
+                            degraded=response.headers.get('X-Poster-Degraded') == '1',
+                            cached=response.headers.get('X-Poster-Cached') == '1',
+                            node=node.url,
+                        )
+                    message = await self._error_message(response)
+                    if response.status in (400, 422):
+                        raise RenderJobError(message)
+                    if response.status == 503:
+                        node.busy += 1
+                        errors.append(f"{node.url}: 混雑中")
+                        continue
+                    all_busy = False
+                    node.mark_down(f"HTTP {response.status}")
+                    errors.append(f"{node.url}: HTTP {response.status} {message}")
+            except asyncio.TimeoutError as e:
+                # 制限時間を使い切っているので、別のノードで作り直さずに諦める
+                node.mark_down('timeout')
+                raise RenderNodeError(f"描画ノードが時間内に応答しませんでした: {node.url}") from e
+            except aiohttp.ClientError as e:
+                all_busy = False
+                node.mark_down(type(e).__name__)
+                errors.append(f"{node.url}: {e}")
+            finally:
+                node.inflight -= 1
+        raise RenderNodeError(f"描画ノードに依頼できませんでした（{'; '.join(errors)}）", busy=all_busy)
+
+    @staticmethod
+    async def _error_message(response: aiohttp.ClientResponse) -> str:
+        try:
+            body = await response.json(content_type=None)
+            return str(body.get('error', '')) if isinstance(body, dict) else ''
+        except (aiohttp.ClientError, ValueError):
+            return ''
+
+    async def check_health(self) -> None:
+        """すべてのノードの死活を確認する。"""
+        await asyncio.gather(*(self._check(node) for node in self.nodes))
+
+    async def _check(self, node: RenderNode) -> None:
+        try:
+            async with self._get_session().get(
+                f"{node.url}/health", timeout=aiohttp.ClientTimeout(total=_HEALTH_TIMEOUT)
+            ) as response:
+                if response.status == 200:
+                    node.mark_up()
+                else:
+                    node.mark_down(f"HTTP {response.status}")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            node.mark_down(type(e).__name__)
+
+    async def _health_loop(self) -> None:
+        while True:
+            try:
+                await self.check_health()
+            except Exception as e:
+                logger.error(f"描画ノードの死活確認に失敗: {e}", exc_info=True)
+            await asyncio.sleep(self.health_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'healthy': f"{sum(node.healthy for node in self.nodes)}/{len(self.nodes)}",
+            'failovers': self._failovers,
+            **{node.url: node.summary() for node in self.nodes},
+        }
@@ -0,0 +1,203 @@
+"""
+ポスター描画用のプロセスプール
+描画とエンコードは CPU を使い続けるため、イベントループ（と Discord のハートビート）を止めないよう
+別プロセスで行います。各ワーカーは起動時にフォント・画像アセットを読み込んでおき、
+プロセス間ではキャラクター画像・情報の辞書・エンコード結果だけを受け渡します。
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+from .encoding import DEFAULT_PROFILE, EncodeResult
+
+logger = logging.getLogger(__name__)
+
+# ワーカープロセス内で使い回す描画器
+_renderer = None
+
+
+def _init_worker(log_level: int) -> None:
+    """ワーカープロセスの初期化（フォント解決・アセット読み込みを済ませておく）"""
+    global _renderer
+    logging.basicConfig(level=log_level, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    from .renderer import PosterRenderer
+    _renderer = PosterRenderer()
+    _renderer.preload()
+
+
+def _render_in_worker(char_bytes: bytes, info: dict, character_id: Optional[str], profile: str,
+                      max_bytes: int, draft: bool) -> EncodeResult:
+    return _renderer.render(char_bytes, info, character_id, profile, max_bytes, draft)
+
+
+def _worker_stats() -> Dict[str, Dict[str, Any]]:
+    return _renderer.stats()
+
+
+def _ping() -> bool:
+    return True
+
+
+class RenderQueueFullError(Exception):
+    """描画待ちが上限に達していて受け付けられない場合の例外"""
+
+    def __init__(self, pending: int):
+        super().__init__(f"描画の待ちが上限に達しています（{pending}件）")
+        self.pending = pending
+
+
+class RenderPool:
+    """ポスター描画を別プロセス（workers=0 の場合は同一プロセスのスレッド）で行うプール"""
+
+    def __init__(self, workers: int = 2, max_queue: int = 8):
+        """
+        Args:
+            workers: 描画プロセス数（0で同一プロセスのスレッドで描画する）
+            max_queue: 実行中のものに加えて待たせられる描画の数
+        """
+        self.workers = max(0, workers)
+        self.max_queue = max(0, max_queue)
+        self._executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._renderer = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._restarts = 0
+        self._render_seconds = 0.0
+
+    @property
+    def capacity(self) -> int:
+        """同時に受け付けられる描画の数（実行中＋待ち）"""
+        return max(1, self.workers) + self.max_queue
+
+    def start(self) -> List[concurrent.futures.Future]:
+        """ワーカーを起動し、フォント・アセットを読み込ませておく（ブロッキングしない）
+
+        Returns:
+            起動確認の Future（すべて完了すれば各ワーカーの初期化が済んでいる。同一プロセスの場合は空）
+        """
+        with self._lock:
+            self._ensure_started()
+            if self._executor is None:
+                return []
+            # 初期化はワーカー起動時に走るので、ワーカー数ぶん空の処理を投げて全員を起動する
+            return [self._executor.submit(_ping) for _ in range(self.workers)]
+
+    def _ensure_started(self) -> None:
+        if self.workers == 0:
+            if self._renderer is None:
+                from .renderer import PosterRenderer
+                self._renderer = PosterRenderer()
+                self._renderer.preload()
+            return
+        if self._executor is None:
+            # イベントループやChrome操作のスレッドを抱えたまま fork しないよう spawn で起動する
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(logging.getLogger().getEffectiveLevel(),),
+            )
+
+    async def render(self, char_bytes: bytes, info: dict, character_id: Optional[str] = None,
+                     profile: str = DEFAULT_PROFILE, max_bytes: int = 0, draft: bool = False) -> EncodeResult:
+        """ポスターを描画してエンコードする（引数は PosterRenderer.render と同じ）。
+
+        Raises:
+            RenderQueueFullError: 描画待ちが上限に達している場合
+        """
+        with self._lock:
+            if self._pending >= self.capacity:
+                self._rejected += 1
+                raise RenderQueueFullError(self._pending)
+            self._ensure_started()
+            self._pending += 1
+            started = time.monotonic()
+            executor = self._executor
+            if executor is not None:
+                try:
+                    future = executor.submit(
+                        _render_in_worker, char_bytes, info, character_id, profile, max_bytes, draft
+                    )
+                except BrokenProcessPool:
+                    self._pending -= 1
+                    self._reset_executor(executor)
+                    raise
+            else:
+                future = None
+
+        if future is None:
+            # 同一プロセスで描画する場合は、待ちの上限だけ守ってスレッドで描画する
+            try:
+                result = await asyncio.to_thread(
+                    self._renderer.render, char_bytes, info, character_id, profile, max_bytes, draft
+                )
+            except BaseException:
+                self._finish(started, ok=False)
+                raise
+            self._finish(started, ok=True)
+            return result
+
+        # 呼び出し側がタイムアウトで待つのをやめても、件数はワーカーの処理が終わった時点で戻す
+        future.add_done_callback(lambda f: self._finish(started, ok=not f.cancelled() and f.exception() is None))
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            with self._lock:
+                self._reset_executor(executor)
+            raise
+
+    def _finish(self, started: float, ok: bool) -> None:
+        with self._lock:
+            self._pending -= 1
+            if ok:
+                self._completed += 1
+                self._render_seconds += time.monotonic() - started
+            else:
+                self._failed += 1
+
+    def _reset_executor(self, executor: concurrent.futures.ProcessPoolExecutor) -> None:
+        """壊れたプールを捨てる（同時に失敗した描画が、作り直した後のプールを捨てないよう照合する）"""
+        if self._executor is not executor:
+            return
+        logger.error("描画プロセスが異常終了したため、プールを作り直します")
+        self._executor = None
+        self._restarts += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def worker_stats(self) -> Dict[str, Dict[str, Any]]:
+        """描画器のキャッシュ統計（プロセスプールの場合はいずれか1つのワーカーのもの）"""
+        with self._lock:
+            self._ensure_started()
+            executor, renderer = self._executor, self._renderer
+        if executor is None:
+            return renderer.stats()
+        return await asyncio.wrap_future(executor.submit(_worker_stats))
+
+    def close(self) -> None:
+        """ワーカーを終了する（実行中の描画は待たない）"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'workers': self.workers or 'in-process',
+                'pending': self._pending,
+                'capacity': self.capacity,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'restarts': self._restarts,
+                'avg_ms': round(self._render_seconds / self._completed * 1000) if self._completed else 0,
+            }
@@ -0,0 +1,407 @@
+"""
+ポスター画像の描画
+キャラクター画像のバイト列とスクレイピングした情報から 1600×2100px のポスターを描き、指定のプロファイルでエンコードします。
+マスク・国旗・フォント・描画済みレイヤーは PosterRenderer が保持するので、描画プロセスごとに1つ作って使い回します。
+"""
+
+import hashlib
+import io
+import logging
+import traceback
+from typing import Any, Dict, Optional
+
+from PIL import Image, ImageDraw, ImageFont
+
+import config
+from .assets import AssetStore
+from .encoding import DEFAULT_PROFILE, EncodeResult, encode_image
+from .fonts import get_font_manager
+from .glyph_cache import get_glyph_cache
+from .layers import TEMPLATE_VERSION, LayerCache
+from .layout import VerticalGrid, fit_largest, split_balanced, wrap_text
+
+logger = logging.getLogger(__name__)
+
+# 下書き（プレビュー）の縮小率とエンコード設定
+DRAFT_SCALE = 4
+DRAFT_PROFILE = 'jpeg'
+
+
+def create_asset_store() -> AssetStore:
+    """config のパスからマスク・国旗画像の AssetStore を作る（画像の読み込みは最初の参照時）"""
+    return AssetStore(
+        config.POSTER_MASK_PATH,
+        config.POSTER_FLAG_DIR,
+        country_paths={
+            'peaceful': config.POSTER_PEACEFUL_PATH,
+            'brave': config.POSTER_BRAVE_PATH,
+            'glory': config.POSTER_GLORY_PATH,
+            'freedom': config.POSTER_FREEDOM_PATH,
+        },
+        reload_interval=config.POSTER_ASSET_RELOAD_SEC,
+    )
+
+
+def template_version(assets: AssetStore) -> str:
+    """描画結果を左右するテンプレート・フォント設定・アセットの版（出力キャッシュのキー用）
+
+    アセットはディスク上の現在のファイルから求める。描画ワーカーが実際に使った版は
+    EncodeResult.template_version を参照する。
+    """
+    return _version_for(assets.fingerprint())
+
+
+def _version_for(asset_fingerprint: str) -> str:
+    fonts = "|".join([config.POSTER_FONT_A, config.POSTER_FONT_B, config.POSTER_FONT_C, config.POSTER_FONT_D])
+    return f"{TEMPLATE_VERSION}:{fonts}:{asset_fingerprint}"
+
+
+class PosterRenderer:
+    """ポスターの描画に使うアセット・キャッシュをまとめて保持し、描画とエンコードを行うクラス"""
+
+    def __init__(self, assets: Optional[AssetStore] = None):
+        """
+        Args:
+            assets: マスク・国旗画像（省略時は config のパスから読み込む）
+        """
+        # マスク・国旗は描画用の大きさで読み込み、更新されたら読み直す
+        self.assets = assets or create_asset_store()
+        # プロセス共通のフォントマネージャー（パス解決は1回だけ、FreeTypeFontはLRUで再利用）
+        self.fonts = get_font_manager()
+        self.glyphs = get_glyph_cache()
+        # テンプレートの枠とキャラクターごとの土台（キャラ画像＋マスク）の描画済みレイヤー
+        self.layers = LayerCache(max_bases=config.POSTER_BASE_CACHE_SIZE)
+
+    def preload(self) -> None:
+        """フォントの解決と画像アセットの読み込みを先に済ませる（見つからないアセットはログに出す）"""
+        self.fonts.preload([config.POSTER_FONT_A, config.POSTER_FONT_B, config.POSTER_FONT_C, config.POSTER_FONT_D])
+        self.assets.refresh(force=True)
+
+    def render(self, char_bytes: bytes, info: dict, character_id: Optional[str] = None,
+               profile: str = DEFAULT_PROFILE, max_bytes: int = 0, draft: bool = False) -> EncodeResult:
+        """キャラクター画像のバイト列と情報からポスターを描画し、エンコードする。
+
+        Args:
+            char_bytes: キャラクター画像（PNG/WebP等）のバイト列
+            info: キャラクター情報（空ならキャラ画像のみのポスター）
+            character_id: 指定すると、同じ画像の土台（キャラ画像＋マスク）を使い回す
+            profile: エンコードのプロファイル名（poster_core.encoding.PROFILES）
+            max_bytes: 出力サイズの上限（超えたら次のプロファイルで作り直す、0で無制限）
+            draft: True なら光彩を減らして描き、1/DRAFT_SCALE に縮小した JPEG の下書きを返す
+                （profile・max_bytes は使わない）
+        """
+        char = Image.open(io.BytesIO(char_bytes))
+        # WebP形式の場合はRGBに変換
+        if char.format == 'WEBP':
+            char = char.convert('RGB')
+        base_key = (character_id, hashlib.sha256(char_bytes).hexdigest()) if character_id else None
+        # 描画の前後で読み込み済みのアセットが変わっていなければ、その版で描いたことになる
+        self.assets.refresh()
+        assets_before = self.assets.loaded_fingerprint()
+        poster_img = self.draw(char, info, base_key, draft=draft)
+        if draft:
+            return encode_image(poster_img.reduce(DRAFT_SCALE), DRAFT_PROFILE)
+        result = encode_image(poster_img, profile, max_bytes)
+        if assets_before is not None and assets_before == self.assets.loaded_fingerprint():
+            result.template_version = _version_for(assets_before)
+        return result
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """/poster_stats 用の統計（セクション名 → 値）"""
+        return {
+            '画像アセット': self.assets.stats(),
+            'レイヤーキャッシュ': self.layers.stats(),
+            'フォントキャッシュ': self.fonts.stats(),
+            'グリフキャッシュ': self.glyphs.stats(),
+        }
+
+    def _try_load_font(self, prefer_path: str, size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+        """フォントを読み込む（解決済みパスと (パス, サイズ) のLRUキャッシュを使う）。
+
+        探索順・フォールバックは poster_core.fonts.FontManager を参照。
+        """
+        return self.fonts.get(prefer_path, size)
+
+    def _draw_text_with_glow(self, canvas: Image.Image, text: str, x: int, y: int, 
+                             font: ImageFont.FreeTypeFont, glow_layers: list, 
+                             main_color: tuple = (255, 255, 255), draft: bool = False) -> None:
+        """
+        グロー（光彩）効果付きでテキストを描画する
+
+        文字のマスクは1回だけラスタライズし、光彩は12方向にずらしたマスクの和集合で作って1回で合成する。
+        縦書きの1文字や名前などの短い文字列は、光彩込みのタイルをグリフキャッシュから貼り付ける。
+        
+        Args:
+            canvas: 描画先の画像
+            text: 描画するテキスト
+            x: X座標
+            y: Y座標
+            font: フォント
+            glow_layers: グロー効果のレイヤー設定 [(radius, (r, g, b, a)), ...]
+            main_color: メインテキストの色 (デフォルト: 白)
+            draft: True なら光彩のレイヤーを1つおきに間引く（下書き用）
+        """
+        if draft:
+            glow_layers = glow_layers[::2]
+        self.glyphs.draw(canvas, text, x, y, font, glow_layers, main_color)
+
+    # 表の行（ラベル, キャラクター情報のキー）
+    TABLE_ROWS = [
+        ('スキル', 'skill'),
+        ('センスタイプ', 'sencetype'),
+        ('性格', 'personality'),
+        ('ジルパワー', 'zirpower'),
+        ('ジルコンギア', 'zircongear'),
+        ('一人称', 'firstperson'),
+        ('愛称/ニックネーム', 'nickname'),
+        ('弱み', 'weakness'),
+    ]
+    # 表の配置（50, 1500）から（800, 2100）
+    TABLE_X, TABLE_Y = 50, 1520
+    TABLE_ROW_HEIGHT = 65
+    TABLE_LABEL_WIDTH, TABLE_VALUE_WIDTH = 250, 500
+    TABLE_Y_LIMIT = 2080
+
+    def _table_row_positions(self) -> list:
+        """領域に収まる表の行の y 座標"""
+        positions = []
+        for i in range(len(self.TABLE_ROWS)):
+            y_pos = self.TABLE_Y + i * self.TABLE_ROW_HEIGHT
+            if y_pos + self.TABLE_ROW_HEIGHT > self.TABLE_Y_LIMIT:
+                break
+            positions.append(y_pos)
+        return positions
+
+    def _build_base(self, char: Image.Image, mask: Image.Image | None) -> Image.Image:
+        """キャラクター画像とマスクを重ねた土台を作る"""
+        # 1. 1600×2100pxのキャンバスを生成
+        canvas = Image.new('RGB', (1600, 2100), color=(255, 255, 255))
+        
+        # 2. キャラクター画像を上揃えで配置（1600×1600にリサイズ）
+        char_resized = char.resize((1600, 1600))
+        canvas.paste(char_resized, (0, 0))
+        
+        # 3. マスク画像の適用（存在する場合）
+        # 仕様: キャラクター画像と文字（および後続の描画）との間に重ねる
+        # マスクはキャンバス全体(1600x2100)にフィット
+        if mask is not None:
+            # 透明PNGをそのままオーバーレイ（AssetStore で 1640×2140 のRGBAにしてある）
+            canvas.paste(mask, (-20, -20), mask)
+        return canvas
+
+    def _build_table_chrome(self) -> tuple:
+        """表のラベル欄・値欄の背景・罫線を透明レイヤーに描く（値のテキストは含まない）
+
+        Returns:
+            (RGBAのレイヤー, 貼り付け位置)
+        """
+        x_start, y_start = self.TABLE_X, self.TABLE_Y
+        row_height, label_width, value_width = self.TABLE_ROW_HEIGHT, self.TABLE_LABEL_WIDTH, self.TABLE_VALUE_WIDTH
+        rows = self._table_row_positions()
+        width = label_width + value_width + 2
+        height = (rows[-1] - y_start + row_height) if rows else 1
+        layer = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(layer)
+        font_table = self._try_load_font(config.POSTER_FONT_A, 24)
+
+        for (label, _), y_pos in zip(self.TABLE_ROWS, rows):
+            y = y_pos - y_start
+            # ラベル部分（背景黒）
+            draw.rectangle([(0, y), (label_width, y + row_height - 5)], fill=(30, 30, 30))
+            draw.text((10, y + 15), label, fill=(255, 255, 255), font=font_table)
+            # 値部分（背景グレー）
+            draw.rectangle([(label_width, y), (label_width + value_width, y + row_height - 5)],
+                           fill=(120, 120, 120))
+            # 縦罫線
+            draw.line([(label_width, y), (label_width, y + row_height - 5)], fill=(255, 255, 255), width=2)
+        return layer, (x_start, y_start)
+
+    def draw(self, char: Image.Image, info: dict, base_key=None, draft: bool = False) -> Image.Image:
+        """
+        新仕様：1600×2100pxのポスター画像を生成
+
+        キャラ画像＋マスクの土台は base_key ごとに、表の枠はテンプレートごとに描画済みのものを使い、
+        リクエストごとに変わるテキストだけを描く。draft=True なら光彩を間引いて描く。
+        """
+        mask = self.assets.mask()
+        
+        # 1〜3. キャラクター画像とマスクを重ねた土台（base_key が同じなら描画済みのものを複製する）
+        canvas = self.layers.base(base_key, mask, lambda: self._build_base(char, mask))
+        draw = ImageDraw.Draw(canvas)
+        
+        # フォント読み込み
+        font_name = self._try_load_font(config.POSTER_FONT_C, 80)
+        
+        # 国旗画像の読み込み（描画はテキストの直前に行う）
+        country_raw = info.get('country', '') or ''
+        country_clean = country_raw.strip()
+        flag_img = self.assets.flag(country_clean)
+        
+        # 6. セリフ（lines）を縦書きで右揃え（50, 100）から（350, 1400）に列折り返し表示
+        lines_text = info.get('lines', '')
+        if lines_text:
+            # 表示領域
+            x_left, x_right = 50, 350
+            y_top, y_bottom = 100, 1400
+            column_gap = 10
+
+            # 必要な列数が領域に収まる最大のフォントサイズを二分探索する（最大120 → 最小40）
+            def fit_lines(size: int):
+                # 代表文字でサイズ計測（縦書き用の概算）
+                grid = VerticalGrid.measure(self._try_load_font(config.POSTER_FONT_D, size), y_bottom - y_top, 1.05)
+                max_cols = max(1, (x_right - x_left) // (grid.char_w + column_gap))
+                return grid if grid.columns_needed(len(lines_text)) <= max_cols else None
+
+            fitted = fit_largest([120, 110, 100, 90, 80, 70, 60, 50, 40], fit_lines)
+            if fitted:
+                grid = fitted[1]
+            else:
+                # それでも入らなければ、最小サイズで行間を詰める
+                grid = VerticalGrid.measure(self._try_load_font(config.POSTER_FONT_D, 40), y_bottom - y_top, 0.95)
+
+            # グロー（光彩）効果付きで描画
+            glow_layers = [
+                (8, (80, 80, 80, 255)),    # 最外層
+                (6, (95, 95, 95, 255)),    # 外層
+                (4, (110, 110, 110, 255)), # 中層
+                (2, (130, 130, 130, 255)), # 内層
+            ]
+            # 右端から左方向へ列を積む（各文字は実幅で列の右端に揃える）
+            for ch, x_draw, y_draw in grid.positions(lines_text, x_left, x_right, y_top, column_gap):
+                self._draw_text_with_glow(canvas, ch, x_draw, y_draw, grid.font, glow_layers, draft=draft)
+        
+        # 7. 名前を中央揃え（100, 1400）から（1500, 1500）
+        name = info.get('name', '')
+        if name:
+            # テキストサイズを取得して中央揃え
+            bbox = draw.textbbox((0, 0), name, font=font_name)
+            text_width = bbox[2] - bbox[0]
+            x_center = 100 + (1400 - text_width) // 2
+            y_pos = 1420
+
+            # グロー（光彩）効果付きで描画
+            glow_layers = [
+                (8, (80, 80, 80, 255)),    # 最外層
+                (6, (95, 95, 95, 255)),    # 外層
+                (4, (110, 110, 110, 255)), # 中層
+                (2, (130, 130, 130, 255)), # 内層
+            ]
+            self._draw_text_with_glow(canvas, name, x_center, y_pos, font_name, glow_layers, draft=draft)
+        
+        # 目標（goal）を領域中央揃えで配置（850, 1500）から（1550, 2050）
+        goal = info.get('goal', '')
+        if goal:
+            # 領域定義
+            goal_x_left, goal_x_right = 850, 1550
+            goal_y_top, goal_y_bottom = 1500, 2050
+            goal_width = goal_x_right - goal_x_left
+            goal_height = goal_y_bottom - goal_y_top
+            
+            # 領域に収まる最大のフォントサイズを二分探索する（80→75→70...→20）
+            def fit_goal(size: int):
+                font = self._try_load_font(config.POSTER_FONT_A, size)
+                line_height = int(size * 1.3)
+                lines = wrap_text(goal, font, goal_width)
+                return (font, lines, line_height) if len(lines) * line_height <= goal_height else None
+
+            fitted = fit_largest(list(range(80, 19, -5)), fit_goal)
+            if fitted:
+                best_font, best_lines, best_line_height = fitted[1]
+            else:
+                # フォントが見つからない場合は最小サイズで強制的に描画
+                best_font = self._try_load_font(config.POSTER_FONT_A, 20)
+                best_line_height = 26
+                best_lines = wrap_text(goal, best_font, goal_width)
+            best_total_height = len(best_lines) * best_line_height
+            
+            # 垂直方向の中央揃え
+            y_offset = (goal_height - best_total_height) // 2
+            y_current = goal_y_top + y_offset
+            
+            # 各行を描画（水平方向も中央揃え）
+            for line in best_lines:
+                bbox = draw.textbbox((0, 0), line, font=best_font)
+                line_width = bbox[2] - bbox[0]
+                x_centered = goal_x_left + (goal_width - line_width) // 2
+
+                # グロー（光彩）効果付きで描画（青み系）
+                glow_layers = [
+                    (8, (100, 100, 150, 255)),  # 最外層（薄い青み）
+                    (6, (120, 120, 170, 255)),  # 外層
+                    (4, (140, 140, 190, 255)),  # 中層
+                    (2, (160, 160, 210, 255)),  # 内層
+                ]
+                self._draw_text_with_glow(canvas, line, x_centered, y_current, best_font, glow_layers, draft=draft)
+
+                y_current += best_line_height
+        
+        # その他の情報をテーブル形式で配置（50, 1500）から（800, 2100）
+        # ラベル欄・背景・罫線は描画済みの枠を重ね、値だけを描く
+        chrome, chrome_pos = self.layers.chrome(
+            (TEMPLATE_VERSION, config.POSTER_FONT_A), self._build_table_chrome
+        )
+        canvas.paste(chrome, chrome_pos, chrome)
+
+        x_start = self.TABLE_X
+        row_height = self.TABLE_ROW_HEIGHT
+        label_width = self.TABLE_LABEL_WIDTH
+        value_width = self.TABLE_VALUE_WIDTH
+        
+        for (_, key), y_pos in zip(self.TABLE_ROWS, self._table_row_positions()):
+            value = info.get(key, '')
+            
+            # 値を折り返して表示（2行まで、省略せず全表示）
+            pad_x = 10
+            avail_w = value_width - pad_x * 2
+            max_font, min_font = 24, 12
+
+            # 2行に収まる最大のフォントサイズを二分探索する（24→22...→12）
+            def fit_value(size: int):
+                f = self._try_load_font(config.POSTER_FONT_A, size)
+                line_h = int(size * 1.2)
+                lines = wrap_text(value, f, avail_w)
+                if len(lines) <= 2 and (len(lines) * line_h) <= (row_height - 10):
+                    return f, lines, line_h
+                return None
+
+            fitted = fit_largest(list(range(max_font, min_font - 1, -2)), fit_value)
+            if fitted:
+                chosen_font, chosen_lines, chosen_line_h = fitted[1]
+            else:
+                # まだ2行に収まらない場合は最小サイズで、左右の幅が近くなる位置で2行に分割
+                chosen_font = self._try_load_font(config.POSTER_FONT_A, min_font)
+                chosen_line_h = int(min_font * 1.2)
+                chosen_lines = split_balanced(value, chosen_font, avail_w)
+
+            # 垂直方向センタリング
+            total_h = len(chosen_lines) * chosen_line_h
+            y_text = y_pos + (row_height - total_h) // 2
+
+            for line in chosen_lines:
+                # 水平センタリングではなく左寄せ（表っぽさ維持）
+                x_text = x_start + label_width + pad_x
+                draw.text((x_text, y_text), line, fill=(255, 255, 255), font=chosen_font)
+                y_text += chosen_line_h
+        
+        # 国旗画像の配置（1200, 1200）を左上として横幅300pxで配置
+        # 最終レイヤー: すべての要素の上に重ねる
+        if flag_img:
+            try:
+                # 左上が(1200, 1200)となるように配置
+                flag_x = 1200
+                flag_y = 1200
+                
+                # アルファチャンネルがあればそれを使って合成、なければそのまま貼り付け
+                if flag_img.mode == 'RGBA':
+                    canvas.paste(flag_img, (flag_x, flag_y), flag_img)
+                else:
+                    canvas.paste(flag_img, (flag_x, flag_y))
+                    
+                logger.info(f"国旗画像を配置しました: 位置=({flag_x}, {flag_y}), サイズ={flag_img.size}")
+            except Exception as e:
+                logger.warning(f"国旗画像の配置に失敗: {e}")
+                logger.warning(traceback.format_exc())
+        else:
+            logger.info(f"国旗画像が見つかりませんでした。country={country_clean}")
+        
+        return canvas
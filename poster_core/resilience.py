@@ -0,0 +1,200 @@
+"""
+障害時の待ち時間を抑えるための部品
+公式サイトが落ちている間に毎回タイムアウトまで待たないためのサーキットブレーカーと、
+1リクエスト全体の制限時間を工程ごとに配分するデッドラインを提供します。
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """サーキットブレーカーが開いているため呼び出しを行わなかったことを表す例外"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} は一時停止中です（あと{retry_after:.0f}秒）")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class StageTimeoutError(TimeoutError):
+    """工程の制限時間（またはリクエスト全体の残り時間）を超えたことを表す例外"""
+
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"{stage} が制限時間（{timeout:.1f}秒）内に終わりませんでした")
+        self.stage = stage
+        self.timeout = timeout
+
+
+class CircuitBreaker:
+    """連続失敗で開き、一定時間は呼び出しを即座に失敗させるサーキットブレーカー
+
+    - closed: 通常どおり呼び出す。failure_threshold 回連続で失敗すると open へ
+    - open: reset_timeout 秒間は CircuitOpenError を送出する
+    - half_open: 試行を1件だけ通し、成功すれば closed、失敗すれば再び open へ
+
+    イベントループ上から使う想定です（スレッドセーフではありません）。
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            name: ログ・例外メッセージ用の名前
+            failure_threshold: 開くまでの連続失敗回数
+            reset_timeout: 開いてから試行を再開するまでの秒数
+            clock: 現在時刻を返す関数（テスト用）
+        """
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+        # メトリクス
+        self._rejected = 0
+        self._trips = 0
+
+    @property
+    def state(self) -> str:
+        """現在の状態（open の期限が過ぎていれば half_open）"""
+        if self._state == STATE_OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            return STATE_HALF_OPEN
+        return self._state
+
+    def before_call(self) -> None:
+        """呼び出し前に確認する。
+
+        Raises:
+            CircuitOpenError: 開いている、または半開状態で試行中の場合
+        """
+        state = self.state
+        if state == STATE_CLOSED:
+            return
+        if state == STATE_HALF_OPEN and not self._trial_in_flight:
+            self._state = STATE_HALF_OPEN
+            self._trial_in_flight = True
+            logger.info(f"{self.name}: 試行を1件だけ通します")
+            return
+        self._rejected += 1
+        retry_after = max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+        raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self) -> None:
+        """呼び出しの成功を記録する。"""
+        if self._state != STATE_CLOSED:
+            logger.info(f"{self.name}: 復旧を確認したため通常状態に戻します")
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """呼び出しの失敗を記録する。"""
+        self._failures += 1
+        self._trial_in_flight = False
+        if self._state == STATE_HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != STATE_OPEN:
+                self._trips += 1
+            self._state = STATE_OPEN
+            self._opened_at = self._clock()
+            logger.warning(f"{self.name}: {self._failures}回連続で失敗したため{self.reset_timeout:.0f}秒間停止します")
+
+    def record_cancelled(self) -> None:
+        """結果が出ないまま取り消された呼び出しを記録する（成否は数えず、半開状態の試行枠だけ空ける）。"""
+        self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        """状態とメトリクスを返す。"""
+        return {
+            'state': self.state,
+            'consecutive_failures': self._failures,
+            'trips': self._trips,
+            'rejected': self._rejected,
+        }
+
+
+class Deadline:
+    """1リクエスト全体の制限時間と、工程ごとの上限を管理するクラス
+
+    各工程の制限時間は「工程の上限」と「全体の残り時間」の小さい方になります。
+    """
+
+    def __init__(self, total: float, stage_limits: Optional[Dict[str, float]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            total: リクエスト全体の制限時間（秒）
+            stage_limits: 工程名ごとの上限（秒）。未指定の工程は全体の残り時間のみで制限する
+            clock: 現在時刻を返す関数（テスト用）
+        """
+        self._clock = clock
+        self._expires_at = clock() + total
+        self._stage_limits = stage_limits or {}
+        self.timings: Dict[str, float] = {}
+        self.notes: Dict[str, str] = {}
+
+    def remaining(self) -> float:
+        """全体の残り時間（秒、0未満にはならない）"""
+        return max(0.0, self._expires_at - self._clock())
+
+    def timeout_for(self, stage: str) -> float:
+        """工程に使える時間を返す。
+
+        Raises:
+            StageTimeoutError: 全体の残り時間が無い場合
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise StageTimeoutError(stage, 0.0)
+        limit = self._stage_limits.get(stage)
+        return min(limit, remaining) if limit else remaining
+
+    @contextlib.contextmanager
+    def stage(self, stage: str) -> Iterator[float]:
+        """工程の所要時間を記録し、使える時間を渡すコンテキストマネージャ"""
+        timeout = self.timeout_for(stage)
+        started = self._clock()
+        try:
+            yield timeout
+        finally:
+            self.timings[stage] = self._clock() - started
+
+    async def run(self, stage: str, awaitable: Awaitable[Any]) -> Any:
+        """工程の制限時間内で awaitable を待つ。
+
+        Raises:
+            StageTimeoutError: 制限時間内に終わらなかった場合
+        """
+        try:
+            timeout = self.timeout_for(stage)
+        except StageTimeoutError:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise
+        with self.stage(stage):
+            try:
+                return await asyncio.wait_for(awaitable, timeout)
+            except asyncio.TimeoutError:
+                raise StageTimeoutError(stage, timeout) from None
+
+    def skip(self, stage: str, reason: str) -> None:
+        """工程を実行せずに済んだことを記録する（例: キャッシュにヒットした描画）"""
+        self.notes[stage] = reason
+
+    def summary(self) -> str:
+        """工程ごとの所要時間をログ用の文字列にする。"""
+        parts = [f"{stage}={elapsed * 1000:.0f}ms" for stage, elapsed in self.timings.items()]
+        parts.extend(f"{stage}={reason}" for stage, reason in self.notes.items())
+        return ", ".join(parts)
@@ -0,0 +1,171 @@
+"""
+キャラクターステータスページの取得と解析
+Seleniumを使わずにHTTPだけで取得する高速経路、Seleniumでの取得、共通のHTML解析処理を提供します。
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+from bs4 import BeautifulSoup, SoupStrainer
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# ステータス欄（section.status 内の dl）の何番目が各項目に当たるか
+STATUS_FIELDS = {
+    'name': 1,
+    'country': 4,
+    'skill': 5,
+    'sencetype': 6,
+    'personality': 7,
+    'goal': 8,
+    'zirpower': 9,
+    'zircongear': 10,
+    'firstperson': 11,
+    'nickname': 12,
+    'lines': 13,
+    'weakness': 14,
+}
+
+STATUS_SELECTOR = "#root > main > div > section.status"
+
+# 解析対象を section.status 配下に絞る
+_STATUS_STRAINER = SoupStrainer('section', class_='status')
+
+# lxml があれば高速なパーサを使う（無ければ標準の html.parser）
+try:
+    import lxml  # noqa: F401
+    _PARSER = 'lxml'
+except ImportError:  # pragma: no cover
+    _PARSER = 'html.parser'
+
+_HTTP_HEADERS = {
+    'User-Agent': (
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+        '(KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+    ),
+    'Accept': 'text/html,application/xhtml+xml',
+    'Accept-Language': 'ja,en;q=0.8',
+}
+
+
+def extract_status_fields(html: str) -> List[Tuple[str, str]]:
+    """ステータス欄の dl を1回だけ走査し、(ラベル, 値) の組を並び順で返す。
+
+    ページ全体ではなく section.status 配下だけを解析する。
+    i 番目の要素は、従来のセレクタ ``section.status > div > dl:nth-of-type(i) > dd > p`` と同じ dl に対応する。
+
+    Args:
+        html: ページ全体、または section.status 要素のHTML
+
+    Returns:
+        List[Tuple[str, str]]: (dt のテキスト, dd > p のテキスト) のリスト
+    """
+    soup = BeautifulSoup(html, _PARSER, parse_only=_STATUS_STRAINER)
+    section = soup.find('section', class_='status')
+    if section is None:
+        return []
+
+    # dl:nth-of-type(i) は複数の div にまたがって最初に一致したものが採用されるため、位置ごとに先勝ちで埋める
+    by_position: Dict[int, Tuple[str, str]] = {}
+    for div in section.find_all('div', recursive=False):
+        for position, dl in enumerate(div.find_all('dl', recursive=False), start=1):
+            if position in by_position:
+                continue
+            dt = dl.find('dt', recursive=False)
+            label = dt.get_text(strip=True) if dt else ''
+            value = ''
+            for dd in dl.find_all('dd', recursive=False):
+                p = dd.find('p', recursive=False)
+                if p is not None:
+                    value = p.text
+                    break
+            by_position[position] = (label, value)
+
+    if not by_position:
+        return []
+    return [by_position.get(i, ('', '')) for i in range(1, max(by_position) + 1)]
+
+
+def parse_status_html(html: str) -> Dict[str, str]:
+    """キャラクターページのHTMLからステータス項目を抜き出す。
+
+    Args:
+        html: ページ全体、または section.status 要素のHTML
+
+    Returns:
+        Dict[str, str]: STATUS_FIELDS のキーごとの値（見つからない項目は空文字）
+    """
+    fields = extract_status_fields(html)
+    info = {}
+    for key, index in STATUS_FIELDS.items():
+        info[key] = fields[index - 1][1] if index <= len(fields) else ''
+    return info
+
+
+def is_complete(info: Dict[str, str]) -> bool:
+    """ポスターに使える程度に項目が取れているか（名前が取れていれば十分とみなす）。"""
+    return bool(info.get('name', '').strip())
+
+
+async def fetch_character_info_http(session: aiohttp.ClientSession, character_id: str) -> Dict[str, str]:
+    """ブラウザを使わずHTTPでキャラクターページを取得して解析する。
+
+    サーバー側でレンダリングされたHTMLにステータス欄が含まれていない場合は、
+    空の項目を返す（呼び出し側で Selenium にフォールバックする）。
+
+    Args:
+        session: 共有の aiohttp セッション
+        character_id: キャラクターID
+
+    Returns:
+        Dict[str, str]: キャラクター情報
+
+    Raises:
+        aiohttp.ClientError: 通信に失敗した場合
+        asyncio.TimeoutError: タイムアウトした場合
+    """
+    url = config.get_character_page_url(character_id)
+    timeout = aiohttp.ClientTimeout(total=config.POSTER_HTTP_TIMEOUT)
+    async with session.get(url, headers=_HTTP_HEADERS, timeout=timeout) as resp:
+        resp.raise_for_status()
+        html = await resp.text()
+    return parse_status_html(html)
+
+
+def scrape_character_info_selenium(driver: Any, character_id: str, timeout: Optional[float] = None) -> Dict[str, str]:
+    """起動済みのドライバでキャラクターページを開いて解析する（ブロッキング）。
+
+    Args:
+        driver: Selenium WebDriver
+        character_id: キャラクターID
+        timeout: ページ読み込み・要素待ちの上限（秒、省略時は30秒/10秒）
+
+    Returns:
+        Dict[str, str]: キャラクター情報
+    """
+    # 使い回しのドライバなので、ページ読み込みの上限は毎回設定し直す
+    driver.set_page_load_timeout(30 if timeout is None else max(1, timeout))
+    driver.get(config.get_character_page_url(character_id))
+
+    # WebDriverWaitで要素の読み込みを待機（page_load_strategy が eager/none でもここで揃う）
+    try:
+        WebDriverWait(driver, 10 if timeout is None else max(1, min(10, timeout))).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, STATUS_SELECTOR))
+        )
+    except TimeoutException:
+        logger.warning(f"ページ読み込みタイムアウト: character_id={character_id}")
+        # タイムアウトでも続行を試みる
+
+    # ページ全体ではなくステータス欄のHTMLだけを受け取って解析する
+    html = driver.execute_script(
+        "const el = document.querySelector(arguments[0]); return el ? el.outerHTML : null;",
+        STATUS_SELECTOR,
+    )
+    return parse_status_html(html or driver.page_source)
@@ -0,0 +1,183 @@
+"""
+送信済みポスターの添付URLの記録
+Discord にアップロードしたポスターの添付ファイルURLとメッセージの参照を、画像の内容のハッシュをキーに
+JSON ファイルへ保存します。同じポスターをもう一度送るときは、数MBの画像を再アップロードせずに
+この URL を埋め込みで示します（リンクが切れていれば再アップロードします）。
+"""
+
+import collections
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.parse
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class UploadRecord:
+    """アップロード済みのポスター
+
+    Attributes:
+        url: 添付ファイルのURL
+        channel_id: 送信したチャンネルのID
+        message_id: 送信したメッセージのID
+        guild_id: 送信したサーバーのID（DMなら None）
+        size: 画像のサイズ（バイト）
+        uploaded_at: アップロードした時刻（UNIX時間）
+    """
+    url: str
+    channel_id: int
+    message_id: int
+    guild_id: Optional[int]
+    size: int
+    uploaded_at: float
+
+    @property
+    def jump_url(self) -> str:
+        """送信したメッセージへのリンク"""
+        return f"https://discord.com/channels/{self.guild_id or '@me'}/{self.channel_id}/{self.message_id}"
+
+
+def content_hash(data: bytes) -> str:
+    """ポスター画像の内容のハッシュ（記録のキー）"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def url_expired(url: str, now: Optional[float] = None) -> bool:
+    """署名付き添付URLの有効期限（ex パラメータ、16進のUNIX時間）が過ぎているか（期限が無ければ False）"""
+    values = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query).get('ex')
+    if not values:
+        return False
+    try:
+        expires = int(values[0], 16)
+    except ValueError:
+        return False
+    return expires <= (time.time() if now is None else now)
+
+
+async def is_url_alive(session: aiohttp.ClientSession, url: str, timeout: float = 5) -> bool:
+    """URLがまだ画像を返すかを HEAD リクエストで確認する（期限切れ・通信失敗は False）"""
+    if url_expired(url):
+        return False
+    try:
+        async with session.head(
+            url, timeout=aiohttp.ClientTimeout(total=timeout), allow_redirects=True
+        ) as response:
+            return 200 <= response.status < 300
+    except (aiohttp.ClientError, TimeoutError) as e:
+        logger.info(f"送信済みポスターのURLを確認できませんでした: {e}")
+        return False
+
+
+class UploadIndex:
+    """内容のハッシュ → UploadRecord の記録（JSONファイルに保存、スレッドセーフ）"""
+
+    def __init__(self, path: str, max_entries: int = 1000):
+        """
+        Args:
+            path: 保存先の JSON ファイル
+            max_entries: 保持する件数の上限（古く使われていないものから削除）
+        """
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._records: Optional['collections.OrderedDict[str, UploadRecord]'] = None
+        self._reused = 0
+        self._dead = 0
+        self._uploads = 0
+        self._bytes_saved = 0
+
+    def get(self, digest: str) -> Optional[UploadRecord]:
+        """記録を返す。無ければ None。"""
+        with self._lock:
+            self._load()
+            record = self._records.get(digest)
+            if record is not None:
+                self._records.move_to_end(digest)
+            return record
+
+    def put(self, digest: str, record: UploadRecord) -> None:
+        """アップロードした結果を記録して保存する。"""
+        with self._lock:
+            self._load()
+            self._uploads += 1
+            self._records[digest] = record
+            self._records.move_to_end(digest)
+            while len(self._records) > self.max_entries:
+                self._records.popitem(last=False)
+            self._save()
+
+    def record_reuse(self, record: UploadRecord) -> None:
+        """記録したURLで送信できた（再アップロードを省いた）ことを集計する。"""
+        with self._lock:
+            self._reused += 1
+            self._bytes_saved += record.size
+
+    def forget(self, digest: str) -> None:
+        """リンク切れの記録を削除する。"""
+        with self._lock:
+            self._load()
+            self._dead += 1
+            if self._records.pop(digest, None) is not None:
+                self._save()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._load()
+            return {
+                'entries': len(self._records),
+                'reused': self._reused,
+                'dead_links': self._dead,
+                'uploads': self._uploads,
+                'saved_mb': round(self._bytes_saved / 1024 / 1024, 1),
+            }
+
+    # ------------------------------------------------------------------
+
+    def _load(self) -> None:
+        """ファイルから記録を読み込む（初回のみ、ロック取得済みで呼ぶ）"""
+        if self._records is not None:
+            return
+        self._records = collections.OrderedDict()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"送信済みポスターの記録の読み込みに失敗しました（空の記録として扱います）: {e}")
+            return
+        if not isinstance(payload, dict):
+            return
+        for digest, values in payload.items():
+            try:
+                self._records[digest] = UploadRecord(**values)
+            except TypeError:
+                continue
+
+    def _save(self) -> None:
+        """記録をファイルに書き出す（ロック取得済みで呼ぶ）"""
+        payload = {digest: asdict(record) for digest, record in self._records.items()}
+        directory = os.path.dirname(self.path) or '.'
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(payload, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"送信済みポスターの記録の保存に失敗: {e}")
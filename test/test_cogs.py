@@ -38,5 +38,19 @@ class TestCogs(unittest.IsolatedAsyncioTestCase):
         cog = Oracle(self.bot)
         self.assertTrue(hasattr(cog, "bot"))
 
+    async def test_poster_batch_helpers(self):
+        from cogs.poster import Poster
+        self.assertEqual(Poster._parse_batch_ids("12, 345,6789 12", 10), ["12", "345", "6789"])
+        with self.assertRaises(ValueError):
+            Poster._parse_batch_ids("12,abc", 10)
+        with self.assertRaises(ValueError):
+            Poster._parse_batch_ids(" , ", 10)
+        with self.assertRaises(ValueError):
+            Poster._parse_batch_ids("1,2,3", 2)
+        posters = [("1", b"a" * 6), ("2", b"b" * 6), ("3", b"c" * 3)]
+        self.assertEqual([[cid for cid, _ in batch] for batch in Poster._pack_attachments(posters, 10)],
+                         [["1"], ["2", "3"]])
+        self.assertEqual(len(Poster._pack_attachments(posters, 0, max_files=2)), 2)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
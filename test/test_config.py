@@ -5,6 +5,8 @@
 
 import unittest
 import os
+import subprocess
+import sys
 
 class TestConfig(unittest.TestCase):
     """設定ファイルのテストクラス（ユニットテスト向けに修正）"""
@@ -49,6 +51,18 @@ class TestConfig(unittest.TestCase):
         self.assertEqual(settings['timezone'], 'Asia/Tokyo')
         settings = config.get_feature_settings('nonexistent_feature')
         self.assertEqual(settings, {})
+    def test_tools_start_without_token(self):
+        # トークンはボット起動時（main.py）にだけ解決するので、Discordに接続しないツールはトークン無しで起動できる
+        env = {**self.original_env, 'DISCORD_TOKEN_DEV': '', 'DISCORD_TOKEN_PROD': ''}
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        for module in ('tools.render', 'tools.render_service', 'tools.crawl', 'tools.bench_glow'):
+            with self.subTest(module=module):
+                result = subprocess.run(
+                    [sys.executable, '-m', module, '--help'],
+                    cwd=root, env=env, capture_output=True, text=True, timeout=60,
+                )
+                self.assertEqual(result.returncode, 0, result.stderr)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""
+一括事前取得ツール（tools.crawl）と画像保存のテスト
+"""
+
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import aiohttp
+from aiohttp.test_utils import TestServer
+from PIL import Image, UnidentifiedImageError
+
+from poster_core.image_store import ImageStore, ImageTooLargeError, download_character_image
+from test.test_poster_scraper import build_status_html
+from tools.crawl import Crawler, parse_id_ranges
+from tools.stub_server import StubSettings, create_app
+
+
+def image_bytes(color=(10, 20, 30), size=(40, 40)):
+    buf = io.BytesIO()
+    Image.new("RGB", size, color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class TestParseIdRanges(unittest.TestCase):
+
+    def test_ranges_and_single_ids(self):
+        self.assertEqual(parse_id_ranges("1-3, 5,2,7-7"), ["1", "2", "3", "5", "7"])
+        with self.assertRaises(ValueError):
+            parse_id_ranges("5-1")
+        with self.assertRaises(ValueError):
+            parse_id_ranges("a-b")
+
+
+class TestCrawler(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        fixtures = os.path.join(self.temp_dir.name, "fixtures")
+        os.makedirs(os.path.join(fixtures, "pages"))
+        os.makedirs(os.path.join(fixtures, "images"))
+        self.images = {"1": image_bytes((1, 1, 1)), "2": image_bytes((2, 2, 2))}
+        for cid in ("1", "2"):
+            with open(os.path.join(fixtures, "pages", f"{cid}.html"), "w", encoding="utf-8") as f:
+                f.write(build_status_html({"name": f"chara{cid}"}))
+            with open(os.path.join(fixtures, "images", f"pfp_{cid}.webp"), "wb") as f:
+                f.write(self.images[cid])
+        # 画像ではないファイルと、大きな画像
+        with open(os.path.join(fixtures, "images", "pfp_8.webp"), "wb") as f:
+            f.write(b"<html>not an image</html>")
+        with open(os.path.join(fixtures, "images", "pfp_9.webp"), "wb") as f:
+            f.write(image_bytes(size=(600, 600)) + b"\0" * 300_000)
+
+        self.server = TestServer(create_app(StubSettings(fixtures_dir=fixtures)))
+        await self.server.start_server()
+        base = str(self.server.make_url("")).rstrip("/")
+        self.patches = [
+            patch("config.ZIRCON_CHARACTER_PAGE_URL", f"{base}/character"),
+            patch("config.ZIRCON_IMAGE_BASE_URL", f"{base}/image"),
+            patch("config.POSTER_INFO_CACHE_PATH", os.path.join(self.temp_dir.name, "info.sqlite3")),
+            patch("config.POSTER_IMAGE_CACHE_DIR", os.path.join(self.temp_dir.name, "images")),
+        ]
+        for p in self.patches:
+            p.start()
+
+    async def asyncTearDown(self):
+        for p in self.patches:
+            p.stop()
+        await self.server.close()
+        self.temp_dir.cleanup()
+
+    async def test_crawl_then_resume(self):
+        counts = await Crawler(["1", "2", "3"], concurrency=2, rate=0).run()
+        self.assertEqual((counts["info"], counts["images"], counts["missing"]), (2, 2, 1))
+
+        crawler = Crawler(["1", "2", "3"], concurrency=2, rate=0)
+        self.assertEqual(crawler.info_cache.get("2").info["name"], "chara2")
+        self.assertEqual(crawler.image_store.get("1"), self.images["1"])
+        counts = await crawler.run()
+        self.assertEqual((counts["skipped"], counts["info"], counts["images"]), (2, 0, 0))
+
+    async def test_selenium_fallback_counts_against_rate_limit(self):
+        crawler = Crawler(["3"], concurrency=1, rate=0, only="info")
+        crawler.driver_pool = MagicMock()
+        crawler.limiter.wait = AsyncMock()
+        with patch("tools.crawl.fetch_character_info_http", AsyncMock(return_value={})), \
+                patch.object(crawler, "_scrape_with_selenium", return_value={"name": "chara3"}):
+            async with aiohttp.ClientSession() as session:
+                await crawler._crawl_one(session, "3")
+        # HTTP と Selenium での読み直しで2回待つ
+        self.assertEqual(crawler.limiter.wait.await_count, 2)
+        self.assertEqual(crawler.info_cache.get("3").info["name"], "chara3")
+
+    async def test_download_into_memory(self):
+        async with aiohttp.ClientSession() as session:
+            self.assertEqual(await download_character_image(session, "2"), self.images["2"])
+            with self.assertRaises(UnidentifiedImageError):
+                await download_character_image(session, "8")
+            with self.assertRaises(ImageTooLargeError):
+                await download_character_image(session, "9", max_bytes=100_000)
+            self.assertGreater(len(await download_character_image(session, "9")), 300_000)
+            with self.assertRaises(aiohttp.ClientResponseError):
+                await download_character_image(session, "3")
+
+
+class _StreamingResponse:
+    """チャンクを1つずつ返すレスポンス（何チャンク読まれたかを数える）"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.read = 0
+        self.content_length = None
+        self.content = self
+
+    def raise_for_status(self):
+        pass
+
+    async def iter_chunked(self, size):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class TestDownloadCharacterImage(unittest.IsolatedAsyncioTestCase):
+
+    async def test_non_image_is_rejected_after_header_limit(self):
+        response = _StreamingResponse([b"<html>" + b"x" * 32 * 1024] * 100)
+        session = MagicMock(get=MagicMock(return_value=response))
+        with self.assertRaises(UnidentifiedImageError):
+            await download_character_image(session, "1", max_bytes=10 * 1024 * 1024)
+        # 本文を最後まで受信せずに打ち切る
+        self.assertEqual(response.read, 2)
+
+    async def test_image_split_across_chunks(self):
+        data = image_bytes(size=(300, 300))
+        response = _StreamingResponse([data[i:i + 10] for i in range(0, len(data), 10)])
+        session = MagicMock(get=MagicMock(return_value=response))
+        self.assertEqual(await download_character_image(session, "1"), data)
+
+
+class TestImageStore(unittest.TestCase):
+
+    def test_put_get_and_stats(self):
+        with tempfile.TemporaryDirectory() as root:
+            store = ImageStore(root)
+            self.assertIsNone(store.get("12"))
+            store.put("12", b"data")
+            self.assertTrue(store.path_for("12").endswith("pfp_12.webp"))
+            self.assertEqual(store.get("12"), b"data")
+            self.assertEqual(store.stats(), {"files": 1, "hits": 1, "misses": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
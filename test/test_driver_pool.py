@@ -0,0 +1,96 @@
+"""
+WebDriverプールのテスト
+実ブラウザは起動せず、ダミードライバで貸し出し・回収の挙動を確認します。
+"""
+
+import unittest
+
+from selenium.common.exceptions import WebDriverException
+
+from poster_core.driver_pool import DriverPool
+
+
+class FakeDriver:
+    """execute_script / quit だけを持つダミードライバ"""
+
+    def __init__(self):
+        self.alive = True
+        self.quit_called = False
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise WebDriverException("dead")
+        return 1
+
+    def quit(self):
+        self.quit_called = True
+
+
+class TestDriverPool(unittest.TestCase):
+
+    def setUp(self):
+        self.created = []
+
+        def factory():
+            driver = FakeDriver()
+            self.created.append(driver)
+            return driver
+
+        self.factory = factory
+
+    def test_driver_is_reused(self):
+        pool = DriverPool(self.factory, size=1, max_pages=10)
+        with pool.lease() as first:
+            pass
+        with pool.lease() as second:
+            pass
+        self.assertIs(first, second)
+        self.assertEqual(len(self.created), 1)
+        self.assertEqual(pool.stats()['leases'], 2)
+
+    def test_recycle_after_max_pages(self):
+        pool = DriverPool(self.factory, size=1, max_pages=2)
+        for _ in range(3):
+            with pool.lease():
+                pass
+        self.assertEqual(len(self.created), 2)
+        self.assertTrue(self.created[0].quit_called)
+        self.assertEqual(pool.stats()['recycled'], 1)
+
+    def test_crash_recycles_driver(self):
+        pool = DriverPool(self.factory, size=1)
+        with self.assertRaises(WebDriverException):
+            with pool.lease():
+                raise WebDriverException("crash")
+        self.assertTrue(self.created[0].quit_called)
+        with pool.lease() as driver:
+            self.assertIs(driver, self.created[1])
+
+    def test_unhealthy_idle_driver_is_replaced(self):
+        pool = DriverPool(self.factory, size=1)
+        pool.warm()
+        self.created[0].alive = False
+        with pool.lease() as driver:
+            self.assertIs(driver, self.created[1])
+        self.assertEqual(pool.stats()['recycled'], 1)
+
+    def test_lease_timeout_when_exhausted(self):
+        pool = DriverPool(self.factory, size=1, lease_timeout=0.05)
+        with pool.lease():
+            with self.assertRaises(TimeoutError):
+                with pool.lease():
+                    pass
+
+    def test_close_quits_idle_drivers(self):
+        pool = DriverPool(self.factory, size=2)
+        self.assertEqual(pool.warm(), 2)
+        pool.close()
+        self.assertTrue(all(d.quit_called for d in self.created))
+        self.assertEqual(pool.stats()['live'], 0)
+        with self.assertRaises(RuntimeError):
+            with pool.lease():
+                pass
+
+
+if __name__ == '__main__':
+    unittest.main()
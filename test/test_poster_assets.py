@@ -0,0 +1,104 @@
+"""
+ポスター用画像アセットの事前読み込みのテスト
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from PIL import Image
+
+from poster_core.assets import AssetStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestAssetStore(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.mask_path = os.path.join(self.dir, 'mask.png')
+        self.clock = FakeClock()
+        Image.new('LA', (160, 210), (0, 128)).save(self.mask_path)
+        Image.new('RGBA', (600, 400), (255, 0, 0, 255)).save(os.path.join(self.dir, 'Peaceful.png'))
+        Image.new('RGB', (150, 100), (0, 0, 255)).save(os.path.join(self.dir, 'brave.png'))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def _store(self, **kwargs):
+        store = AssetStore(self.mask_path, self.dir, reload_interval=10, clock=self.clock, **kwargs)
+        store.refresh(force=True)
+        return store
+
+    def test_mask_is_pre_resized_rgba(self):
+        mask = self._store().mask()
+        self.assertEqual(mask.size, (1640, 2140))
+        self.assertEqual(mask.mode, 'RGBA')
+
+    def test_flags_are_case_insensitive_and_pre_scaled(self):
+        store = self._store()
+        for name in ('peaceful', 'PEACEFUL', ' Peaceful '):
+            flag = store.flag(name)
+            self.assertEqual((flag.size, flag.mode), ((300, 200), 'RGBA'))
+        self.assertEqual(store.flag('Brave').mode, 'RGB')
+        self.assertIsNone(store.flag('mask'))
+        self.assertIsNone(store.flag('unknown'))
+        self.assertIsNone(store.flag(''))
+        self.assertEqual(store.stats()['flags'], 2)
+
+    def test_country_paths_take_precedence(self):
+        other = os.path.join(self.dir, 'sub')
+        os.makedirs(other)
+        Image.new('RGB', (30, 30), (0, 255, 0)).save(os.path.join(other, 'glory_flag.png'))
+        store = self._store(country_paths={'glory': os.path.join(other, 'glory_flag.png'),
+                                           'freedom': os.path.join(other, 'missing.png')})
+        self.assertEqual(store.flag('Glory').size, (300, 300))
+        self.assertEqual(store.missing(), ['missing.png'])
+
+    def test_reloads_when_files_change(self):
+        store = self._store()
+        self.assertIsNone(store.flag('glory'))
+        Image.new('RGB', (300, 150)).save(os.path.join(self.dir, 'glory.png'))
+
+        # 確認間隔の間はファイルを見に行かない
+        self.clock.now = 5
+        self.assertIsNone(store.flag('glory'))
+        self.clock.now = 11
+        self.assertEqual(store.flag('glory').size, (300, 150))
+        self.assertEqual(store.stats()['reloads'], 2)
+
+        # 変化が無ければ読み直さない
+        self.clock.now = 30
+        store.mask()
+        self.assertEqual(store.stats()['reloads'], 2)
+
+        os.remove(self.mask_path)
+        self.clock.now = 50
+        self.assertIsNone(store.mask())
+
+    def test_loaded_fingerprint_lags_until_reload(self):
+        store = self._store()
+        self.assertEqual(store.loaded_fingerprint(), store.fingerprint())
+        loaded = store.loaded_fingerprint()
+        Image.new('RGB', (300, 150)).save(os.path.join(self.dir, 'glory.png'))
+
+        # 読み直すまでは、ディスク上の版と読み込み済みの版が異なる
+        self.clock.now = 5
+        store.mask()
+        self.assertNotEqual(store.fingerprint(), loaded)
+        self.assertEqual(store.loaded_fingerprint(), loaded)
+        self.clock.now = 11
+        store.mask()
+        self.assertEqual(store.loaded_fingerprint(), store.fingerprint())
+
+
+if __name__ == '__main__':
+    unittest.main()
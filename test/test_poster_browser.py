@@ -0,0 +1,37 @@
+"""
+スクレイピング用Chromeの設定（リクエストブロック・読み込み戦略）のテスト
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+from poster_core import browser
+
+
+class TestBrowserSettings(unittest.TestCase):
+
+    def test_blocked_patterns_cover_resource_types_and_urls(self):
+        with patch.object(browser.config, "POSTER_BLOCK_RESOURCE_TYPES", ["font", "stylesheet", "unknown"]), \
+                patch.object(browser.config, "POSTER_BLOCK_URL_PATTERNS", ["*analytics*"]):
+            patterns = browser.blocked_url_patterns()
+        self.assertIn("*analytics*", patterns)
+        self.assertIn("*.woff2", patterns)
+        self.assertIn("*.css?*", patterns)
+        self.assertNotIn("*.png", patterns)
+
+    def test_page_load_strategy(self):
+        with patch.object(browser.config, "POSTER_PAGE_LOAD_STRATEGY", "eager"):
+            self.assertEqual(browser.build_chrome_options().page_load_strategy, "eager")
+        with patch.object(browser.config, "POSTER_PAGE_LOAD_STRATEGY", "bogus"):
+            self.assertEqual(browser.build_chrome_options().page_load_strategy, "normal")
+
+    def test_measure_transfer(self):
+        driver = MagicMock()
+        driver.execute_script.return_value = [2048, 3]
+        self.assertEqual(browser.measure_transfer(driver), (2048, 3))
+        driver.execute_script.side_effect = Exception("no perf api")
+        self.assertEqual(browser.measure_transfer(driver), (0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
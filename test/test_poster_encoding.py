@@ -0,0 +1,78 @@
+"""
+ポスター画像のエンコード設定のテスト
+"""
+
+import io
+import random
+import unittest
+
+from PIL import Image
+
+from poster_core.encoding import (
+    PROFILE_ORDER, EncodeStats, encode_image, extension_for, resolve_profile,
+)
+
+
+def _noisy_image(size=(256, 256)):
+    # 可逆圧縮ではほとんど縮まない画像
+    rng = random.Random(0)
+    return Image.frombytes('RGB', size, bytes(rng.randrange(256) for _ in range(size[0] * size[1] * 3)))
+
+
+class TestEncoding(unittest.TestCase):
+
+    def test_each_profile_produces_its_format(self):
+        img = Image.new('RGB', (64, 64), (200, 30, 30))
+        for name in PROFILE_ORDER:
+            result = encode_image(img, name)
+            decoded = Image.open(io.BytesIO(result.data))
+            self.assertEqual(decoded.format, resolve_profile(name).format)
+            self.assertEqual(extension_for(result.data), resolve_profile(name).extension)
+            self.assertEqual((result.profile, result.fell_back, result.over_budget), (name, False, False))
+            self.assertEqual(result.size, len(result.data))
+
+    def test_jpeg_converts_alpha(self):
+        result = encode_image(Image.new('RGBA', (32, 32), (0, 0, 0, 0)), 'jpeg')
+        self.assertEqual(Image.open(io.BytesIO(result.data)).mode, 'RGB')
+
+    def test_falls_back_until_within_budget(self):
+        img = _noisy_image()
+        png = encode_image(img, 'png')
+        jpeg = encode_image(img, 'jpeg')
+        self.assertLess(jpeg.size, png.size)
+        result = encode_image(img, 'png', max_bytes=jpeg.size)
+        self.assertEqual(result.profile, 'jpeg')
+        self.assertTrue(result.fell_back)
+        self.assertEqual([name for name, _ in result.attempts], ['png', 'webp_lossless', 'jpeg'])
+        self.assertLessEqual(result.size, jpeg.size)
+        self.assertIn('png', result.summary())
+
+    def test_returns_smallest_when_nothing_fits(self):
+        result = encode_image(_noisy_image(), 'jpeg', max_bytes=100)
+        self.assertTrue(result.over_budget)
+        self.assertEqual(result.size, min(size for _, size in result.attempts))
+        self.assertEqual([name for name, _ in result.attempts], ['jpeg', 'webp'])
+
+    def test_unknown_profile(self):
+        self.assertEqual(resolve_profile(None).name, 'png')
+        self.assertEqual(resolve_profile(' WEBP ').name, 'webp')
+        with self.assertRaises(ValueError):
+            resolve_profile('gif')
+        with self.assertRaises(ValueError):
+            encode_image(Image.new('RGB', (8, 8)), 'gif')
+
+    def test_extension_for_unknown_bytes(self):
+        self.assertEqual(extension_for(b'not an image'), 'png')
+
+    def test_stats(self):
+        stats = EncodeStats()
+        img = _noisy_image((64, 64))
+        stats.record(encode_image(img, 'png'))
+        stats.record(encode_image(img, 'png', max_bytes=1))
+        values = stats.stats()
+        self.assertTrue(values['png'].startswith('1件'))
+        self.assertEqual((values['fallbacks'], values['over_budget']), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+フォントマネージャーのテスト
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from poster_core.fonts import FontManager, build_font_index
+
+
+class TestFontManager(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.font_dir = os.path.join(self.temp_dir.name, "fonts", "sub")
+        os.makedirs(self.font_dir)
+        self.font_path = os.path.join(self.font_dir, "Test Font.ttc")
+        with open(self.font_path, "wb") as f:
+            f.write(b"font-bytes")
+        # 実フォントに依存しないよう、truetype は呼び出しごとに別オブジェクトを返す偽物にする
+        self.truetype = MagicMock(side_effect=lambda *args, **kwargs: object())
+        self.patcher = patch("poster_core.fonts.ImageFont.truetype", self.truetype)
+        self.patcher.start()
+        self.manager = FontManager(cache_size=2, font_dirs=[os.path.join(self.temp_dir.name, "fonts")],
+                                   allow_download=False)
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.temp_dir.cleanup()
+
+    def test_index_finds_font_by_file_name(self):
+        self.assertEqual(build_font_index([self.temp_dir.name]), {"test font.ttc": self.font_path})
+        self.assertEqual(self.manager.resolve("test font.TTC"), self.font_path)
+
+    def test_resolves_once_and_caches_by_path_and_size(self):
+        with patch.object(self.manager, "_find", wraps=self.manager._find) as find:
+            first = self.manager.get("Test Font.ttc", 40)
+            self.assertIs(self.manager.get("Test Font.ttc", 40), first)
+            self.manager.get("Test Font.ttc", 50)
+        find.assert_called_once()
+        stats = self.manager.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["font_files"]), (1, 2, 1))
+
+    def test_lru_evicts_least_recently_used(self):
+        a = self.manager.get("Test Font.ttc", 10)
+        self.manager.get("Test Font.ttc", 20)
+        self.manager.get("Test Font.ttc", 10)  # 10 を最近使用にする
+        self.manager.get("Test Font.ttc", 30)  # 20 が追い出される
+        self.assertIs(self.manager.get("Test Font.ttc", 10), a)
+        self.assertEqual(self.manager.stats()["evictions"], 1)
+        misses = self.manager.stats()["misses"]
+        self.manager.get("Test Font.ttc", 20)
+        self.assertEqual(self.manager.stats()["misses"], misses + 1)
+
+    def test_unresolvable_font_falls_back_to_default(self):
+        with patch("poster_core.fonts._LINUX_FALLBACKS", []), patch("poster_core.fonts._WINDOWS_FALLBACKS", []):
+            self.assertIsNone(self.manager.resolve("missing.ttf"))
+            self.assertIsNotNone(self.manager.get("missing.ttf", 40))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+グロー付きテキスト描画のテスト
+"""
+
+import math
+import unittest
+
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+from poster_core.glow import draw_text_with_glow, glow_offsets
+
+GLOW = [(8, (80, 80, 80, 255)), (6, (95, 95, 95, 255)), (4, (110, 110, 110, 255)), (2, (130, 130, 130, 255))]
+
+
+def legacy_draw(canvas, text, x, y, font, glow_layers, main_color=(255, 255, 255)):
+    """従来の 12方向×レイヤー数+1回の draw.text による描画"""
+    draw = ImageDraw.Draw(canvas)
+    for radius, color in glow_layers:
+        for angle in range(0, 360, 30):
+            dx = int(radius * math.cos(math.radians(angle)))
+            dy = int(radius * math.sin(math.radians(angle)))
+            draw.text((x + dx, y + dy), text, fill=color, font=font)
+    draw.text((x, y), text, fill=main_color, font=font)
+
+
+class TestGlow(unittest.TestCase):
+
+    def setUp(self):
+        self.font = ImageFont.load_default(size=60)
+        self.background = Image.new("RGB", (700, 160), (200, 40, 40))
+
+    def test_matches_legacy_rendering(self):
+        expected = self.background.copy()
+        actual = self.background.copy()
+        legacy_draw(expected, "Glow Text", 30, 40, self.font, GLOW)
+        draw_text_with_glow(actual, "Glow Text", 30, 40, self.font, GLOW)
+        diff = ImageChops.difference(expected, actual).convert("L")
+        histogram = diff.histogram()
+        mean = sum(i * n for i, n in enumerate(histogram)) / sum(histogram)
+        # 重なった縁のアンチエイリアスだけがわずかに異なる
+        self.assertLess(mean, 0.1)
+        self.assertLess(sum(histogram[64:]), 10)
+
+    def test_text_near_edge_is_clipped(self):
+        canvas = self.background.copy()
+        draw_text_with_glow(canvas, "Edge", -20, -10, self.font, GLOW)
+        draw_text_with_glow(canvas, "", 10, 10, self.font, GLOW)
+        self.assertEqual(canvas.size, (700, 160))
+
+    def test_offsets_follow_twelve_directions(self):
+        self.assertEqual(len(glow_offsets(8)), 12)
+        self.assertIn((8, 0), glow_offsets(8))
+        self.assertLessEqual(len(glow_offsets(1)), 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
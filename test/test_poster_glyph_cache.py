@@ -0,0 +1,72 @@
+"""
+グリフキャッシュのテスト
+"""
+
+import unittest
+
+from PIL import Image, ImageChops, ImageFont
+
+from poster_core.glow import draw_text_with_glow
+from poster_core.glyph_cache import GlyphCache
+
+GLOW = [(8, (80, 80, 80, 255)), (6, (95, 95, 95, 255)), (4, (110, 110, 110, 255)), (2, (130, 130, 130, 255))]
+BLUE_GLOW = [(8, (100, 100, 150, 255)), (6, (120, 120, 170, 255))]
+
+
+class TestGlyphCache(unittest.TestCase):
+
+    def setUp(self):
+        self.font = ImageFont.load_default(size=60)
+        self.background = Image.new("RGB", (300, 160), (200, 40, 40))
+
+    def test_draw_matches_uncached_rendering(self):
+        cache = GlyphCache()
+        expected = self.background.copy()
+        actual = self.background.copy()
+        draw_text_with_glow(expected, "A", 30, 40, self.font, GLOW)
+        cache.draw(actual, "A", 30, 40, self.font, GLOW)
+        self.assertIsNone(ImageChops.difference(expected, actual).getbbox())
+
+        # 2回目はキャッシュから貼り付けても同じ結果になる
+        again = self.background.copy()
+        cache.draw(again, "A", 30, 40, self.font, GLOW)
+        self.assertIsNone(ImageChops.difference(expected, again).getbbox())
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+
+    def test_key_includes_font_size_and_style(self):
+        cache = GlyphCache()
+        cache.get_tile("A", self.font, GLOW)
+        cache.get_tile("A", ImageFont.load_default(size=40), GLOW)
+        cache.get_tile("A", self.font, BLUE_GLOW)
+        cache.get_tile("A", self.font, GLOW, (0, 0, 0))
+        cache.get_tile("B", self.font, GLOW)
+        self.assertEqual(cache.stats()['entries'], 5)
+        self.assertEqual(cache.stats()['hits'], 0)
+
+    def test_evicts_least_recently_used_within_byte_budget(self):
+        probe = GlyphCache()
+        halos, mask, _ = probe.get_tile("A", self.font, GLOW)
+        tile_bytes = mask.width * mask.height * (len(halos) + 1)
+
+        cache = GlyphCache(max_bytes=int(tile_bytes * 2.5))
+        for ch in "ABC":
+            cache.get_tile(ch, self.font, GLOW)
+        stats = cache.stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['entries'], 2)
+        cache.get_tile("A", self.font, GLOW)  # 追い出されているので再描画
+        self.assertEqual(cache.stats()['misses'], 4)
+
+    def test_long_text_and_disabled_cache_are_not_stored(self):
+        cache = GlyphCache(max_text_len=4)
+        cache.get_tile("Long text", self.font, GLOW)
+        self.assertEqual(cache.stats()['entries'], 0)
+
+        disabled = GlyphCache(max_bytes=0)
+        disabled.get_tile("A", self.font, GLOW)
+        self.assertEqual(disabled.stats()['entries'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+キャラクター情報キャッシュのテスト
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import AsyncMock, patch
+
+import discord
+from discord.ext import commands
+
+from poster_core.info_cache import CharacterInfoCache
+
+
+class TestCharacterInfoCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = CharacterInfoCache(os.path.join(self.temp_dir.name, "info.sqlite3"), ttl=60)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_put_and_get_fresh(self):
+        self.assertIsNone(self.cache.get("1"))
+        self.cache.put("1", {"name": "リオン"})
+        entry = self.cache.get("1")
+        self.assertEqual(entry.info, {"name": "リオン"})
+        self.assertFalse(entry.stale)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_expired_entry_is_returned_as_stale(self):
+        self.cache.put("1", {"name": "old"}, fetched_at=time.time() - 120)
+        entry = self.cache.get("1")
+        self.assertTrue(entry.stale)
+        self.assertEqual(entry.info["name"], "old")
+
+    def test_invalidate(self):
+        self.cache.put("1", {"name": "a"})
+        self.cache.put("2", {"name": "b"})
+        self.assertEqual(self.cache.invalidate("1"), 1)
+        self.assertIsNone(self.cache.get("1"))
+        self.assertEqual(self.cache.invalidate(), 1)
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+
+class TestPosterInfoCacheFlow(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        from cogs.poster import Poster
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.bot = commands.Bot(command_prefix="!", intents=discord.Intents.default())
+        with patch("cogs.poster.config.POSTER_INFO_CACHE_PATH", os.path.join(self.temp_dir.name, "info.sqlite3")):
+            self.cog = Poster(self.bot)
+
+    async def asyncTearDown(self):
+        await self.cog.cog_unload()
+        await self.bot.close()
+        self.temp_dir.cleanup()
+
+    async def test_miss_fetches_and_stores(self):
+        self.cog._fetch_character_info = AsyncMock(return_value=({"name": "new"}, "http"))
+        info, source = await self.cog._get_character_info("5")
+        self.assertEqual((info["name"], source), ("new", "http"))
+        info, source = await self.cog._get_character_info("5")
+        self.assertEqual(source, "cache")
+        self.cog._fetch_character_info.assert_awaited_once()
+
+    async def test_stale_entry_served_then_refreshed(self):
+        self.cog.info_cache.put("5", {"name": "old"}, fetched_at=time.time() - 10 ** 9)
+        self.cog._fetch_character_info = AsyncMock(return_value=({"name": "new"}, "http"))
+        info, source = await self.cog._get_character_info("5")
+        self.assertEqual((info["name"], source), ("old", "cache-stale"))
+        await asyncio.gather(*self.cog._refresh_tasks.values())
+        self.assertEqual(self.cog.info_cache.get("5").info["name"], "new")
+
+
+if __name__ == '__main__':
+    unittest.main()
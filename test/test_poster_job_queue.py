@@ -0,0 +1,147 @@
+"""
+ポスター作成ジョブキューのテスト
+"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import discord
+from discord.ext import commands
+
+from poster_core.job_queue import JobQueue, JobQueueFullError
+
+
+class TestJobQueue(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.started = []
+        self.gates = {}
+
+    def _job(self, key, result=None, error=None):
+        async def run():
+            self.started.append(key)
+            await self.gates.setdefault(key, asyncio.Event()).wait()
+            if error:
+                raise error
+            return result if result is not None else f"poster-{key}"
+        return run
+
+    def _release(self, key):
+        self.gates.setdefault(key, asyncio.Event()).set()
+
+    async def test_concurrency_limit_and_positions(self):
+        queue = JobQueue(concurrency=2, initial_estimate=10)
+        tickets = [queue.submit(key, self._job(key)) for key in ('1', '2', '3', '4')]
+        await asyncio.sleep(0)
+        self.assertEqual(self.started, ['1', '2'])
+        self.assertEqual([t.position for t in tickets], [0, 0, 1, 2])
+        self.assertEqual([t.eta for t in tickets], [10, 10, 20, 20])
+        self.assertEqual(queue.stats()['waiting'], 2)
+
+        self._release('1')
+        self.assertEqual(await tickets[0].result(), 'poster-1')
+        await asyncio.sleep(0)
+        self.assertEqual(self.started, ['1', '2', '3'])
+        for key in ('2', '3', '4'):
+            self._release(key)
+        self.assertEqual([await t.result() for t in tickets[1:]], ['poster-2', 'poster-3', 'poster-4'])
+        self.assertEqual(queue.stats()['completed'], 4)
+
+    async def test_same_key_shares_one_job(self):
+        queue = JobQueue(concurrency=1)
+        first = queue.submit('7', self._job('7'))
+        queue.submit('8', self._job('8'))
+        waiting = queue.submit('8', self._job('8'))
+        running = queue.submit('7', self._job('7'))
+        self.assertTrue(running.shared)
+        self.assertTrue(waiting.shared)
+        self.assertEqual((running.position, waiting.position), (0, 1))
+
+        self._release('7')
+        self._release('8')
+        self.assertEqual(await first.result(), await running.result())
+        self.assertEqual(await waiting.result(), 'poster-8')
+        self.assertEqual(self.started, ['7', '8'])
+        self.assertEqual(queue.stats()['shared'], 2)
+
+        # 完了後は新しいジョブとして受け付ける
+        again = queue.submit('7', self._job('7'))
+        self.assertFalse(again.shared)
+
+    async def test_errors_are_shared_and_queue_keeps_running(self):
+        queue = JobQueue(concurrency=1)
+        a = queue.submit('1', self._job('1', error=ValueError('boom')))
+        b = queue.submit('1', self._job('1'))
+        c = queue.submit('2', self._job('2'))
+        self._release('1')
+        self._release('2')
+        for ticket in (a, b):
+            with self.assertRaises(ValueError):
+                await ticket.result()
+        self.assertEqual(await c.result(), 'poster-2')
+        self.assertEqual(queue.stats()['failed'], 1)
+
+    async def test_caller_cancellation_does_not_cancel_shared_job(self):
+        queue = JobQueue(concurrency=1)
+        a = queue.submit('1', self._job('1'))
+        b = queue.submit('1', self._job('1'))
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(a.result(), timeout=0.01)
+        self._release('1')
+        self.assertEqual(await b.result(), 'poster-1')
+
+    async def test_rejects_when_waiting_limit_reached(self):
+        queue = JobQueue(concurrency=1, max_waiting=1)
+        queue.submit('1', self._job('1'))
+        queue.submit('2', self._job('2'))
+        with self.assertRaises(JobQueueFullError):
+            queue.submit('3', self._job('3'))
+        # 相乗りは上限に数えない
+        self.assertTrue(queue.submit('2', self._job('2')).shared)
+        self.assertEqual(queue.stats()['rejected'], 1)
+        queue.cancel_all()
+
+
+class TestPosterPreviewHandoff(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        from cogs.poster import Poster
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.bot = commands.Bot(command_prefix="!", intents=discord.Intents.default())
+        with patch("cogs.poster.config.POSTER_INFO_CACHE_PATH", os.path.join(self.temp_dir.name, "info.sqlite3")):
+            self.cog = Poster(self.bot)
+        self.cog._send_poster = AsyncMock()
+
+    async def asyncTearDown(self):
+        await self.cog.cog_unload()
+        await self.bot.close()
+        self.temp_dir.cleanup()
+
+    async def test_joining_batch_job_does_not_leave_preview_behind(self):
+        from cogs.poster import Poster
+        interaction = MagicMock(guild=None)
+        interaction.response.send_message = AsyncMock()
+        key = ("1", self.cog._profile_for(interaction, None), self.cog._upload_budget(interaction))
+        gate = asyncio.Event()
+
+        async def batch_job():
+            await gate.wait()
+            return b"poster", False
+
+        # /poster_batch と同じく、プレビュー無しのジョブが先に並んでいる
+        self.cog.jobs.submit(key, batch_job)
+        with patch("cogs.poster.config.POSTER_PREVIEW", True):
+            command = asyncio.create_task(Poster.poster.callback(self.cog, interaction, "1"))
+            await asyncio.sleep(0.01)
+            self.assertNotIn(key, self.cog._previews)
+            gate.set()
+            await asyncio.wait_for(command, timeout=5)
+        self.cog._send_poster.assert_awaited_once()
+        self.assertEqual(self.cog._previews, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+描画レイヤーキャッシュのテスト
+"""
+
+import unittest
+
+from PIL import Image
+
+from poster_core.layers import LayerCache
+
+
+class TestLayerCache(unittest.TestCase):
+
+    def setUp(self):
+        self.builds = 0
+
+    def _build(self, color=(10, 20, 30)):
+        def build():
+            self.builds += 1
+            return Image.new('RGB', (8, 8), color)
+        return build
+
+    def test_base_returns_copy_and_reuses_built_image(self):
+        cache = LayerCache(max_bases=2)
+        mask = object()
+        first = cache.base('1', mask, self._build())
+        first.putpixel((0, 0), (255, 255, 255))  # 描き込んでも保持しているものは変わらない
+        second = cache.base('1', mask, self._build())
+        self.assertEqual(self.builds, 1)
+        self.assertEqual(second.getpixel((0, 0)), (10, 20, 30))
+        self.assertIsNot(first, second)
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_base_is_rebuilt_when_mask_changes(self):
+        cache = LayerCache()
+        cache.base('1', object(), self._build())
+        cache.base('1', object(), self._build())
+        self.assertEqual(self.builds, 2)
+
+    def test_base_lru_eviction_and_disabled(self):
+        cache = LayerCache(max_bases=2)
+        for key in ('1', '2', '1', '3'):
+            cache.base(key, None, self._build())
+        self.assertEqual(cache.stats()['evictions'], 1)
+        cache.base('1', None, self._build())  # 直前に使ったので残っている
+        self.assertEqual(self.builds, 3)
+        cache.base('2', None, self._build())  # 追い出されている
+        self.assertEqual(self.builds, 4)
+
+        disabled = LayerCache(max_bases=0)
+        disabled.base('1', None, self._build())
+        disabled.base('1', None, self._build())
+        self.assertEqual(disabled.stats()['bases'], 0)
+        uncached = LayerCache()
+        uncached.base(None, None, self._build())
+        self.assertEqual(uncached.stats()['bases'], 0)
+
+    def test_chrome_is_built_once_per_key(self):
+        cache = LayerCache()
+        calls = []
+
+        def build():
+            calls.append(1)
+            return Image.new('RGBA', (4, 4)), (0, 0)
+
+        layer = cache.chrome((1, 'font'), build)
+        self.assertIs(cache.chrome((1, 'font'), build), layer)
+        cache.chrome((2, 'font'), build)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(cache.stats()['chrome_layers'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+テキストレイアウト（折り返し・フォントサイズ探索・縦書き配置）のテスト
+"""
+
+import unittest
+
+from PIL import ImageFont
+
+from poster_core.layout import VerticalGrid, fit_largest, metrics_for, split_balanced, wrap_spans, wrap_text
+
+
+def naive_wrap(text, font, max_width):
+    """従来の、伸ばした行ごとに幅を測る折り返し（送り幅基準）"""
+    lines, current = [], ""
+    for ch in text:
+        test = current + ch
+        if font.getlength(test) > max_width and current:
+            lines.append(current)
+            current = ch
+        else:
+            current = test
+    if current:
+        lines.append(current)
+    return lines
+
+
+class TestLayout(unittest.TestCase):
+
+    def setUp(self):
+        self.font = ImageFont.load_default(size=30)
+
+    def test_wrap_matches_naive_wrapping(self):
+        text = "The quick brown fox jumps over the lazy dog " * 3
+        for width in (60, 150, 333, 10_000):
+            self.assertEqual(wrap_text(text, self.font, width), naive_wrap(text, self.font, width))
+
+    def test_wide_char_gets_its_own_line(self):
+        self.assertEqual(wrap_spans([0, 5, 50, 55], 20), [(0, 1), (1, 2), (2, 3)])
+        self.assertEqual(wrap_text("", self.font, 100), [])
+
+    def test_metrics_are_cached_per_font(self):
+        metrics = metrics_for(self.font)
+        self.assertIs(metrics_for(self.font), metrics)
+        prefix = metrics.prefix_widths("abc")
+        self.assertAlmostEqual(prefix[-1], metrics.text_width("abc"))
+
+    def test_fit_largest_uses_binary_search(self):
+        calls = []
+
+        def fits(size):
+            calls.append(size)
+            return "ok" if size <= 47 else None
+
+        sizes = list(range(80, 19, -1))
+        self.assertEqual(fit_largest(sizes, fits), (47, "ok"))
+        self.assertLessEqual(len(calls), 7)
+        self.assertIsNone(fit_largest(sizes, lambda size: None))
+
+    def test_split_balanced_prefers_even_halves(self):
+        left, right = split_balanced("aaaaaaaaaa", self.font, 1000)
+        self.assertEqual((left, right), ("aaaaa", "aaaaa"))
+
+    def test_vertical_grid_positions(self):
+        grid = VerticalGrid(self.font, char_w=20, char_h=20, char_spacing=25, rows_per_col=2)
+        positions = grid.positions("abcde", x_left=1, x_right=70, y_top=10, column_gap=5)
+        # 2文字ごとに左の列へ移り、左端からはみ出す3列目（70 - 50 - 20 < 1）は描かない
+        self.assertEqual([p[2] for p in positions], [10, 35, 10, 35])
+        self.assertEqual(len(positions), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+完成画像キャッシュのテスト
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from poster_core.output_cache import OutputCache
+
+
+class TestOutputCache(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_key_depends_on_every_input(self):
+        base = OutputCache.key_for(b'img', {'name': 'A', 'goal': 'x'}, 'v1', 'PNG')
+        self.assertEqual(base, OutputCache.key_for(b'img', {'goal': 'x', 'name': 'A'}, 'v1', 'PNG'))
+        for other in (
+            OutputCache.key_for(b'img2', {'name': 'A', 'goal': 'x'}, 'v1', 'PNG'),
+            OutputCache.key_for(b'img', {'name': 'B', 'goal': 'x'}, 'v1', 'PNG'),
+            OutputCache.key_for(b'img', {'name': 'A', 'goal': 'x'}, 'v2', 'PNG'),
+            OutputCache.key_for(b'img', {'name': 'A', 'goal': 'x'}, 'v1', 'WEBP'),
+        ):
+            self.assertNotEqual(base, other)
+
+    def test_memory_and_disk_hits(self):
+        cache = OutputCache(self.dir)
+        self.assertIsNone(cache.get('k1'))
+        cache.put('k1', b'poster')
+        self.assertEqual(cache.get('k1'), b'poster')
+        self.assertEqual(cache.stats()['memory_hits'], 1)
+
+        # 再起動後はディスクから読み、メモリに載せ直す
+        restarted = OutputCache(self.dir)
+        self.assertEqual(restarted.get('k1'), b'poster')
+        self.assertEqual(restarted.get('k1'), b'poster')
+        stats = restarted.stats()
+        self.assertEqual((stats['disk_hits'], stats['memory_hits'], stats['disk_entries']), (1, 1, 1))
+
+    def test_memory_budget_spills_to_disk(self):
+        cache = OutputCache(self.dir, max_memory_bytes=10)
+        cache.put('a', b'x' * 6)
+        cache.put('b', b'y' * 6)
+        self.assertEqual(cache.stats()['memory_entries'], 1)
+        self.assertEqual(cache.get('a'), b'x' * 6)
+        self.assertEqual(cache.stats()['disk_hits'], 1)
+
+    def test_disk_budget_evicts_least_recently_used(self):
+        cache = OutputCache(self.dir, max_memory_bytes=0, max_disk_bytes=20)
+        cache.put('a', b'1' * 8)
+        cache.put('b', b'2' * 8)
+        cache.get('a')
+        cache.put('c', b'3' * 8)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), b'1' * 8)
+        self.assertEqual(sorted(os.listdir(self.dir)), ['a.bin', 'c.bin'])
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_memory_only_and_clear(self):
+        cache = OutputCache(self.dir, max_disk_bytes=0)
+        cache.put('a', b'data')
+        self.assertEqual(os.listdir(self.dir), [])
+        self.assertEqual(cache.get('a'), b'data')
+
+        disk = OutputCache(self.dir)
+        disk.put('b', b'data')
+        disk.clear()
+        self.assertIsNone(disk.get('b'))
+        self.assertEqual(os.listdir(self.dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
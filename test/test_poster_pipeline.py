@@ -0,0 +1,78 @@
+"""
+ポスター作成の一連の処理（PosterPipeline）のテスト
+"""
+
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from PIL import Image
+
+from poster_core.assets import AssetStore
+from poster_core.encoding import EncodeStats
+from poster_core.image_store import ImageStore
+from poster_core.output_cache import OutputCache
+from poster_core.pipeline import PosterJobError, PosterPipeline
+from poster_core.render_pool import RenderPool
+
+INFO = {'name': 'Test Name', 'goal': 'goal text'}
+
+
+def _char_bytes():
+    buf = io.BytesIO()
+    Image.new('RGB', (200, 200), (10, 200, 10)).save(buf, format='PNG')
+    return buf.getvalue()
+
+
+class TestPosterPipeline(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = self.temp_dir.name
+        self.image_store = ImageStore(os.path.join(root, 'images'))
+        self.image_store.put('1', _char_bytes())
+        self.pool = RenderPool(workers=0)
+        self.pool.start()
+        self.output_cache = OutputCache(os.path.join(root, 'output'), max_disk_bytes=0)
+        self.encode_stats = EncodeStats()
+        assets = AssetStore(os.path.join(root, 'mask.png'), root)
+        self.pipeline = PosterPipeline(self.image_store, self.pool, self.output_cache, assets, self.encode_stats)
+        self.session = MagicMock()
+
+    async def asyncTearDown(self):
+        self.pool.close()
+        self.temp_dir.cleanup()
+
+    async def test_render_then_serve_from_cache(self):
+        get_info = AsyncMock(return_value=INFO)
+        draft = AsyncMock()
+        build = await self.pipeline.build(self.session, '1', 'png', 0, get_info, draft)
+        self.assertEqual((build.degraded, build.cached), (False, False))
+        self.assertEqual(Image.open(io.BytesIO(build.data)).size, (1600, 2100))
+        draft.assert_called_once()
+        self.assertEqual(draft.call_args.args[1], INFO)
+
+        # 同じ入力なら描画せずにキャッシュから返す（下書きも描かない）
+        draft.reset_mock()
+        cached = await self.pipeline.build(self.session, '1', 'png', 0, get_info, draft)
+        self.assertEqual((cached.data, cached.cached), (build.data, True))
+        draft.assert_not_called()
+        self.assertEqual(self.pool.stats()['completed'], 1)
+        self.assertIn('png', self.encode_stats.stats())
+
+    async def test_info_failure_builds_image_only_poster(self):
+        build = await self.pipeline.build(self.session, '1', 'png', 0, AsyncMock(side_effect=ValueError("down")))
+        self.assertTrue(build.degraded)
+        self.assertEqual(Image.open(io.BytesIO(build.data)).size, (1600, 2100))
+
+    async def test_unreadable_image_is_a_job_error(self):
+        self.image_store.put('2', b'not an image')
+        with self.assertRaises(PosterJobError) as cm:
+            await self.pipeline.build(self.session, '2', 'png', 0, AsyncMock(return_value=INFO))
+        self.assertIn("画像ファイルの読み込みに失敗しました", cm.exception.user_message)
+
+
+if __name__ == '__main__':
+    unittest.main()
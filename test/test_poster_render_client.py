@@ -0,0 +1,171 @@
+"""
+描画サービスのクライアント（振り分け・フェイルオーバー・死活確認）のテスト
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, patch
+
+import discord
+from aiohttp import web
+from discord.ext import commands
+from aiohttp.test_utils import TestServer
+
+from poster_core.render_client import RenderClient, RenderJobError, RenderNodeError
+
+
+def make_node(status: int = 200, body: bytes = b'\x89PNG\r\n\x1a\nnode', error: str = '', degraded: bool = False):
+    """決まった応答を返す描画ノードのアプリケーションと、受けた依頼の記録"""
+    received = []
+
+    async def handle_render(request: web.Request) -> web.Response:
+        received.append(await request.json())
+        if status != 200:
+            return web.json_response({'error': error}, status=status)
+        return web.Response(body=body, headers={'X-Poster-Degraded': '1' if degraded else '0'})
+
+    async def handle_health(request: web.Request) -> web.Response:
+        return web.json_response({'status': 'ok'})
+
+    app = web.Application()
+    app.router.add_post('/render', handle_render)
+    app.router.add_get('/health', handle_health)
+    return app, received
+
+
+class TestRenderClient(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.servers = []
+        self.clients = []
+
+    async def asyncTearDown(self):
+        for client in self.clients:
+            await client.close()
+        for server in self.servers:
+            await server.close()
+
+    async def start_node(self, **kwargs):
+        app, received = make_node(**kwargs)
+        server = TestServer(app)
+        await server.start_server()
+        self.servers.append(server)
+        return str(server.make_url('')).rstrip('/'), received
+
+    async def dead_url(self) -> str:
+        server = TestServer(web.Application())
+        await server.start_server()
+        url = str(server.make_url('')).rstrip('/')
+        await server.close()
+        return url
+
+    def make_client(self, urls) -> RenderClient:
+        client = RenderClient(urls, timeout=5)
+        self.clients.append(client)
+        return client
+
+    async def test_render_returns_image_and_flags(self):
+        url, received = await self.start_node(degraded=True)
+        response = await self.make_client([url]).render("12", "webp", 1024)
+        self.assertTrue(response.data.startswith(b'\x89PNG'))
+        self.assertTrue(response.degraded)
+        self.assertFalse(response.cached)
+        self.assertEqual(response.node, url)
+        self.assertEqual(received, [{'character_id': '12', 'profile': 'webp', 'max_bytes': 1024}])
+
+        # 依頼元で取得した情報は依頼に添える（空の辞書もそのまま送る）
+        await self.make_client([url]).render("12", "png", info={'name': 'リオン'})
+        await self.make_client([url]).render("12", "png", info={})
+        self.assertEqual([r.get('info') for r in received[1:]], [{'name': 'リオン'}, {}])
+
+    async def test_fails_over_to_next_node(self):
+        dead = await self.dead_url()
+        url, received = await self.start_node()
+        client = self.make_client([dead, url])
+        for _ in range(3):
+            response = await client.render("1", "png")
+            self.assertEqual(response.node, url)
+        self.assertEqual(len(received), 3)
+        self.assertFalse(client.nodes[0].healthy)
+        # 停止中のノードは後回しにするので、2回目以降は最初から稼働中のノードに依頼する
+        self.assertEqual(client.stats()['failovers'], 1)
+
+    async def test_spreads_requests_across_nodes(self):
+        first, received_first = await self.start_node()
+        second, received_second = await self.start_node()
+        client = self.make_client([first, second])
+        for _ in range(4):
+            await client.render("1", "png")
+        self.assertEqual((len(received_first), len(received_second)), (2, 2))
+
+    async def test_job_error_is_not_retried(self):
+        failing, _ = await self.start_node(status=422, error="キャラクター画像の取得に失敗しました。")
+        other, received = await self.start_node()
+        client = self.make_client([failing, other])
+        client._next = len(client.nodes) - 1  # 次の依頼は failing から始める
+        with self.assertRaises(RenderJobError) as cm:
+            await client.render("1", "png")
+        self.assertEqual(cm.exception.user_message, "キャラクター画像の取得に失敗しました。")
+        self.assertEqual(received, [])
+
+    async def test_all_nodes_busy(self):
+        busy, _ = await self.start_node(status=503, error="混雑")
+        with self.assertRaises(RenderNodeError) as cm:
+            await self.make_client([busy]).render("1", "png")
+        self.assertTrue(cm.exception.busy)
+
+        dead = await self.dead_url()
+        with self.assertRaises(RenderNodeError) as cm:
+            await self.make_client([busy, dead]).render("1", "png")
+        self.assertFalse(cm.exception.busy)
+
+    async def test_health_check_marks_nodes(self):
+        url, _ = await self.start_node()
+        dead = await self.dead_url()
+        client = self.make_client([url, dead])
+        client.nodes[0].healthy = False
+        await client.check_health()
+        self.assertEqual([node.healthy for node in client.nodes], [True, False])
+        self.assertEqual(client.stats()['healthy'], "1/2")
+
+    def test_requires_nodes(self):
+        with self.assertRaises(ValueError):
+            RenderClient([])
+
+
+class TestPosterRemoteBuild(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        from cogs.poster import Poster
+        self.temp_dir = tempfile.TemporaryDirectory()
+        app, self.received = make_node()
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.bot = commands.Bot(command_prefix="!", intents=discord.Intents.default())
+        with patch("cogs.poster.config.POSTER_INFO_CACHE_PATH", os.path.join(self.temp_dir.name, "info.sqlite3")), \
+                patch("cogs.poster.config.POSTER_RENDER_NODES", [str(self.server.make_url('')).rstrip('/')]):
+            self.cog = Poster(self.bot)
+
+    async def asyncTearDown(self):
+        await self.cog.cog_unload()
+        await self.bot.close()
+        await self.server.close()
+        self.temp_dir.cleanup()
+
+    async def test_sends_bot_side_info(self):
+        self.cog.info_cache.put("12", {'name': 'リオン'})
+        await self.cog._build_poster_remote("12", "png", 0)
+        self.assertEqual(self.received[-1]['info'], {'name': 'リオン'})
+
+        # キャッシュを消したあとは Bot 側の取得方式で取り直す（取れなければ画像のみで作成させる）
+        self.cog.info_cache.invalidate("12")
+        http = AsyncMock(return_value={})
+        with patch("cogs.poster.config.POSTER_SCRAPE_MODE", "http"), patch("cogs.poster.fetch_character_info_http", http):
+            await self.cog._build_poster_remote("12", "png", 0)
+        http.assert_awaited_once()
+        self.assertEqual(self.received[-1]['info'], {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+"""
+ポスター描画プールのテスト
+"""
+
+import asyncio
+import concurrent.futures
+import io
+import os
+import tempfile
+import unittest
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image
+
+from poster_core.render_pool import RenderPool, RenderQueueFullError
+from poster_core.assets import AssetStore
+from poster_core.renderer import PosterRenderer, template_version
+
+INFO = {
+    'name': 'Test Name',
+    'lines': 'こんにちは、世界…',
+    'goal': 'goal text',
+    'skill': '剣術',
+    'nickname': 'nick',
+}
+
+
+def _char_bytes(color=(10, 200, 10)):
+    buf = io.BytesIO()
+    Image.new('RGB', (200, 200), color).save(buf, format='PNG')
+    return buf.getvalue()
+
+
+class TestPosterRenderer(unittest.TestCase):
+
+    def test_render_returns_encoded_poster(self):
+        renderer = PosterRenderer()
+        data = renderer.render(_char_bytes(), INFO, '1').data
+        img = Image.open(io.BytesIO(data))
+        self.assertEqual((img.format, img.size), ('PNG', (1600, 2100)))
+        # 2回目は土台を使い回しても同じ結果になる
+        self.assertEqual(renderer.render(_char_bytes(), INFO, '1').data, data)
+        self.assertEqual(renderer.stats()['レイヤーキャッシュ']['hits'], 1)
+
+    def test_render_without_info(self):
+        data = PosterRenderer().render(_char_bytes(), {}).data
+        self.assertEqual(Image.open(io.BytesIO(data)).size, (1600, 2100))
+
+    def test_render_draft(self):
+        renderer = PosterRenderer()
+        draft = renderer.render(_char_bytes(), INFO, '1', draft=True)
+        img = Image.open(io.BytesIO(draft.data))
+        self.assertEqual((img.format, img.size), ('JPEG', (400, 525)))
+        self.assertLess(draft.size, renderer.render(_char_bytes(), INFO, '1').size)
+
+    def test_render_reports_assets_it_drew_with(self):
+        with tempfile.TemporaryDirectory() as root:
+            mask_path = os.path.join(root, 'mask.png')
+            Image.new('RGBA', (160, 210), (0, 0, 0, 128)).save(mask_path)
+            assets = AssetStore(mask_path, root, reload_interval=3600)
+            renderer = PosterRenderer(assets)
+            renderer.preload()
+            old_version = template_version(assets)
+            self.assertEqual(renderer.render(_char_bytes(), INFO, '1').template_version, old_version)
+
+            # 差し替え後も、読み直すまでは古いアセットで描いた版を返す
+            Image.new('RGBA', (160, 210), (255, 0, 0, 128)).save(mask_path)
+            os.utime(mask_path, (1, 1))
+            self.assertNotEqual(template_version(assets), old_version)
+            self.assertEqual(renderer.render(_char_bytes(), INFO, '1').template_version, old_version)
+            self.assertIsNone(renderer.render(_char_bytes(), INFO, '1', draft=True).template_version)
+
+    def test_render_with_profile(self):
+        result = PosterRenderer().render(_char_bytes(), INFO, profile='jpeg')
+        self.assertEqual((result.profile, Image.open(io.BytesIO(result.data)).format), ('jpeg', 'JPEG'))
+
+
+class TestRenderPool(unittest.IsolatedAsyncioTestCase):
+
+    async def test_in_process_render(self):
+        pool = RenderPool(workers=0)
+        pool.start()
+        result = await pool.render(_char_bytes(), INFO, '1')
+        self.assertEqual(Image.open(io.BytesIO(result.data)).size, (1600, 2100))
+        stats = pool.stats()
+        self.assertEqual((stats['completed'], stats['pending']), (1, 0))
+        self.assertIn('グリフキャッシュ', await pool.worker_stats())
+
+    async def test_rejects_when_queue_is_full(self):
+        pool = RenderPool(workers=0, max_queue=0)
+        pool.start()
+        results = await asyncio.gather(
+            pool.render(_char_bytes(), INFO), pool.render(_char_bytes(), INFO), return_exceptions=True
+        )
+        self.assertEqual(sum(isinstance(r, RenderQueueFullError) for r in results), 1)
+        self.assertEqual(pool.stats()['rejected'], 1)
+        # 空けば再び受け付ける
+        await pool.render(_char_bytes(), INFO)
+        self.assertEqual(pool.stats()['pending'], 0)
+
+    async def test_process_pool_matches_in_process_render(self):
+        pool = RenderPool(workers=1)
+        try:
+            pool.start()
+            result = await asyncio.wait_for(pool.render(_char_bytes(), INFO, '1', 'webp', 10**9), timeout=60)
+            self.assertEqual(result.data, PosterRenderer().render(_char_bytes(), INFO, '1', 'webp').data)
+            stats = await asyncio.wait_for(pool.worker_stats(), timeout=60)
+            self.assertEqual(stats['レイヤーキャッシュ']['bases'], 1)
+            self.assertEqual(pool.stats()['completed'], 1)
+        finally:
+            pool.close()
+
+    async def test_concurrent_broken_renders_restart_once(self):
+        class FakeExecutor:
+            def __init__(self):
+                self.futures = []
+                self.shutdowns = 0
+
+            def submit(self, *args):
+                future = concurrent.futures.Future()
+                self.futures.append(future)
+                return future
+
+            def shutdown(self, wait=True, cancel_futures=False):
+                self.shutdowns += 1
+
+        pool = RenderPool(workers=1)
+        broken = FakeExecutor()
+        pool._executor = broken
+        tasks = [asyncio.create_task(pool.render(b'', INFO)) for _ in range(2)]
+        await asyncio.sleep(0)
+        self.assertEqual(len(broken.futures), 2)
+
+        broken.futures[0].set_exception(BrokenProcessPool())
+        with self.assertRaises(BrokenProcessPool):
+            await tasks[0]
+        # 1件目の失敗でプールが作り直された後に、2件目の失敗が届く
+        healthy = FakeExecutor()
+        pool._executor = healthy
+        broken.futures[1].set_exception(BrokenProcessPool())
+        with self.assertRaises(BrokenProcessPool):
+            await tasks[1]
+
+        self.assertIs(pool._executor, healthy)
+        self.assertEqual((broken.shutdowns, healthy.shutdowns), (1, 0))
+        self.assertEqual(pool.stats()['restarts'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
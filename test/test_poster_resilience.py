@@ -0,0 +1,153 @@
+"""
+サーキットブレーカー・デッドラインのテスト
+"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, patch
+
+import discord
+from discord.ext import commands
+
+from poster_core.resilience import CircuitBreaker, CircuitOpenError, Deadline, StageTimeoutError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=30, clock=self.clock)
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.before_call()
+        self.breaker.record_failure()
+        self.breaker.before_call()
+        self.breaker.record_success()  # 成功で連続失敗数はリセット
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, "closed")
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, "open")
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        self.assertEqual(self.breaker.stats()["rejected"], 1)
+
+    def test_half_open_allows_single_trial(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now = 31
+        self.assertEqual(self.breaker.state, "half_open")
+        self.breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()  # 試行中は他の呼び出しを通さない
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, "open")
+        self.clock.now = 62
+        self.breaker.before_call()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, "closed")
+        self.assertEqual(self.breaker.stats()["trips"], 2)
+
+    def test_cancelled_trial_frees_half_open_slot(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now = 31
+        self.breaker.before_call()
+        self.breaker.record_cancelled()
+        # 取り消された試行は失敗に数えず、次の呼び出しを試行として通す
+        self.assertEqual(self.breaker.state, "half_open")
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.stats()["consecutive_failures"], 2)
+
+
+class TestDeadline(unittest.IsolatedAsyncioTestCase):
+
+    def test_stage_timeout_is_capped_by_remaining(self):
+        clock = FakeClock()
+        deadline = Deadline(20, {"download": 15, "render": 30}, clock=clock)
+        self.assertEqual(deadline.timeout_for("download"), 15)
+        clock.now = 10
+        self.assertEqual(deadline.timeout_for("download"), 10)
+        self.assertEqual(deadline.timeout_for("scrape"), 10)
+        clock.now = 25
+        with self.assertRaises(StageTimeoutError):
+            deadline.timeout_for("render")
+
+    async def test_run_raises_stage_timeout_and_records_timing(self):
+        deadline = Deadline(5, {"render": 0.05})
+        with self.assertRaises(StageTimeoutError) as ctx:
+            await deadline.run("render", asyncio.sleep(1))
+        self.assertEqual(ctx.exception.stage, "render")
+        self.assertIn("render", deadline.timings)
+        self.assertEqual(await deadline.run("upload", asyncio.sleep(0, result="ok")), "ok")
+
+    def test_skipped_stage_is_reported_in_summary(self):
+        clock = FakeClock()
+        deadline = Deadline(20, clock=clock)
+        with deadline.stage("scrape"):
+            clock.now = 0.25
+        deadline.skip("render", "cache")
+        self.assertEqual(deadline.summary(), "scrape=250ms, render=cache")
+
+
+class TestPosterCircuitBreaker(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        from cogs.poster import Poster
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.bot = commands.Bot(command_prefix="!", intents=discord.Intents.default())
+        with patch("cogs.poster.config.POSTER_INFO_CACHE_PATH", os.path.join(self.temp_dir.name, "info.sqlite3")), \
+                patch("cogs.poster.config.POSTER_BREAKER_FAILURES", 2):
+            self.cog = Poster(self.bot)
+
+    async def asyncTearDown(self):
+        await self.cog.cog_unload()
+        await self.bot.close()
+        self.temp_dir.cleanup()
+
+    async def test_timeouts_trip_breaker_and_fail_fast(self):
+        async def slow(session, cid):
+            await asyncio.sleep(1)
+
+        http = AsyncMock(side_effect=slow)
+        with patch("cogs.poster.config.POSTER_SCRAPE_MODE", "http"), patch("cogs.poster.fetch_character_info_http", http):
+            for _ in range(2):
+                with self.assertRaises(asyncio.TimeoutError):
+                    await self.cog._fetch_character_info("1", timeout=0.05)
+            with self.assertRaises(CircuitOpenError):
+                await self.cog._get_character_info("2", timeout=0.05)
+        self.assertEqual(http.await_count, 2)
+        self.assertEqual(self.cog.scrape_breaker.state, "open")
+
+    async def test_cancelled_half_open_trial_releases_breaker(self):
+        clock = FakeClock()
+        self.cog.scrape_breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=1, clock=clock)
+        self.cog.scrape_breaker.record_failure()
+        clock.now = 2
+
+        async def slow(session, cid):
+            await asyncio.sleep(10)
+
+        with patch("cogs.poster.config.POSTER_SCRAPE_MODE", "http"), \
+                patch("cogs.poster.fetch_character_info_http", AsyncMock(side_effect=slow)):
+            trial = asyncio.create_task(self.cog._fetch_character_info("1"))
+            await asyncio.sleep(0.01)
+            trial.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await trial
+        clock.now = 1000
+        self.assertEqual(self.cog.scrape_breaker.state, "half_open")
+        self.cog.scrape_breaker.before_call()  # 次の試行が通る
+
+
+if __name__ == '__main__':
+    unittest.main()
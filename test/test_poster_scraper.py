@@ -0,0 +1,108 @@
+"""
+キャラクター情報取得（HTTP高速経路とSeleniumフォールバック）のテスト
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, patch
+
+import discord
+from discord.ext import commands
+
+from poster_core.scraper import STATUS_FIELDS, is_complete, parse_status_html
+
+
+def build_status_html(values: dict) -> str:
+    """STATUS_FIELDS の並びどおりに dl を並べたダミーページを作る"""
+    dls = []
+    for index in range(1, 15):
+        key = next((k for k, i in STATUS_FIELDS.items() if i == index), None)
+        value = values.get(key, '') if key else f'other{index}'
+        dls.append(f"<dl><dt>label{index}</dt><dd><p>{value}</p></dd></dl>")
+    return (
+        "<html><body><div id='root'><main><div>"
+        f"<section class='status'><div>{''.join(dls)}</div></section>"
+        "</div></main></div></body></html>"
+    )
+
+
+class TestParseStatusHtml(unittest.TestCase):
+
+    def test_extracts_fields_by_position(self):
+        html = build_status_html({'name': 'リオン', 'country': 'Brave', 'weakness': '朝'})
+        info = parse_status_html(html)
+        self.assertEqual(set(info), set(STATUS_FIELDS))
+        self.assertEqual(info['name'], 'リオン')
+        self.assertEqual(info['country'], 'Brave')
+        self.assertEqual(info['weakness'], '朝')
+        self.assertTrue(is_complete(info))
+
+    def test_section_fragment(self):
+        html = build_status_html({'name': 'アリア', 'lines': 'やるしかない'})
+        fragment = html[html.index("<section"):html.index("</section>") + len("</section>")]
+        self.assertEqual(parse_status_html(fragment), parse_status_html(html))
+
+    def test_first_matching_div_wins_per_position(self):
+        html = (
+            "<section class='status'>"
+            "<div><dl><dd><p>first</p></dd></dl></div>"
+            "<div><dl><dd><p>second</p></dd></dl><dl><dd><p>country?</p></dd></dl></div>"
+            "</section>"
+        )
+        info = parse_status_html(html)
+        self.assertEqual(info['name'], 'first')
+
+    def test_missing_status_section_yields_empty_fields(self):
+        info = parse_status_html("<html><body><div id='root'></div></body></html>")
+        self.assertTrue(all(value == '' for value in info.values()))
+        self.assertFalse(is_complete(info))
+
+
+class TestFetchCharacterInfo(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        from cogs.poster import Poster
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.bot = commands.Bot(command_prefix="!", intents=discord.Intents.default())
+        with patch("cogs.poster.config.POSTER_INFO_CACHE_PATH", os.path.join(self.temp_dir.name, "info.sqlite3")):
+            self.cog = Poster(self.bot)
+        self.cog._scrape_character_info = lambda cid, timeout=None: {'name': 'selenium'}
+
+    async def asyncTearDown(self):
+        await self.cog.cog_unload()
+        await self.bot.close()
+        self.temp_dir.cleanup()
+
+    async def test_http_path_serves_complete_page(self):
+        with patch("cogs.poster.config.POSTER_SCRAPE_MODE", "auto"), \
+                patch("cogs.poster.fetch_character_info_http", AsyncMock(return_value={'name': 'http'})):
+            info, source = await self.cog._fetch_character_info("1")
+        self.assertEqual((info['name'], source), ('http', 'http'))
+
+    async def test_auto_falls_back_to_selenium_on_empty_fields(self):
+        with patch("cogs.poster.config.POSTER_SCRAPE_MODE", "auto"), \
+                patch("cogs.poster.fetch_character_info_http", AsyncMock(return_value={'name': ''})):
+            info, source = await self.cog._fetch_character_info("1")
+        self.assertEqual((info['name'], source), ('selenium', 'selenium'))
+        self.assertEqual(self.cog._scrape_sources['selenium'], 1)
+
+    async def test_http_mode_does_not_fall_back(self):
+        with patch("cogs.poster.config.POSTER_SCRAPE_MODE", "http"), \
+                patch("cogs.poster.fetch_character_info_http", AsyncMock(return_value={'name': ''})):
+            with self.assertRaises(ValueError):
+                await self.cog._fetch_character_info("1")
+
+    async def test_incomplete_selenium_result_is_a_failure(self):
+        self.cog._scrape_character_info = lambda cid, timeout=None: {'name': ''}
+        with patch("cogs.poster.config.POSTER_SCRAPE_MODE", "selenium"):
+            with self.assertRaises(ValueError):
+                await self.cog._get_character_info("1")
+        self.assertEqual(self.cog.scrape_breaker.stats()['consecutive_failures'], 1)
+        self.assertEqual(self.cog._scrape_sources['selenium'], 0)
+        # 空の結果はキャッシュに残さない
+        self.assertIsNone(self.cog.info_cache.get("1"))
+
+
+if __name__ == '__main__':
+    unittest.main()
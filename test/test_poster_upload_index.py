@@ -0,0 +1,108 @@
+"""
+送信済みポスターの添付URLの記録のテスト
+"""
+
+import json
+import os
+import tempfile
+import time
+import unittest
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from poster_core.upload_index import UploadIndex, UploadRecord, content_hash, is_url_alive, url_expired
+
+
+def _record(url='https://cdn.example.com/attachments/1/2/poster_1.png', size=1000):
+    return UploadRecord(url=url, channel_id=1, message_id=2, guild_id=3, size=size, uploaded_at=0.0)
+
+
+class TestUploadIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'uploads.json')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_put_get_and_persist(self):
+        index = UploadIndex(self.path)
+        digest = content_hash(b'poster')
+        self.assertIsNone(index.get(digest))
+        index.put(digest, _record())
+        self.assertEqual(index.get(digest).url, _record().url)
+        self.assertEqual(index.get(digest).jump_url, 'https://discord.com/channels/3/1/2')
+        # 再起動後もファイルから読み込む
+        self.assertEqual(UploadIndex(self.path).get(digest), _record())
+
+    def test_evicts_least_recently_used(self):
+        index = UploadIndex(self.path, max_entries=2)
+        index.put('a', _record())
+        index.put('b', _record())
+        index.get('a')
+        index.put('c', _record())
+        self.assertIsNotNone(index.get('a'))
+        self.assertIsNone(index.get('b'))
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(set(json.load(f)), {'a', 'c'})
+
+    def test_forget_and_stats(self):
+        index = UploadIndex(self.path)
+        index.put('a', _record(size=2 * 1024 * 1024))
+        index.record_reuse(index.get('a'))
+        index.forget('a')
+        self.assertIsNone(index.get('a'))
+        self.assertEqual(
+            index.stats(), {'entries': 0, 'reused': 1, 'dead_links': 1, 'uploads': 1, 'saved_mb': 2.0}
+        )
+
+    def test_broken_file_is_treated_as_empty(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('{broken')
+        index = UploadIndex(self.path)
+        self.assertIsNone(index.get('a'))
+        index.put('a', _record())
+        self.assertIsNotNone(UploadIndex(self.path).get('a'))
+
+    def test_url_expired(self):
+        now = time.time()
+        self.assertTrue(url_expired(f"https://cdn.example.com/a.png?ex={int(now) - 10:x}&is=0&hm=abc", now))
+        self.assertFalse(url_expired(f"https://cdn.example.com/a.png?ex={int(now) + 3600:x}&is=0&hm=abc", now))
+        self.assertFalse(url_expired("https://cdn.example.com/a.png"))
+        self.assertFalse(url_expired("https://cdn.example.com/a.png?ex=zz"))
+
+
+class TestIsUrlAlive(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        app = web.Application()
+
+        async def alive(request):
+            return web.Response(body=b'png')
+
+        app.router.add_get('/alive.png', alive)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.session = aiohttp.ClientSession()
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.server.close()
+
+    async def test_head_check(self):
+        self.assertTrue(await is_url_alive(self.session, str(self.server.make_url('/alive.png'))))
+        self.assertFalse(await is_url_alive(self.session, str(self.server.make_url('/gone.png'))))
+        expired = f"{self.server.make_url('/alive.png')}?ex={int(time.time()) - 1:x}"
+        self.assertFalse(await is_url_alive(self.session, expired))
+
+    async def test_unreachable_host(self):
+        url = str(self.server.make_url('/alive.png'))
+        await self.server.close()
+        self.assertFalse(await is_url_alive(self.session, url, timeout=2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+Chromeプロセス監視（孤児回収・1回あたりの上限）のテスト
+"""
+
+import subprocess
+import sys
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from poster_core import process_supervisor as ps
+
+
+def proc(pid, ppid, name="chrome", cmdline=""):
+    return ps.ProcInfo(pid, ppid, name, cmdline, 0, 0.0)
+
+
+def fake_driver(pid):
+    return SimpleNamespace(service=SimpleNamespace(process=SimpleNamespace(pid=pid)), quit=lambda: None)
+
+
+class TestProcessTree(unittest.TestCase):
+
+    def test_descendants_come_first(self):
+        procs = {p.pid: p for p in [proc(10, 1), proc(11, 10), proc(12, 11), proc(20, 1)]}
+        self.assertEqual(ps.process_tree(10, procs), [12, 11, 10])
+        self.assertEqual(ps.process_tree(99, procs), [])
+
+
+class TestFindOrphans(unittest.TestCase):
+
+    def test_only_parentless_driver_and_marked_chrome(self):
+        procs = {p.pid: p for p in [
+            proc(100, 1, name="chromedriver"),                    # 孤児の chromedriver
+            proc(200, 1, name="chromedriver"),                    # 追跡中
+            proc(201, 200, cmdline=f"chrome {ps.CHROME_MARKER}"),  # 追跡中ドライバの子
+            proc(300, 999, cmdline=f"chrome {ps.CHROME_MARKER}"),  # 親が消えた自分のChrome
+            proc(400, 1, cmdline="chrome --other-app"),           # 他アプリのChrome
+        ]}
+        supervisor = ps.ProcessSupervisor()
+        with patch.object(ps, "list_processes", return_value=procs), \
+                patch.object(ps, "_owned_by_us", return_value=True), \
+                patch.object(ps.os, "getpid", return_value=50):
+            supervisor.track(fake_driver(200))
+            orphans = supervisor.find_orphans()
+        self.assertEqual(sorted(o.pid for o in orphans), [100, 300])
+
+
+@unittest.skipUnless(ps.is_supported() and sys.platform.startswith("linux"), "requires /proc")
+class TestLimits(unittest.TestCase):
+
+    def test_tree_killed_when_memory_limit_exceeded(self):
+        child = subprocess.Popen(["sleep", "30"])
+        try:
+            supervisor = ps.ProcessSupervisor(max_rss_mb=1, poll_interval=0.05)
+            supervisor.max_rss_bytes = 1  # 必ず超える値
+            with supervisor.limit(fake_driver(child.pid)):
+                deadline = time.time() + 5
+                while child.poll() is None and time.time() < deadline:
+                    time.sleep(0.05)
+            self.assertIsNotNone(child.poll())
+            self.assertEqual(supervisor.stats()['limit_kills'], 1)
+        finally:
+            if child.poll() is None:
+                child.kill()
+            child.wait()
+
+    def test_quit_driver_kills_leftovers(self):
+        child = subprocess.Popen(["sleep", "30"])
+        try:
+            supervisor = ps.ProcessSupervisor()
+            supervisor.track(fake_driver(child.pid))
+            supervisor.quit_driver(fake_driver(child.pid))
+            child.wait(timeout=5)
+            self.assertEqual(supervisor.stats()['leftovers_killed'], 1)
+            self.assertEqual(supervisor.stats()['tracked_drivers'], 0)
+        finally:
+            if child.poll() is None:
+                child.kill()
+                child.wait()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+ポスターの一括生成ツール（tools.render）のテスト
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from PIL import Image
+
+from poster_core.encoding import EncodeResult
+from poster_core.image_store import ImageStore
+from poster_core.info_cache import CharacterInfoCache
+from test.test_crawl import image_bytes
+from tools.render import BatchRenderer, format_summary, percentile
+
+
+class TestPercentile(unittest.TestCase):
+
+    def test_nearest_rank(self):
+        values = [float(v) for v in range(1, 21)]
+        self.assertEqual(percentile(values, 50), 10.0)
+        self.assertEqual(percentile(values, 95), 19.0)
+        self.assertEqual(percentile([3.0], 95), 3.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+
+class TestBatchRenderer(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.out_dir = os.path.join(self.temp_dir.name, "out")
+        info_path = os.path.join(self.temp_dir.name, "info.sqlite3")
+        image_dir = os.path.join(self.temp_dir.name, "images")
+        self.patches = [
+            patch("config.POSTER_INFO_CACHE_PATH", info_path),
+            patch("config.POSTER_IMAGE_CACHE_DIR", image_dir),
+        ]
+        for p in self.patches:
+            p.start()
+        store = ImageStore(image_dir)
+        store.put("1", image_bytes((1, 1, 1)))
+        store.put("2", image_bytes((2, 2, 2)))
+        CharacterInfoCache(info_path, 3600).put("1", {"name": "chara1", "goal": "goal"})
+
+    async def asyncTearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.temp_dir.cleanup()
+
+    async def test_render_then_resume(self):
+        summary = await BatchRenderer(["1", "2", "3"], self.out_dir, workers=0, profile="jpeg", offline=True).run()
+        self.assertEqual((summary["rendered"], summary["image_only"], summary["missing"]), (2, 1, 1))
+        self.assertEqual(sorted(os.listdir(self.out_dir)), ["poster_1.jpg", "poster_2.jpg"])
+        img = Image.open(os.path.join(self.out_dir, "poster_1.jpg"))
+        self.assertEqual((img.format, img.size), ("JPEG", (1600, 2100)))
+        self.assertEqual(len(summary["stages"]), 5)
+        self.assertGreater(summary["stages"]["render"]["p95_ms"], 0)
+        self.assertIn("枚/秒", format_summary(summary))
+
+        # 出力済みのものは飛ばす
+        summary = await BatchRenderer(["1", "2", "3"], self.out_dir, workers=0, offline=True).run()
+        self.assertEqual((summary["rendered"], summary["skipped"], summary["missing"]), (0, 2, 1))
+
+        summary = await BatchRenderer(["1"], self.out_dir, workers=0, offline=True, force=True).run()
+        self.assertEqual(summary["rendered"], 1)
+        self.assertEqual(sorted(os.listdir(self.out_dir)), ["poster_1.png", "poster_2.jpg"])
+
+    async def test_render_time_excludes_encode(self):
+        renderer = BatchRenderer(["1"], self.out_dir, workers=0, offline=True)
+        # エンコードに 5 秒かかったと報告する描画（実際の所要時間はほぼ0）
+        result = EncodeResult(image_bytes(), 'png', 'png', 5000.0, [('png', 100)])
+        with patch.object(renderer.pool, "render", AsyncMock(return_value=result)):
+            summary = await renderer.run()
+        self.assertEqual(summary["rendered"], 1)
+        self.assertEqual(summary["stages"]["encode"]["p50_ms"], 5000.0)
+        self.assertLess(summary["stages"]["render"]["p50_ms"], 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+ポスターの描画サービス（tools.render_service）のテスト
+"""
+
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from aiohttp.test_utils import TestClient, TestServer
+from PIL import Image
+
+from poster_core.image_store import ImageStore
+from poster_core.info_cache import CharacterInfoCache
+from poster_core.render_client import RenderClient
+from test.test_crawl import image_bytes
+from tools.render_service import RenderService, create_app
+
+
+class TestRenderService(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        info_path = os.path.join(self.temp_dir.name, "info.sqlite3")
+        image_dir = os.path.join(self.temp_dir.name, "images")
+        self.patches = [
+            patch("config.POSTER_INFO_CACHE_PATH", info_path),
+            patch("config.POSTER_IMAGE_CACHE_DIR", image_dir),
+            patch("config.POSTER_OUTPUT_CACHE_DIR", os.path.join(self.temp_dir.name, "posters")),
+            # 情報が無いキャラクターで公式サイトに取りに行かない
+            patch("tools.render_service.fetch_character_info_http", AsyncMock(return_value={})),
+        ]
+        for p in self.patches:
+            p.start()
+        store = ImageStore(image_dir)
+        store.put("1", image_bytes((1, 1, 1)))
+        store.put("2", image_bytes((2, 2, 2)))
+        CharacterInfoCache(info_path, 3600).put("1", {"name": "chara1", "goal": "goal"})
+        self.client = TestClient(TestServer(create_app(RenderService(workers=0))))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        for p in self.patches:
+            p.stop()
+        self.temp_dir.cleanup()
+
+    async def test_render_and_cache(self):
+        resp = await self.client.post("/render", json={"character_id": "1", "profile": "jpeg"})
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(resp.headers["Content-Type"], "image/jpeg")
+        self.assertEqual((resp.headers["X-Poster-Degraded"], resp.headers["X-Poster-Cached"]), ("0", "0"))
+        img = Image.open(io.BytesIO(await resp.read()))
+        self.assertEqual((img.format, img.size), ("JPEG", (1600, 2100)))
+
+        resp = await self.client.post("/render", json={"character_id": "1", "profile": "jpeg"})
+        self.assertEqual(resp.headers["X-Poster-Cached"], "1")
+
+        # 情報を取得できなければ画像のみで作成する
+        resp = await self.client.post("/render", json={"character_id": "2"})
+        self.assertEqual((resp.status, resp.headers["Content-Type"]), (200, "image/png"))
+        self.assertEqual(resp.headers["X-Poster-Degraded"], "1")
+
+        stats = await (await self.client.get("/stats")).json()
+        self.assertEqual(stats["作成ジョブ"]["completed"], 3)
+        health = await (await self.client.get("/health")).json()
+        self.assertEqual((health["status"], health["workers"]), ("ok", 0))
+
+    async def test_rejects_invalid_requests(self):
+        for payload in ({"character_id": "abc"}, {"character_id": "1", "profile": "gif"},
+                        {"character_id": "1", "max_bytes": -1}, ["1"],
+                        {"character_id": "1", "info": "name"}, {"character_id": "1", "info": {"name": 1}}):
+            resp = await self.client.post("/render", json=payload)
+            self.assertEqual(resp.status, 400, payload)
+            self.assertTrue((await resp.json())["error"])
+
+    async def test_uses_info_sent_with_request(self):
+        # 添えられた情報はノードのキャッシュ・HTTPより優先する（空なら画像のみで作成する）
+        resp = await self.client.post("/render", json={"character_id": "2", "info": {"name": "chara2"}})
+        self.assertEqual(resp.headers["X-Poster-Degraded"], "0")
+        resp = await self.client.post("/render", json={"character_id": "1", "info": {}})
+        self.assertEqual(resp.headers["X-Poster-Degraded"], "1")
+
+    async def test_client_round_trip(self):
+        client = RenderClient([str(self.client.make_url("")).rstrip("/")], timeout=30)
+        try:
+            response = await client.render("1", "webp")
+            self.assertEqual(Image.open(io.BytesIO(response.data)).format, "WEBP")
+            self.assertFalse(response.degraded)
+        finally:
+            await client.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+ローカルスタブサーバーのテスト
+"""
+
+import os
+import tempfile
+import time
+import unittest
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from tools.stub_server import StubSettings, create_app
+
+
+class TestStubServer(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.temp_dir.name, "pages"))
+        os.makedirs(os.path.join(self.temp_dir.name, "images"))
+        with open(os.path.join(self.temp_dir.name, "pages", "12.html"), "w", encoding="utf-8") as f:
+            f.write("<section class='status'></section>")
+        with open(os.path.join(self.temp_dir.name, "images", "pfp_12.webp"), "wb") as f:
+            f.write(b"x" * 4096)
+        self.clients = []
+
+    async def asyncTearDown(self):
+        for client in self.clients:
+            await client.close()
+        self.temp_dir.cleanup()
+
+    async def make_client(self, **kwargs) -> TestClient:
+        settings = StubSettings(fixtures_dir=self.temp_dir.name, seed=1, **kwargs)
+        client = TestClient(TestServer(create_app(settings)))
+        await client.start_server()
+        self.clients.append(client)
+        return client
+
+    async def test_serves_fixtures(self):
+        client = await self.make_client()
+        resp = await client.get("/character/12")
+        self.assertEqual(resp.status, 200)
+        self.assertIn("status", await resp.text())
+        resp = await client.get("/image/pfp_12.webp")
+        self.assertEqual(resp.headers["Content-Type"], "image/webp")
+        self.assertEqual(len(await resp.read()), 4096)
+        resp = await client.get("/character/99")
+        self.assertEqual(resp.status, 404)
+        resp = await client.get("/image/.env")
+        self.assertEqual(resp.status, 400)
+
+    async def test_error_injection(self):
+        client = await self.make_client(error_rate=1.0)
+        resp = await client.get("/character/12")
+        self.assertEqual(resp.status, 503)
+        health = await (await client.get("/health")).json()
+        self.assertEqual(health["injected_errors"], 1)
+
+    async def test_latency_and_bandwidth(self):
+        client = await self.make_client(latency_ms=50, bandwidth_kBps=40)
+        started = time.perf_counter()
+        resp = await client.get("/image/pfp_12.webp")
+        body = await resp.read()
+        elapsed = time.perf_counter() - started
+        self.assertEqual(len(body), 4096)
+        # 遅延50ms + 4KB / 40KB/s = 100ms 以上
+        self.assertGreaterEqual(elapsed, 0.14)
+
+
+if __name__ == '__main__':
+    unittest.main()
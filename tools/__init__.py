@@ -0,0 +1,4 @@
+"""
+開発・運用向けのコマンドラインツールを管理するパッケージ。
+`python -m tools.<名前>` の形式で実行します。
+"""
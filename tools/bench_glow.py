@@ -0,0 +1,85 @@
+"""グロー付きテキスト描画のベンチマーク
+
+従来方式（光彩12方向×レイヤー数+1回の draw.text）と poster_core.glow の1パス合成を
+ポスターと同じ使い方（名前・目標の行・縦書きセリフの1文字ずつ）で比較し、所要時間と画素差を表示します。
+
+使い方:
+    python -m tools.bench_glow --repeat 5
+"""
+
+import argparse
+import math
+import time
+
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+import config
+from poster_core.fonts import get_font_manager
+from poster_core.glow import draw_text_with_glow
+
+GRAY_GLOW = [(8, (80, 80, 80, 255)), (6, (95, 95, 95, 255)), (4, (110, 110, 110, 255)), (2, (130, 130, 130, 255))]
+BLUE_GLOW = [(8, (100, 100, 150, 255)), (6, (120, 120, 170, 255)), (4, (140, 140, 190, 255)), (2, (160, 160, 210, 255))]
+
+
+def legacy_draw_text_with_glow(canvas, text, x, y, font, glow_layers, main_color=(255, 255, 255)):
+    """従来の描画方式（比較用）"""
+    draw = ImageDraw.Draw(canvas)
+    for radius, color in glow_layers:
+        for angle in range(0, 360, 30):
+            dx = int(radius * math.cos(math.radians(angle)))
+            dy = int(radius * math.sin(math.radians(angle)))
+            draw.text((x + dx, y + dy), text, fill=color, font=font)
+    draw.text((x, y), text, fill=main_color, font=font)
+
+
+def load_font(size: int):
+    manager = get_font_manager()
+    if manager.resolve(config.POSTER_FONT_D):
+        return manager.get(config.POSTER_FONT_D, size)
+    return ImageFont.load_default(size=size)
+
+
+def scenarios():
+    """(名前, 描画呼び出しの一覧) ※各呼び出しは (text, x, y, font, glow_layers)"""
+    lines_text = "ここに長めのセリフが入ります、どこまでも続く物語を信じて。"
+    font_lines = load_font(80)
+    vertical = [(ch, 300, 100 + i % 15 * 84, font_lines, GRAY_GLOW) for i, ch in enumerate(lines_text)]
+    return [
+        ('名前（80px）', [("キャラクター名前", 300, 1420, load_font(80), GRAY_GLOW)]),
+        ('目標 4行（60px）', [("目標の一行ぶんの文章", 850, 1500 + i * 78, load_font(60), BLUE_GLOW) for i in range(4)]),
+        (f'縦書きセリフ {len(lines_text)}文字（80px）', vertical),
+    ]
+
+
+def run(func, calls, repeat: int):
+    best = float('inf')
+    canvas = None
+    for _ in range(repeat):
+        canvas = Image.new('RGB', (1600, 2100), (40, 60, 90))
+        started = time.perf_counter()
+        for text, x, y, font, layers in calls:
+            func(canvas, text, x, y, font, layers)
+        best = min(best, time.perf_counter() - started)
+    return best, canvas
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="グロー付きテキスト描画のベンチマーク")
+    parser.add_argument('--repeat', type=int, default=5, help="各方式の繰り返し回数（最速値を表示）")
+    args = parser.parse_args()
+
+    print(f"{'ケース':<28}{'従来(ms)':>10}{'1パス(ms)':>11}{'高速化':>8}{'最大差':>8}{'平均差':>8}")
+    for name, calls in scenarios():
+        legacy_time, legacy_img = run(legacy_draw_text_with_glow, calls, args.repeat)
+        new_time, new_img = run(draw_text_with_glow, calls, args.repeat)
+        diff = ImageChops.difference(legacy_img, new_img).convert('L')
+        histogram = diff.histogram()
+        mean_diff = sum(i * n for i, n in enumerate(histogram)) / sum(histogram)
+        print(
+            f"{name:<28}{legacy_time * 1000:>10.1f}{new_time * 1000:>11.1f}"
+            f"{legacy_time / new_time:>7.1f}x{diff.getextrema()[1]:>8}{mean_diff:>8.3f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""キャラクター情報・画像の一括事前取得
+
+指定したID範囲のキャラクター情報（ステータス欄）と pfp 画像を取得し、
+/poster と誕生日通知が使うローカルキャッシュ（POSTER_INFO_CACHE_PATH / POSTER_IMAGE_CACHE_DIR）に保存します。
+取得済みのものは飛ばすので、中断しても同じコマンドで続きから再開できます。
+
+使い方:
+    python -m tools.crawl --ids 1-20000 --concurrency 16 --rate 8
+    python -m tools.crawl --ids 1-100,250,300-310 --only images
+    python -m tools.crawl --ids 1-20000 --selenium 2   # HTTPで項目が取れないページはChrome 2台で取得
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from typing import List, Optional
+
+import aiohttp
+
+import config
+from poster_core.browser import create_chrome_driver
+from poster_core.driver_pool import DriverPool
+from poster_core.image_store import ImageStore, download_character_image
+from poster_core.info_cache import CharacterInfoCache
+from poster_core.scraper import fetch_character_info_http, is_complete, scrape_character_info_selenium
+
+logger = logging.getLogger(__name__)
+
+_PROGRESS_INTERVAL = 5.0  # 進捗を表示する間隔（秒）
+
+
+def parse_id_ranges(spec: str) -> List[str]:
+    """'1-100,250,300-310' 形式のID指定を展開する（重複は除き、指定順を保つ）。
+
+    Raises:
+        ValueError: 形式が不正な場合
+    """
+    ids: List[str] = []
+    seen = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start_str, end_str = part.split('-', 1)
+            start, end = int(start_str), int(end_str)
+            if start > end:
+                raise ValueError(f"範囲の指定が逆です: {part}")
+            values = [str(i) for i in range(start, end + 1)]
+        else:
+            values = [str(int(part))]
+        for value in values:
+            if value not in seen:
+                seen.add(value)
+                ids.append(value)
+    return ids
+
+
+class RateLimiter:
+    """全ワーカー共通の秒間リクエスト数の上限（0で無制限）"""
+
+    def __init__(self, rate: float):
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self._interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self._interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class Crawler:
+    """ID一覧を並列に取得してローカルキャッシュに保存するクラス"""
+
+    def __init__(self, ids: List[str], concurrency: int, rate: float, only: Optional[str] = None,
+                 force: bool = False, selenium_drivers: int = 0):
+        """
+        Args:
+            ids: 取得するキャラクターID
+            concurrency: 同時に処理するID数
+            rate: 公式サイト・画像ストレージへの秒間リクエスト数の上限（0で無制限）
+            only: 'info' または 'images' を指定するとその片方だけ取得する
+            force: 取得済みでも取り直す
+            selenium_drivers: HTTPで項目が取れなかった場合に使うChromeの台数（0でSeleniumを使わない）
+        """
+        self.ids = ids
+        self.concurrency = max(1, concurrency)
+        self.limiter = RateLimiter(rate)
+        self.want_info = only in (None, 'info')
+        self.want_images = only in (None, 'images')
+        self.force = force
+        self.selenium_drivers = max(0, selenium_drivers)
+        self.info_cache = CharacterInfoCache(config.POSTER_INFO_CACHE_PATH, config.POSTER_INFO_CACHE_TTL)
+        self.image_store = ImageStore(config.POSTER_IMAGE_CACHE_DIR)
+        self.driver_pool = None
+        self.counts = {'done': 0, 'info': 0, 'images': 0, 'skipped': 0, 'missing': 0, 'failed': 0}
+        self._started = 0.0
+
+    async def run(self) -> dict:
+        """すべてのIDを処理し、件数の集計を返す。"""
+        if self.selenium_drivers:
+            self.driver_pool = DriverPool(create_chrome_driver, size=self.selenium_drivers)
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for character_id in self.ids:
+            queue.put_nowait(character_id)
+
+        self._started = time.monotonic()
+        progress = asyncio.create_task(self._report_progress())
+        try:
+            async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.concurrency)) as session:
+                workers = [asyncio.create_task(self._worker(session, queue)) for _ in range(self.concurrency)]
+                await asyncio.gather(*workers)
+        finally:
+            progress.cancel()
+            if self.driver_pool is not None:
+                await asyncio.to_thread(self.driver_pool.close)
+        self._log_progress()
+        return dict(self.counts)
+
+    async def _worker(self, session: aiohttp.ClientSession, queue: asyncio.Queue) -> None:
+        while True:
+            try:
+                character_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                await self._crawl_one(session, character_id)
+            except Exception as e:
+                self.counts['failed'] += 1
+                logger.warning(f"取得に失敗しました: character_id={character_id}, {e}")
+            finally:
+                self.counts['done'] += 1
+
+    async def _crawl_one(self, session: aiohttp.ClientSession, character_id: str) -> None:
+        need_image = self.want_images and (
+            self.force or not await asyncio.to_thread(self.image_store.has, character_id)
+        )
+        cached = None
+        if self.want_info and not self.force:
+            cached = await asyncio.to_thread(self.info_cache.get, character_id)
+        need_info = self.want_info and (cached is None or cached.stale)
+        if not need_image and not need_info:
+            self.counts['skipped'] += 1
+            return
+
+        if need_image:
+            await self.limiter.wait()
+            try:
+                data = await download_character_image(session, character_id)
+            except aiohttp.ClientResponseError as e:
+                if e.status == 404:
+                    # 画像が無いIDは存在しないキャラクターとみなし、ページも取りに行かない
+                    self.counts['missing'] += 1
+                    return
+                raise
+            await asyncio.to_thread(self.image_store.put, character_id, data)
+            self.counts['images'] += 1
+
+        if need_info:
+            await self.limiter.wait()
+            info = await fetch_character_info_http(session, character_id)
+            if not is_complete(info) and self.driver_pool is not None:
+                # Selenium でページを読み直すのも公式サイトへの1リクエストとして数える
+                await self.limiter.wait()
+                info = await asyncio.to_thread(self._scrape_with_selenium, character_id)
+            if not is_complete(info):
+                self.counts['missing'] += 1
+                return
+            await asyncio.to_thread(self.info_cache.put, character_id, info)
+            self.counts['info'] += 1
+
+    def _scrape_with_selenium(self, character_id: str) -> dict:
+        with self.driver_pool.lease() as driver:
+            return scrape_character_info_selenium(driver, character_id)
+
+    async def _report_progress(self) -> None:
+        while True:
+            await asyncio.sleep(_PROGRESS_INTERVAL)
+            self._log_progress()
+
+    def _log_progress(self) -> None:
+        total = len(self.ids)
+        done = self.counts['done']
+        elapsed = time.monotonic() - self._started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = (total - done) / rate if rate > 0 else 0.0
+        logger.info(
+            f"{done}/{total} ({done / total * 100 if total else 100:.1f}%) "
+            f"情報={self.counts['info']} 画像={self.counts['images']} 取得済み={self.counts['skipped']} "
+            f"該当なし={self.counts['missing']} 失敗={self.counts['failed']} "
+            f"{rate:.1f}件/秒 残り約{eta / 60:.0f}分"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="キャラクター情報・画像の一括事前取得")
+    parser.add_argument('--ids', required=True, help="取得するID（例: 1-20000 または 1-100,250）")
+    parser.add_argument('--concurrency', type=int, default=8, help="同時に処理するID数")
+    parser.add_argument('--rate', type=float, default=5.0, help="秒間リクエスト数の上限（0で無制限）")
+    parser.add_argument('--only', choices=['info', 'images'], default=None, help="片方だけ取得する")
+    parser.add_argument('--force', action='store_true', help="取得済みのものも取り直す")
+    parser.add_argument('--selenium', type=int, default=0, metavar='N',
+                        help="HTTPで項目が取れないページをChrome N台で取得する（0で使わない）")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    try:
+        ids = parse_id_ranges(args.ids)
+    except ValueError as e:
+        parser.error(f"--ids の形式が不正です: {e}")
+    crawler = Crawler(ids, args.concurrency, args.rate, only=args.only, force=args.force,
+                      selenium_drivers=args.selenium)
+    logger.info(f"{len(ids)}件の取得を開始します（同時実行数={crawler.concurrency}, 上限={args.rate}件/秒）")
+    try:
+        asyncio.run(crawler.run())
+    except KeyboardInterrupt:
+        logger.info("中断しました。同じコマンドで続きから再開できます。")
+
+
+if __name__ == '__main__':
+    main()
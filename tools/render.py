@@ -0,0 +1,266 @@
+"""ポスターの一括生成（Discord不要）
+
+指定したIDのキャラクター画像・情報を取得し、/poster と同じ描画プール（PosterRenderer）でポスターを描いて
+出力ディレクトリに保存します。描画プロセス数の既定値はCPU数です。
+出力済みのIDは飛ばすので、中断しても同じコマンドで続きから再開できます。
+最後に処理速度（枚/秒）と工程ごとの所要時間（p50/p95）を表示するため、CPU負荷のベンチマークにも使えます。
+
+使い方:
+    python -m tools.render --ids 1-500 --out output/posters
+    python -m tools.render --ids 1-100,250 --out output/posters --format webp --offline
+    python -m tools.render --ids 1-50 --out /tmp/bench --workers 4 --force   # 毎回描き直して計測
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import glob
+import logging
+import math
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+
+import config
+from poster_core.encoding import DEFAULT_PROFILE, PROFILE_ORDER, extension_for
+from poster_core.image_store import ImageStore, download_character_image
+from poster_core.info_cache import CharacterInfoCache
+from poster_core.render_pool import RenderPool
+from poster_core.scraper import fetch_character_info_http, is_complete
+from tools.crawl import parse_id_ranges
+
+logger = logging.getLogger(__name__)
+
+_PROGRESS_INTERVAL = 5.0  # 進捗を表示する間隔（秒）
+STAGES = ('image', 'info', 'render', 'encode', 'write')
+
+
+def percentile(values: List[float], q: float) -> float:
+    """最近傍順位法によるパーセンタイル（値が無ければ 0）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(q / 100 * len(ordered))
+    return ordered[max(0, min(len(ordered), rank) - 1)]
+
+
+class BatchRenderer:
+    """ID一覧のポスターを並列に描画してファイルに保存するクラス"""
+
+    def __init__(self, ids: List[str], out_dir: str, workers: Optional[int] = None, profile: str = DEFAULT_PROFILE,
+                 max_bytes: int = 0, concurrency: int = 8, offline: bool = False, force: bool = False):
+        """
+        Args:
+            ids: 生成するキャラクターID
+            out_dir: 出力ディレクトリ
+            workers: 描画プロセス数（None でCPU数、0で同一プロセスのスレッドで描画）
+            profile: エンコードのプロファイル名
+            max_bytes: 出力サイズの上限（超えたら次のプロファイルに落とす、0で無制限）
+            concurrency: 画像・情報を同時に取得するID数
+            offline: ローカルキャッシュに無い画像・情報を取りに行かない
+            force: 出力済みでも描き直す
+        """
+        self.ids = ids
+        self.out_dir = out_dir
+        self.workers = (os.cpu_count() or 1) if workers is None else max(0, workers)
+        self.profile = profile
+        self.max_bytes = max_bytes
+        self.concurrency = max(1, concurrency)
+        self.offline = offline
+        self.force = force
+        self.info_cache = CharacterInfoCache(config.POSTER_INFO_CACHE_PATH, config.POSTER_INFO_CACHE_TTL)
+        self.image_store = ImageStore(config.POSTER_IMAGE_CACHE_DIR)
+        self.pool = RenderPool(workers=self.workers, max_queue=0)
+        # 描画待ちで render の計測値が膨らまないよう、同時に描画に出す数はワーカー数までにする
+        self._render_slots = asyncio.Semaphore(max(1, self.workers))
+        self.counts = {'done': 0, 'rendered': 0, 'skipped': 0, 'image_only': 0, 'missing': 0, 'failed': 0}
+        self.timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self._started = 0.0
+        self._elapsed = 0.0
+
+    def output_exists(self, character_id: str) -> bool:
+        """出力済みか（形式は問わない）"""
+        return bool(glob.glob(os.path.join(glob.escape(self.out_dir), f"poster_{character_id}.*")))
+
+    async def run(self) -> dict:
+        """すべてのIDを処理し、件数と工程ごとの所要時間の集計を返す。"""
+        os.makedirs(self.out_dir, exist_ok=True)
+        queue: asyncio.Queue = asyncio.Queue()
+        for character_id in self.ids:
+            queue.put_nowait(character_id)
+
+        # ワーカーの起動・フォント読み込みを待ってから計測を始める
+        await asyncio.to_thread(lambda: concurrent.futures.wait(self.pool.start()))
+        self._started = time.monotonic()
+        progress = asyncio.create_task(self._report_progress())
+        try:
+            async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.concurrency)) as session:
+                workers = [asyncio.create_task(self._worker(session, queue)) for _ in range(self.concurrency)]
+                await asyncio.gather(*workers)
+        finally:
+            progress.cancel()
+            self.pool.close()
+            self._elapsed = time.monotonic() - self._started
+        self._log_progress()
+        return self.summary()
+
+    async def _worker(self, session: aiohttp.ClientSession, queue: asyncio.Queue) -> None:
+        while True:
+            try:
+                character_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                await self._render_one(session, character_id)
+            except Exception as e:
+                self.counts['failed'] += 1
+                logger.warning(f"生成に失敗しました: character_id={character_id}, {e}")
+            finally:
+                self.counts['done'] += 1
+
+    async def _render_one(self, session: aiohttp.ClientSession, character_id: str) -> None:
+        if not self.force and self.output_exists(character_id):
+            self.counts['skipped'] += 1
+            return
+
+        started = time.perf_counter()
+        char_bytes = await asyncio.to_thread(self.image_store.get, character_id)
+        if char_bytes is None and not self.offline:
+            try:
+                char_bytes = await download_character_image(session, character_id)
+            except aiohttp.ClientResponseError as e:
+                if e.status != 404:
+                    raise
+            else:
+                await asyncio.to_thread(self.image_store.put, character_id, char_bytes)
+        if char_bytes is None:
+            self.counts['missing'] += 1
+            return
+        self.timings['image'].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        cached = await asyncio.to_thread(self.info_cache.get, character_id)
+        info = cached.info if cached is not None else {}
+        if cached is None and not self.offline:
+            info = await fetch_character_info_http(session, character_id)
+            if is_complete(info):
+                await asyncio.to_thread(self.info_cache.put, character_id, info)
+            else:
+                info = {}
+        if not info:
+            self.counts['image_only'] += 1
+        self.timings['info'].append(time.perf_counter() - started)
+
+        async with self._render_slots:
+            started = time.perf_counter()
+            result = await self.pool.render(char_bytes, info, character_id, self.profile, self.max_bytes)
+            elapsed = time.perf_counter() - started
+        # 描画プールはエンコードまで済ませて返すので、エンコード分を差し引いて描画の時間とする
+        self.timings['render'].append(max(0.0, elapsed - result.encode_ms / 1000))
+        self.timings['encode'].append(result.encode_ms / 1000)
+
+        started = time.perf_counter()
+        await asyncio.to_thread(self._write, character_id, result.data)
+        self.timings['write'].append(time.perf_counter() - started)
+        self.counts['rendered'] += 1
+
+    def _write(self, character_id: str, data: bytes) -> None:
+        # 中断しても途中までのファイルが出力済みと見なされないよう、書き終えてから名前を付ける
+        path = os.path.join(self.out_dir, f"poster_{character_id}.{extension_for(data)}")
+        fd, tmp_path = tempfile.mkstemp(dir=self.out_dir, prefix='.tmp_')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        # 別の形式で出力済みだったものは消す（--force で形式を変えて描き直した場合）
+        for old in glob.glob(os.path.join(glob.escape(self.out_dir), f"poster_{character_id}.*")):
+            if old != path:
+                os.remove(old)
+
+    def summary(self) -> dict:
+        """件数・処理速度・工程ごとの p50/p95（ミリ秒）"""
+        stages = {
+            stage: {
+                'p50_ms': round(percentile(values, 50) * 1000, 1),
+                'p95_ms': round(percentile(values, 95) * 1000, 1),
+            }
+            for stage, values in self.timings.items()
+        }
+        return {
+            **self.counts,
+            'workers': self.workers,
+            'elapsed_s': round(self._elapsed, 2),
+            'posters_per_s': round(self.counts['rendered'] / self._elapsed, 2) if self._elapsed > 0 else 0.0,
+            'stages': stages,
+        }
+
+    async def _report_progress(self) -> None:
+        while True:
+            await asyncio.sleep(_PROGRESS_INTERVAL)
+            self._log_progress()
+
+    def _log_progress(self) -> None:
+        total = len(self.ids)
+        done = self.counts['done']
+        elapsed = time.monotonic() - self._started
+        rate = self.counts['rendered'] / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            f"{done}/{total} ({done / total * 100 if total else 100:.1f}%) "
+            f"生成={self.counts['rendered']} 出力済み={self.counts['skipped']} 画像のみ={self.counts['image_only']} "
+            f"該当なし={self.counts['missing']} 失敗={self.counts['failed']} {rate:.2f}枚/秒"
+        )
+
+
+def format_summary(summary: dict) -> str:
+    """集計結果を表示用の文字列にする"""
+    lines = [
+        f"生成 {summary['rendered']}枚 / {summary['elapsed_s']}秒 = {summary['posters_per_s']}枚/秒"
+        f"（描画プロセス {summary['workers']}）",
+        f"出力済み={summary['skipped']} 画像のみ={summary['image_only']} "
+        f"該当なし={summary['missing']} 失敗={summary['failed']}",
+        f"{'工程':<8}{'p50(ms)':>10}{'p95(ms)':>10}",
+    ]
+    for stage, values in summary['stages'].items():
+        lines.append(f"{stage:<8}{values['p50_ms']:>10}{values['p95_ms']:>10}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ポスターの一括生成（Discord不要）")
+    parser.add_argument('--ids', required=True, help="生成するID（例: 1-500 または 1-100,250）")
+    parser.add_argument('--out', required=True, help="出力ディレクトリ")
+    parser.add_argument('--workers', type=int, default=None, help="描画プロセス数（既定: CPU数、0で同一プロセス）")
+    parser.add_argument('--format', choices=PROFILE_ORDER, default=DEFAULT_PROFILE, help="出力形式")
+    parser.add_argument('--max-mb', type=int, default=0, help="出力サイズの上限（MB、超えたら次の形式に落とす、0で無制限）")
+    parser.add_argument('--concurrency', type=int, default=8, help="画像・情報を同時に取得するID数")
+    parser.add_argument('--offline', action='store_true', help="ローカルキャッシュに無い画像・情報を取りに行かない")
+    parser.add_argument('--force', action='store_true', help="出力済みのものも描き直す")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    try:
+        ids = parse_id_ranges(args.ids)
+    except ValueError as e:
+        parser.error(f"--ids の形式が不正です: {e}")
+    renderer = BatchRenderer(
+        ids, args.out, workers=args.workers, profile=args.format, max_bytes=args.max_mb * 1024 * 1024,
+        concurrency=args.concurrency, offline=args.offline, force=args.force,
+    )
+    logger.info(f"{len(ids)}件の生成を開始します（描画プロセス={renderer.workers}, 出力先={args.out}）")
+    try:
+        summary = asyncio.run(renderer.run())
+    except KeyboardInterrupt:
+        logger.info("中断しました。同じコマンドで続きから再開できます。")
+        return
+    print(format_summary(summary))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+"""ポスターの描画サービス（Discord不要）
+
+キャラクター画像の取得・描画・エンコードを、Bot とは別のプロセスで行う HTTP サービスです。キャラクター情報は
+Bot が取得して依頼に添えたものを使い、添えられていなければ自分で取得します（キャッシュ → HTTP）。Bot の .env で POSTER_RENDER_NODES にこのサービスのURLを指定すると、/poster・/poster_batch の
+作成をこちらに依頼し、Bot のプロセスでは描画を行いません。複数台を起動して並べると、空いているノードに振り分けます。
+API は poster_core.render_client を参照してください。
+
+使い方:
+    python -m tools.render_service --port 8770
+    python -m tools.render_service --host 0.0.0.0 --port 8771 --workers 8   # 別ホストから使う場合
+
+    # Bot 側の .env
+    POSTER_RENDER_NODES=http://127.0.0.1:8770,http://127.0.0.1:8771
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import functools
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+
+import config
+from poster_core.encoding import DEFAULT_PROFILE, EncodeStats, extension_for, resolve_profile
+from poster_core.image_store import ImageStore
+from poster_core.info_cache import CharacterInfoCache
+from poster_core.job_queue import JobQueue, JobQueueFullError
+from poster_core.output_cache import OutputCache
+from poster_core.pipeline import PosterJobError, PosterPipeline
+from poster_core.render_pool import RenderPool, RenderQueueFullError
+from poster_core.renderer import create_asset_store
+from poster_core.scraper import fetch_character_info_http, is_complete
+
+logger = logging.getLogger(__name__)
+
+_CONTENT_TYPES = {'png': 'image/png', 'jpg': 'image/jpeg', 'webp': 'image/webp'}
+_BUSY_MESSAGE = "ただいま混み合っています。しばらくしてから再度お試しください。"
+
+
+class RenderService:
+    """画像・情報の取得から描画・エンコードまでを行い、完成したポスター画像を返すクラス（イベントループ内で使う）"""
+
+    def __init__(self, workers: Optional[int] = None, max_queue: int = config.POSTER_RENDER_QUEUE,
+                 concurrency: Optional[int] = None, max_waiting: int = config.POSTER_JOB_QUEUE_LIMIT):
+        """
+        Args:
+            workers: 描画プロセス数（None でCPU数、0で同一プロセスのスレッドで描画）
+            max_queue: 実行中に加えて待たせられる描画の数
+            concurrency: 同時に作成するポスターの数（None で描画プロセス数の2倍。取得待ちの間もCPUを遊ばせない）
+            max_waiting: 順番待ちにできるポスターの数（超えたら混雑として断る）
+        """
+        self.workers = (os.cpu_count() or 1) if workers is None else max(0, workers)
+        self.image_store = ImageStore(config.POSTER_IMAGE_CACHE_DIR)
+        self.info_cache = CharacterInfoCache(config.POSTER_INFO_CACHE_PATH, config.POSTER_INFO_CACHE_TTL)
+        self.render_pool = RenderPool(workers=self.workers, max_queue=max_queue)
+        self.output_cache = OutputCache(
+            config.POSTER_OUTPUT_CACHE_DIR,
+            max_memory_bytes=config.POSTER_OUTPUT_CACHE_MEMORY_MB * 1024 * 1024,
+            max_disk_bytes=config.POSTER_OUTPUT_CACHE_DISK_MB * 1024 * 1024,
+        )
+        # アセットの版を調べるためだけに使う（画像の読み込みは描画ワーカーが行う）
+        self.assets = create_asset_store()
+        if concurrency is None:
+            concurrency = max(1, self.workers) * 2
+        # 同じキャラクター・出力形式の同時の依頼は1回の作成に相乗りさせる（複数の Bot から依頼された場合も含む）
+        self.jobs = JobQueue(concurrency=concurrency, max_waiting=max_waiting)
+        self.encode_stats = EncodeStats()
+        self.pipeline = PosterPipeline(
+            self.image_store, self.render_pool, self.output_cache, self.assets, self.encode_stats
+        )
+        self._degraded_count = 0
+        self._http_session: Optional[aiohttp.ClientSession] = None
+
+    def start(self) -> List[concurrent.futures.Future]:
+        """描画ワーカーを起動する（起動完了を待つための Future を返す）"""
+        return self.render_pool.start()
+
+    async def close(self) -> None:
+        self.jobs.cancel_all()
+        if self._http_session is not None and not self._http_session.closed:
+            await self._http_session.close()
+        self.render_pool.close()
+
+    def _get_http_session(self) -> aiohttp.ClientSession:
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = aiohttp.ClientSession()
+        return self._http_session
+
+    async def render(self, character_id: str, profile: str = DEFAULT_PROFILE, max_bytes: int = 0,
+                     info: Optional[Dict[str, str]] = None) -> Tuple[bytes, bool, bool]:
+        """ポスターを作成する（同じ依頼が作成中・順番待ちなら相乗りする）
+
+        Args:
+            character_id: キャラクターID
+            profile: エンコードのプロファイル名
+            max_bytes: 出力サイズの上限（0で無制限）
+            info: 依頼元が取得したキャラクター情報（None ならキャッシュ → HTTP の順に自分で取得する）
+
+        Returns:
+            (エンコード済みのポスター画像, 画像のみで作成したか, 完成画像キャッシュから返したか)
+
+        Raises:
+            JobQueueFullError: 順番待ちが上限に達している場合
+            RenderQueueFullError: 描画待ちが上限に達している場合
+            PosterJobError: 作成に失敗した場合（ユーザー向けのメッセージ付き）
+        """
+        # 添えられた情報が違う依頼は別の作成にする（Bot 側でキャッシュを消した直後の依頼などを古い情報に相乗りさせない）
+        info_key = None if info is None else tuple(sorted(info.items()))
+        ticket = self.jobs.submit(
+            (character_id, profile, max_bytes, info_key),
+            functools.partial(self._build, character_id, profile, max_bytes, info),
+        )
+        return await ticket.result()
+
+    async def _build(self, character_id: str, profile: str, max_bytes: int,
+                     info: Optional[Dict[str, str]]) -> Tuple[bytes, bool, bool]:
+        async def given_info(cid: str, timeout: Optional[float]) -> Dict[str, str]:
+            return info
+
+        # 工程と制限時間は Bot の /poster と共通（自分で取得する場合は Selenium を使わない）
+        get_info = self._get_character_info if info is None else given_info
+        build = await self.pipeline.build(self._get_http_session(), character_id, profile, max_bytes, get_info)
+        if build.degraded:
+            self._degraded_count += 1
+        return build.data, build.degraded, build.cached
+
+    async def _get_character_info(self, character_id: str, timeout: Optional[float]) -> Dict[str, str]:
+        """キャッシュ → HTTP の順にキャラクター情報を取得する（取れなければ期限切れのキャッシュ、それも無ければ空）
+
+        Selenium は使わない（Chrome を使う取得は Bot 側の構成のみ）。
+        """
+        entry = await asyncio.to_thread(self.info_cache.get, character_id)
+        if entry is not None and not entry.stale:
+            return entry.info
+        try:
+            info = await asyncio.wait_for(
+                fetch_character_info_http(self._get_http_session(), character_id), timeout
+            )
+        except Exception as e:
+            logger.warning(f"キャラクター情報をHTTPで取得できませんでした: character_id={character_id}, {e!r}")
+            info = {}
+        if is_complete(info):
+            await asyncio.to_thread(self.info_cache.put, character_id, info)
+            return info
+        if entry is not None:
+            logger.info(f"期限切れのキャッシュを使います: character_id={character_id}")
+            return entry.info
+        logger.warning(f"キャラクター情報を取得できないため画像のみで作成します: character_id={character_id}")
+        return {}
+
+    def health(self) -> Dict[str, Any]:
+        """死活確認の応答（描画プロセス数と実行中・待ちの数）"""
+        pool = self.render_pool.stats()
+        return {
+            'status': 'ok',
+            'workers': self.workers,
+            'pending_renders': pool['pending'],
+            'jobs': self.jobs.stats(),
+        }
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            '作成ジョブ': self.jobs.stats(),
+            '描画プール': self.render_pool.stats(),
+            'エンコード': self.encode_stats.stats(),
+            '画像キャッシュ': self.image_store.stats(),
+            '情報キャッシュ': self.info_cache.stats(),
+            '完成画像キャッシュ': self.output_cache.stats(),
+            '画像のみで作成': {'count': self._degraded_count},
+        }
+
+
+SERVICE_KEY = web.AppKey('service', RenderService)
+
+
+def _error(status: int, message: str) -> web.Response:
+    return web.json_response({'error': message}, status=status)
+
+
+async def handle_render(request: web.Request) -> web.Response:
+    try:
+        payload = await request.json()
+    except ValueError:
+        return _error(400, "依頼の形式が不正です。")
+    if not isinstance(payload, dict):
+        return _error(400, "依頼の形式が不正です。")
+    character_id = str(payload.get('character_id', '')).strip()
+    if not character_id.isdigit():
+        return _error(400, "キャラクターIDは数字で指定してください。")
+    try:
+        profile = resolve_profile(payload.get('profile')).name
+    except ValueError as e:
+        return _error(400, str(e))
+    max_bytes = payload.get('max_bytes', 0)
+    if not isinstance(max_bytes, int) or max_bytes < 0:
+        return _error(400, "max_bytes は0以上の整数で指定してください。")
+    info = payload.get('info')
+    if info is not None and not (
+        isinstance(info, dict) and all(isinstance(value, str) for value in info.values())
+    ):
+        return _error(400, "info は文字列の値を持つオブジェクトで指定してください。")
+
+    service = request.app[SERVICE_KEY]
+    try:
+        data, degraded, cached = await service.render(character_id, profile, max_bytes, info)
+    except (JobQueueFullError, RenderQueueFullError) as e:
+        logger.warning(f"作成の待ちが上限に達しています: {e}")
+        return _error(503, _BUSY_MESSAGE)
+    except PosterJobError as e:
+        return _error(422, e.user_message)
+    except Exception as e:
+        logger.error(f"予期せぬエラー: character_id={character_id}, {e}", exc_info=True)
+        return _error(500, "エラーが発生しました。管理者に連絡してください。")
+    return web.Response(
+        body=data,
+        content_type=_CONTENT_TYPES[extension_for(data)],
+        headers={'X-Poster-Degraded': '1' if degraded else '0', 'X-Poster-Cached': '1' if cached else '0'},
+    )
+
+
+async def handle_health(request: web.Request) -> web.Response:
+    return web.json_response(request.app[SERVICE_KEY].health())
+
+
+async def handle_stats(request: web.Request) -> web.Response:
+    return web.json_response(request.app[SERVICE_KEY].stats())
+
+
+async def _on_startup(app: web.Application) -> None:
+    # ワーカーの起動・フォント読み込みを済ませてから依頼を受け付ける
+    service = app[SERVICE_KEY]
+    await asyncio.to_thread(lambda: concurrent.futures.wait(service.start()))
+
+
+async def _on_cleanup(app: web.Application) -> None:
+    await app[SERVICE_KEY].close()
+
+
+def create_app(service: RenderService) -> web.Application:
+    """描画サービスのアプリケーションを生成する。"""
+    app = web.Application()
+    app[SERVICE_KEY] = service
+    app.router.add_post('/render', handle_render)
+    app.router.add_get('/health', handle_health)
+    app.router.add_get('/stats', handle_stats)
+    app.on_startup.append(_on_startup)
+    app.on_cleanup.append(_on_cleanup)
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ポスターの描画サービス（Discord不要）")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8770)
+    parser.add_argument('--workers', type=int, default=None, help="描画プロセス数（既定: CPU数、0で同一プロセス）")
+    parser.add_argument('--max-queue', type=int, default=config.POSTER_RENDER_QUEUE, help="描画待ちの上限")
+    parser.add_argument('--concurrency', type=int, default=None, help="同時に作成するポスターの数（既定: 描画プロセス数の2倍）")
+    parser.add_argument('--max-waiting', type=int, default=config.POSTER_JOB_QUEUE_LIMIT, help="順番待ちの上限")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    service = RenderService(
+        workers=args.workers, max_queue=args.max_queue, concurrency=args.concurrency, max_waiting=args.max_waiting,
+    )
+    logger.info(f"描画サービスを起動します: http://{args.host}:{args.port} (描画プロセス={service.workers})")
+    web.run_app(create_app(service), host=args.host, port=args.port, print=None)
+
+
+if __name__ == '__main__':
+    main()
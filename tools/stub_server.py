@@ -0,0 +1,255 @@
+"""ローカルスタブサーバー
+
+キャラクターページと pfp 画像を fixtures ディレクトリから配信し、
+公式サイト・画像ストレージの代わりに使えるようにします。
+遅延・エラー率・帯域を指定できるため、オフラインでの計測や負荷試験に使えます。
+
+使い方:
+    python -m tools.stub_server --port 8765 --latency-ms 80 --error-rate 0.05 --bandwidth-kBps 512
+
+    # .env で以下のように向け先を切り替える
+    ZIRCON_CHARACTER_PAGE_URL=http://127.0.0.1:8765/character
+    ZIRCON_IMAGE_BASE_URL=http://127.0.0.1:8765/image
+
+    # 実サイトの応答を fixtures に保存しながら配信する（記録モード）
+    python -m tools.stub_server --record [--render]
+
+fixtures の構成:
+    <fixtures>/pages/<character_id>.html
+    <fixtures>/images/pfp_<character_id>.webp|png
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import re
+from typing import Optional
+
+import aiohttp
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_FIXTURES_DIR = os.path.join(_REPO_ROOT, 'data', 'fixtures')
+
+# 記録モードでの取得元（config.py の既定値と同じ。config 側はスタブに向けている想定のため独立して持つ）
+DEFAULT_UPSTREAM_PAGE_URL = 'https://zircon.konami.net/nft/character'
+DEFAULT_UPSTREAM_IMAGE_URL = 'https://storage.googleapis.com/prd-azz-image'
+
+SETTINGS_KEY = web.AppKey('settings', object)
+STATS_KEY = web.AppKey('stats', dict)
+SESSION_KEY = web.AppKey('session', aiohttp.ClientSession)
+
+_CHUNK_SIZE = 16 * 1024
+_SAFE_NAME = re.compile(r'^[A-Za-z0-9_-][A-Za-z0-9_.-]*$')
+_CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.webp': 'image/webp',
+    '.png': 'image/png',
+}
+
+
+class StubSettings:
+    """スタブサーバーの挙動設定"""
+
+    def __init__(self, fixtures_dir: str = DEFAULT_FIXTURES_DIR, latency_ms: int = 0, jitter_ms: int = 0,
+                 error_rate: float = 0.0, bandwidth_kBps: int = 0, record: bool = False, render: bool = False,
+                 upstream_page_url: str = DEFAULT_UPSTREAM_PAGE_URL,
+                 upstream_image_url: str = DEFAULT_UPSTREAM_IMAGE_URL, seed: Optional[int] = None):
+        """
+        Args:
+            fixtures_dir: 配信・記録に使うディレクトリ
+            latency_ms: 応答前に挟む遅延（ミリ秒）
+            jitter_ms: 遅延に加えるランダム幅（ミリ秒）
+            error_rate: 503 を返す確率（0.0〜1.0）
+            bandwidth_kBps: 送信帯域の上限（KB/秒、0で無制限）
+            record: fixtures に無いものを取得元から取得して保存する
+            render: 記録時にキャラクターページをChromeでレンダリングしてから保存する
+            upstream_page_url: 記録モードでのキャラクターページ取得元
+            upstream_image_url: 記録モードでの画像取得元
+            seed: 乱数シード（遅延・エラー注入を再現可能にする）
+        """
+        self.fixtures_dir = fixtures_dir
+        self.latency_ms = max(0, latency_ms)
+        self.jitter_ms = max(0, jitter_ms)
+        self.error_rate = min(1.0, max(0.0, error_rate))
+        self.bandwidth_kBps = max(0, bandwidth_kBps)
+        self.record = record
+        self.render = render
+        self.upstream_page_url = upstream_page_url.rstrip('/')
+        self.upstream_image_url = upstream_image_url.rstrip('/')
+        self.random = random.Random(seed)
+
+
+def _fixture_path(settings: StubSettings, kind: str, filename: str) -> str:
+    return os.path.join(settings.fixtures_dir, kind, filename)
+
+
+def _render_page(url: str) -> str:
+    """記録用にChromeでページをレンダリングし、ステータス欄の出現を待ってHTMLを返す（ブロッキング）。"""
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    from poster_core.browser import create_chrome_driver
+    from poster_core.scraper import STATUS_SELECTOR
+
+    driver = create_chrome_driver()
+    try:
+        driver.get(url)
+        try:
+            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, STATUS_SELECTOR)))
+        except TimeoutException:
+            logger.warning(f"ステータス欄が見つからないまま保存します: {url}")
+        return driver.page_source
+    finally:
+        driver.quit()
+
+
+async def _record(request: web.Request, kind: str, filename: str, upstream_url: str) -> Optional[bytes]:
+    """取得元から取得して fixtures に保存する。取得できなければ None。"""
+    settings: StubSettings = request.app[SETTINGS_KEY]
+    if kind == 'pages' and settings.render:
+        html = await asyncio.to_thread(_render_page, upstream_url)
+        body = html.encode('utf-8')
+    else:
+        session: aiohttp.ClientSession = request.app[SESSION_KEY]
+        async with session.get(upstream_url) as resp:
+            if resp.status != 200:
+                logger.warning(f"記録元が {resp.status} を返しました: {upstream_url}")
+                return None
+            body = await resp.read()
+    path = _fixture_path(settings, kind, filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(body)
+    logger.info(f"fixture を記録しました: {path} ({len(body)} bytes)")
+    return body
+
+
+async def _serve(request: web.Request, kind: str, filename: str, upstream_url: str) -> web.StreamResponse:
+    settings: StubSettings = request.app[SETTINGS_KEY]
+    stats = request.app[STATS_KEY]
+    stats['requests'] += 1
+
+    delay = settings.latency_ms + (settings.random.uniform(0, settings.jitter_ms) if settings.jitter_ms else 0)
+    if delay:
+        await asyncio.sleep(delay / 1000)
+    if settings.error_rate and settings.random.random() < settings.error_rate:
+        stats['injected_errors'] += 1
+        return web.Response(status=503, text='injected error')
+
+    path = _fixture_path(settings, kind, filename)
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            body = f.read()
+    elif settings.record:
+        try:
+            body = await _record(request, kind, filename, upstream_url)
+        except Exception as e:
+            logger.error(f"記録に失敗しました: {upstream_url}: {e}")
+            body = None
+        if body is None:
+            stats['misses'] += 1
+            return web.Response(status=502, text='upstream error')
+        stats['recorded'] += 1
+    else:
+        stats['misses'] += 1
+        return web.Response(status=404, text='fixture not found')
+
+    content_type = _CONTENT_TYPES.get(os.path.splitext(filename)[1], 'application/octet-stream')
+    if not settings.bandwidth_kBps:
+        return web.Response(body=body, headers={'Content-Type': content_type})
+
+    # 帯域制限: チャンクごとに送信時間ぶん待ってから書き出す
+    resp = web.StreamResponse(headers={'Content-Type': content_type, 'Content-Length': str(len(body))})
+    await resp.prepare(request)
+    bytes_per_sec = settings.bandwidth_kBps * 1024
+    for offset in range(0, len(body), _CHUNK_SIZE):
+        chunk = body[offset:offset + _CHUNK_SIZE]
+        await asyncio.sleep(len(chunk) / bytes_per_sec)
+        await resp.write(chunk)
+    await resp.write_eof()
+    return resp
+
+
+async def handle_character(request: web.Request) -> web.StreamResponse:
+    character_id = request.match_info['character_id']
+    if not _SAFE_NAME.match(character_id):
+        return web.Response(status=400, text='invalid character id')
+    settings: StubSettings = request.app[SETTINGS_KEY]
+    return await _serve(request, 'pages', f"{character_id}.html", f"{settings.upstream_page_url}/{character_id}")
+
+
+async def handle_image(request: web.Request) -> web.StreamResponse:
+    filename = request.match_info['filename']
+    if not _SAFE_NAME.match(filename):
+        return web.Response(status=400, text='invalid file name')
+    settings: StubSettings = request.app[SETTINGS_KEY]
+    return await _serve(request, 'images', filename, f"{settings.upstream_image_url}/{filename}")
+
+
+async def handle_health(request: web.Request) -> web.Response:
+    return web.json_response({'status': 'ok', **request.app[STATS_KEY]})
+
+
+async def _on_startup(app: web.Application) -> None:
+    app[SESSION_KEY] = aiohttp.ClientSession()
+
+
+async def _on_cleanup(app: web.Application) -> None:
+    await app[SESSION_KEY].close()
+
+
+def create_app(settings: StubSettings) -> web.Application:
+    """スタブサーバーのアプリケーションを生成する。"""
+    app = web.Application()
+    app[SETTINGS_KEY] = settings
+    app[STATS_KEY] = {'requests': 0, 'misses': 0, 'recorded': 0, 'injected_errors': 0}
+    app.router.add_get('/character/{character_id}', handle_character)
+    app.router.add_get('/image/{filename}', handle_image)
+    app.router.add_get('/health', handle_health)
+    app.on_startup.append(_on_startup)
+    app.on_cleanup.append(_on_cleanup)
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="キャラクターページ・画像のローカルスタブサーバー")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES_DIR, help="fixtures ディレクトリ")
+    parser.add_argument('--latency-ms', type=int, default=0, help="応答前の遅延（ミリ秒）")
+    parser.add_argument('--jitter-ms', type=int, default=0, help="遅延のランダム幅（ミリ秒）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="503 を返す確率（0.0〜1.0）")
+    parser.add_argument('--bandwidth-kBps', type=int, default=0, help="送信帯域（KB/秒、0で無制限）")
+    parser.add_argument('--record', action='store_true', help="fixtures に無いものを取得元から記録する")
+    parser.add_argument('--render', action='store_true', help="記録時にページをChromeでレンダリングする")
+    parser.add_argument('--upstream-page-url', default=DEFAULT_UPSTREAM_PAGE_URL)
+    parser.add_argument('--upstream-image-url', default=DEFAULT_UPSTREAM_IMAGE_URL)
+    parser.add_argument('--seed', type=int, default=None, help="乱数シード")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    settings = StubSettings(
+        fixtures_dir=args.fixtures,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        bandwidth_kBps=args.bandwidth_kBps,
+        record=args.record,
+        render=args.render,
+        upstream_page_url=args.upstream_page_url,
+        upstream_image_url=args.upstream_image_url,
+        seed=args.seed,
+    )
+    logger.info(f"スタブサーバーを起動します: http://{args.host}:{args.port} (fixtures={settings.fixtures_dir})")
+    web.run_app(create_app(settings), host=args.host, port=args.port, print=None)
+
+
+if __name__ == '__main__':
+    main()